@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+from datetime import datetime
+from heapq import merge
+from typing import Any, Callable, Iterator
+
+from create_revision import CreateRevisionService
+from csv_parser import CsvParser
+from csv_reader import CsvReader
+from file_save_helper import FileSaveHelper
+from ingest import SOURCES, IngestService
+from main2 import DatadogLog, ItemAnalyzer, ItemReader, LogReader, OrderItem, SellerLogReader
+from prepare_revision import PrepareRevisionService
+from revision_serializer import RevisionSerializer
+from src.model.edit_revision import EditRevision
+from src.model.event_table import EventTable
+from src.model.prepared_data import PreparedData
+
+
+class BenchmarkSuite:
+    '''
+    Times the pipeline stages on a data directory laid out like data/, e.g. one written by synthetic_data.py.
+
+    Every benchmark runs `repeat` times and keeps the fastest run, the result is a JSON document:
+        {'started_at', 'git_commit', 'python', 'data_dir', 'repeat', 'benchmarks': {name: {...}}}
+    with {'seconds', 'runs', 'rows', 'rows_per_second'} and 'bytes' for the serializers per benchmark.
+    '''
+
+    def __init__(self, data_dir: str, repeat: int):
+        self.data_dir: str = data_dir
+        self.repeat: int = repeat
+        self.benchmarks: dict[str, dict[str, Any]] = {}
+
+    def run(self) -> dict[str, Any]:
+        started_at: datetime = datetime.now()
+        os.makedirs(f'{self.data_dir}/processed', exist_ok=True)
+        processed: dict[str, str] = {}
+        for source in SOURCES:
+            csv_filepath: str = f'{self.data_dir}/{os.path.basename(source.csv_filepath)}'
+            processed[source.name] = f'{self.data_dir}/processed/{os.path.basename(source.output_filepath)}'
+            self._bench_source(name=source.name, csv_filepath=csv_filepath, output_filepath=processed[source.name])
+
+        goods_sno_list: list[int] = [
+            CsvParser.parse_raw_goods(line=line)
+            for line in CsvReader.stream(filepath=f'{self.data_dir}/goods.csv', limit=None)
+        ]
+        data: PreparedData = self._measure(
+            'prepare',
+            lambda: PrepareRevisionService.prepare(
+                goods_sno_list=goods_sno_list,
+                deal_filepath=processed['deal'],
+                option_filepath=processed['option'],
+                consumer_filepath=processed['platform_consumer'],
+                adj_filepath=processed['adj'],
+                columnar=True,
+            ),
+            rows=lambda prepared: prepared.deal_map.row_count,
+        )
+        revisions: list[EditRevision] = self._measure(
+            'create_revision2',
+            lambda: CreateRevisionService.create_revision2(data=data),
+            rows=len,
+        )
+        self._measure(
+            'revision_serializer',
+            lambda: RevisionSerializer.serialize(revisions=revisions),
+            rows=lambda _: len(revisions),
+            size=len,
+        )
+        self._bench_analyze()
+
+        return {
+            'started_at': started_at.isoformat(),
+            'git_commit': self._git_commit(),
+            'python': platform.python_version(),
+            'data_dir': self.data_dir,
+            'repeat': self.repeat,
+            'benchmarks': self.benchmarks,
+        }
+
+    def _bench_source(self, name: str, csv_filepath: str, output_filepath: str) -> None:
+        parser: Callable = IngestService.PARSERS[name]
+        table_type: type[EventTable] = IngestService.TABLES[name]
+        serializer: type = IngestService.SERIALIZERS[name]
+
+        self._measure(
+            f'csv_parser.{name}',
+            lambda: sum(1 for _ in parser(CsvReader.stream(filepath=csv_filepath, limit=None))),
+            rows=lambda count: count,
+        )
+        table: EventTable = table_type.from_rows(rows=parser(CsvReader.stream(filepath=csv_filepath, limit=None)))
+        data: bytes = self._measure(
+            f'serialize.{name}',
+            lambda: serializer.serialize(raw_map=table),
+            rows=lambda _: table.row_count,
+            size=len,
+        )
+        self._measure(
+            f'deserialize.{name}',
+            lambda: serializer.deserialize(data=data),
+            rows=lambda raw_map: sum(len(rows) for rows in raw_map.values()),
+            size=lambda _: len(data),
+        )
+        FileSaveHelper.save(data=data, filepath=output_filepath)
+
+    def _bench_analyze(self) -> None:
+        '''
+        The main2 path: cached vendor logs lazily merged with the seller logs, joined in a process pool.
+        '''
+        # read_cached resolves the directory against the working directory, like main2 does with data/logs/
+        log_dir: str = f'{os.path.relpath(self.data_dir)}/logs/'
+        cache_dir: str = f'{self.data_dir}/processed/log_cache/'
+        workers: int = os.cpu_count()
+
+        def read_vendor_logs() -> Iterator[DatadogLog]:
+            return LogReader.read_cached(file_dir_path=log_dir, cache_dir_path=cache_dir, workers=workers)
+
+        def read_cold() -> int:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            return sum(1 for _ in read_vendor_logs())
+
+        self._measure('log_cache.cold', read_cold, rows=lambda count: count)
+        self._measure('log_cache.warm', lambda: sum(1 for _ in read_vendor_logs()), rows=lambda count: count)
+
+        seller_logs: list[DatadogLog] = SellerLogReader.parse(
+            lines=SellerLogReader.read(filepaths=[f'{self.data_dir}/seller_logs.csv']),
+        )
+        items: list[OrderItem] = ItemReader.parse(
+            lines=ItemReader.read(filepaths=[f'{self.data_dir}/ably_gd_order_item.csv']),
+        )
+        self._measure(
+            'item_analyzer',
+            lambda: ItemAnalyzer.analyze(
+                logs=merge(read_vendor_logs(), seller_logs, key=lambda x: x.request_time),
+                items=items,
+                workers=workers,
+            ),
+            rows=lambda _: len(items),
+        )
+
+    def _measure(
+            self,
+            name: str,
+            fn: Callable[[], Any],
+            rows: Callable[[Any], int],
+            size: Callable[[Any], int] | None = None,
+    ) -> Any:
+        '''
+        Runs `fn` `repeat` times and records the fastest run, `rows` and `size` are computed from its result.
+        '''
+        runs: list[float] = []
+        result: Any = None
+        for _ in range(self.repeat):
+            begin: float = time.perf_counter()
+            result = fn()
+            runs.append(time.perf_counter() - begin)
+
+        seconds: float = min(runs)
+        row_count: int = rows(result)
+        record: dict[str, Any] = {
+            'seconds': seconds,
+            'runs': runs,
+            'rows': row_count,
+            'rows_per_second': row_count / seconds if seconds else None,
+        }
+        if size is not None:
+            record['bytes'] = size(result)
+        self.benchmarks[name] = record
+        print(f'{name:<32} {seconds:>10.4f}s {row_count:>12,d} rows')
+        return result
+
+    @classmethod
+    def _git_commit(cls) -> str | None:
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    @classmethod
+    def compare(cls, baseline: dict[str, Any], current: dict[str, Any]) -> None:
+        '''
+        Prints the speedup of every benchmark present in both results.
+        '''
+        print(f"\n{'benchmark':<32} {'baseline':>10} {'current':>10} {'speedup':>8}")
+        for name, record in current['benchmarks'].items():
+            before: dict[str, Any] | None = baseline['benchmarks'].get(name)
+            if before is None:
+                continue
+            print(
+                f"{name:<32} {before['seconds']:>9.4f}s {record['seconds']:>9.4f}s "
+                f"{before['seconds'] / record['seconds']:>7.2f}x"
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages and write the timings as JSON.')
+    parser.add_argument('--data-dir', default='data/synthetic')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='defaults to data/benchmarks/<started_at>.json')
+    parser.add_argument('--baseline', default=None, help='a previous result to compare with')
+    args = parser.parse_args()
+
+    result: dict[str, Any] = BenchmarkSuite(data_dir=args.data_dir, repeat=args.repeat).run()
+    output: str = args.output or f"data/benchmarks/{result['started_at'].replace(':', '')}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    FileSaveHelper.save(data=json.dumps(result, indent=2).encode('utf-8'), filepath=output)
+    print('saved: ', output)
+
+    if args.baseline:
+        BenchmarkSuite.compare(
+            baseline=json.loads(FileSaveHelper.read(filepath=args.baseline)),
+            current=result,
+        )
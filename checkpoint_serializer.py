@@ -0,0 +1,94 @@
+import dataclasses
+from datetime import datetime
+
+import msgpack
+
+from adj_serializer import AdjSerializer
+from option_serializer import OptionSerializer
+from platform_consumer_serializer import PlatformConsumerSerializer
+from src.model.option_context import GoodsContext
+from src.model.revision_checkpoint import RevisionCheckpoint, GoodsCheckpoint
+from timestamp_parser import TimestampParser
+
+
+class CheckpointSerializer:
+    '''
+    {
+        'version': 1,
+        'watermarks': {PreparedData field: {dt: epoch microseconds}},
+        'context_fields': [GoodsContext field names],
+        'contexts': {goods_sno: [GoodsContext values in context_fields order]},
+        'options' / 'platform_consumers' / 'adjs': pending events encoded by the raw row serializers,
+    }
+    Contexts are decoded by field name, fields missing from the file keep their GoodsContext default.
+    '''
+    VERSION: int = 1
+    CONTEXT_FIELDS: list[str] = [field.name for field in dataclasses.fields(GoodsContext)]
+    TIME_FIELDS: set[str] = {field.name for field in dataclasses.fields(GoodsContext) if field.type is datetime}
+
+    @classmethod
+    def serialize(cls, checkpoint: RevisionCheckpoint) -> bytes:
+        return msgpack.packb({
+            'version': cls.VERSION,
+            'watermarks': {
+                name: {dt: TimestampParser.to_epoch(at) for dt, at in marks.items()}
+                for name, marks in checkpoint.watermarks.items()
+            },
+            'context_fields': cls.CONTEXT_FIELDS,
+            'contexts': {
+                goods_sno: cls._encode_context(context=goods.context)
+                for goods_sno, goods in checkpoint.goods.items()
+            },
+            'options': OptionSerializer.serialize(
+                raw_map={goods_sno: goods.options for goods_sno, goods in checkpoint.goods.items() if goods.options},
+            ),
+            'platform_consumers': PlatformConsumerSerializer.serialize(
+                raw_map={
+                    goods_sno: goods.platform_consumers
+                    for goods_sno, goods in checkpoint.goods.items() if goods.platform_consumers
+                },
+            ),
+            'adjs': AdjSerializer.serialize(
+                raw_map={goods_sno: goods.adjs for goods_sno, goods in checkpoint.goods.items() if goods.adjs},
+            ),
+        })
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> RevisionCheckpoint:
+        data = msgpack.unpackb(data, strict_map_key=False)
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"unsupported revision checkpoint version: {data.get('version')}")
+        options = OptionSerializer.deserialize(data=data['options'])
+        platform_consumers = PlatformConsumerSerializer.deserialize(data=data['platform_consumers'])
+        adjs = AdjSerializer.deserialize(data=data['adjs'])
+        return RevisionCheckpoint(
+            watermarks={
+                name: {dt: TimestampParser.from_epoch(at) for dt, at in marks.items()}
+                for name, marks in data['watermarks'].items()
+            },
+            goods={
+                goods_sno: GoodsCheckpoint(
+                    context=cls._decode_context(fields=data['context_fields'], values=values),
+                    options=options.get(goods_sno, []),
+                    platform_consumers=platform_consumers.get(goods_sno, []),
+                    adjs=adjs.get(goods_sno, []),
+                )
+                for goods_sno, values in data['contexts'].items()
+            },
+        )
+
+    @classmethod
+    def _encode_context(cls, context: GoodsContext) -> list:
+        values: list = [getattr(context, name) for name in cls.CONTEXT_FIELDS]
+        return [
+            TimestampParser.to_epoch(value) if name in cls.TIME_FIELDS else value
+            for name, value in zip(cls.CONTEXT_FIELDS, values)
+        ]
+
+    @classmethod
+    def _decode_context(cls, fields: list[str], values: list) -> GoodsContext:
+        known: set[str] = set(cls.CONTEXT_FIELDS)
+        return GoodsContext(**{
+            name: TimestampParser.from_epoch(value) if name in cls.TIME_FIELDS else value
+            for name, value in zip(fields, values) if name in known
+        })
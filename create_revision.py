@@ -1,89 +1,265 @@
-from copy import deepcopy
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from heapq import merge
+from itertools import islice
+from typing import Iterable, Iterator
 
-from prepare_revision import PreparedData
+import numpy as np
+
+from checkpoint_serializer import CheckpointSerializer
+from deal_serializer import DealSerializer
+from file_save_helper import FileSaveHelper
+from prepare_revision import PreparedData, PrepareRevisionService
+from price_kernel import PriceKernel
+from raw_csv_codec import RawCsvCodec
+from revision_replay import RevisionReplayer
+from run_metrics import RunMetrics
 from src.model.edit_revision import EditRevision
-from src.model.option_context import GoodsContext
-from src.model.raw_csv import RawCsvDeal, RawCsvGoodsOption, RawCsvPlatformConsumer, RawCsvAdj
-from src.util import discard_ones_digit
+from src.model.option_context import GoodsContext, GoodsSnapshot
+from src.model.raw_csv import RawCsvDeal
+from src.model.revision_checkpoint import RevisionCheckpoint, GoodsCheckpoint
 
 
 class CreateRevisionService:
+    SHARDS_PER_WORKER: int = 4
+    PRICE_CHECK_BATCH_SIZE: int = 1 << 16
+    CHECKPOINT_SOURCES: tuple[str, ...] = ('deal_map', 'option_map', 'platform_consumer_map', 'adj_map')
+
     @classmethod
     def create_revision2(cls, data: PreparedData) -> list[EditRevision]:
-        res: list[EditRevision] = []
-        for goods_sno, deals in data.deal_map.items():
-            ctx: GoodsContext = GoodsContext(goods_sno=goods_sno)
-            deals: list[RawCsvDeal] = sorted(deals, key=lambda x: x.transaction_time)
-            while deals:
-                deal: RawCsvDeal = deals.pop(0)
-                cls._apply_revision2(context=ctx, data=data, deal=deal, changed_at=deal.transaction_time)
-                # 계산
-
-                wrong_price: int = ctx.thumbnail_price
-                correct_price1: int = discard_ones_digit(ctx.platform_consumer - ctx.discount_price)
-                correct_price2: int = discard_ones_digit(
-                        max(ctx.consumer_origin, ctx.price_origin) - abs(ctx.consumer_origin - ctx.price_origin)
+        def replay() -> Iterator[tuple[int, GoodsSnapshot, RawCsvDeal]]:
+            for goods_sno, deals in data.deal_map.items():
+                replayer: RevisionReplayer = RevisionReplayer(goods_sno=goods_sno, data=data)
+                yield from cls._replay_deals(goods_sno=goods_sno, replayer=replayer, deals=deals)
+
+        return cls._check_prices(states=replay())
+
+    @classmethod
+    def create_revision2_incremental(cls, data: PreparedData, checkpoint_filepath: str) -> list[EditRevision]:
+        '''
+        Replays only the rows that are newer than the checkpoint, starting every goods from its checkpointed
+        context and pending events, then saves the updated checkpoint.
+
+        The checkpoint keeps, per source and dt partition, the latest transaction_time replayed. A row is new
+        when its dt is not in the checkpoint or it is later than that watermark, so rows appended to a dt that
+        was already replayed, e.g. the current day re-exported during an incident, are picked up. Rows are
+        expected to arrive in transaction_time order, like the CDC exports.
+        '''
+        checkpoint: RevisionCheckpoint = cls._load_checkpoint(checkpoint_filepath=checkpoint_filepath)
+        data = cls._select_new_rows(data=data, watermarks=checkpoint.watermarks)
+
+        goods_checkpoints: dict[int, GoodsCheckpoint] = dict(checkpoint.goods)
+        goods_sno_list: list[int] = list(dict.fromkeys([
+            *data.deal_map.keys(),
+            *data.option_map.keys(),
+            *data.platform_consumer_map.keys(),
+            *data.adj_map.keys(),
+        ]))
+
+        def replay() -> Iterator[tuple[int, GoodsSnapshot, RawCsvDeal]]:
+            for goods_sno in goods_sno_list:
+                replayer: RevisionReplayer = RevisionReplayer(
+                    goods_sno=goods_sno,
+                    data=data,
+                    checkpoint=goods_checkpoints.get(goods_sno),
                 )
+                yield from cls._replay_deals(
+                    goods_sno=goods_sno,
+                    replayer=replayer,
+                    deals=data.deal_map.get(goods_sno, []),
+                )
+                goods_checkpoints[goods_sno] = replayer.to_checkpoint()
+
+        res: list[EditRevision] = cls._check_prices(states=replay())
 
-                if wrong_price == correct_price1 or wrong_price == correct_price2:
-                    continue
+        watermarks: dict[str, dict[str, datetime]] = {
+            name: dict(marks) for name, marks in checkpoint.watermarks.items()
+        }
+        new_partitions: set[str] = set()
+        for name in cls.CHECKPOINT_SOURCES:
+            marks: dict[str, datetime] = watermarks.setdefault(name, {})
+            for rows in getattr(data, name).values():
+                for row in rows:
+                    new_partitions.add(row.dt)
+                    if row.dt not in marks or marks[row.dt] < row.transaction_time:
+                        marks[row.dt] = row.transaction_time
+        FileSaveHelper.save(
+            data=CheckpointSerializer.serialize(
+                checkpoint=RevisionCheckpoint(watermarks=watermarks, goods=goods_checkpoints),
+            ),
+            filepath=checkpoint_filepath,
+        )
+        print('replayed partitions: ', sorted(new_partitions))
+        return res
 
+    @classmethod
+    def _replay_deals(
+            cls,
+            goods_sno: int,
+            replayer: RevisionReplayer,
+            deals: list[RawCsvDeal],
+    ) -> Iterator[tuple[int, GoodsSnapshot, RawCsvDeal]]:
+        '''
+        Yields a snapshot of the goods state after every deal, together with the deal row itself.
+        '''
+        ctx: GoodsContext = replayer.context
+        deals: list[RawCsvDeal] = sorted(deals, key=lambda x: x.transaction_time)
+        for deal in deals:
+            replayer.apply(deal=deal)
+            yield goods_sno, ctx.snapshot(), deal
+
+    @classmethod
+    def replay_states(cls, goods_sno: int, data: PreparedData) -> Iterator[tuple[datetime, GoodsSnapshot]]:
+        '''
+        The replay of create_revision2, also advanced at every option, platform consumer and adj event time, so
+        the changes between deals are seen too. Yields the time and the snapshot after every step; at the same
+        transaction_time the deals go first, like the cursors of RevisionReplayer.apply do.
+        '''
+        replayer: RevisionReplayer = RevisionReplayer(goods_sno=goods_sno, data=data)
+        ctx: GoodsContext = replayer.context
+        deals: list[RawCsvDeal] = sorted(data.deal_map.get(goods_sno, []), key=lambda x: x.transaction_time)
+        event_times: list[datetime] = sorted({
+            row.transaction_time
+            for rows in (replayer.options, replayer.platform_consumers, replayer.adjs)
+            for row in rows
+        })
+        steps: Iterator[tuple[datetime, RawCsvDeal | None]] = merge(
+            ((deal.transaction_time, deal) for deal in deals),
+            ((changed_at, None) for changed_at in event_times),
+            key=lambda x: (x[0], x[1] is None),
+        )
+        for changed_at, deal in steps:
+            if deal is None:
+                replayer.advance(changed_at=changed_at)
+            else:
+                replayer.apply(deal=deal)
+            yield changed_at, ctx.snapshot()
+
+    @classmethod
+    def _check_prices(cls, states: Iterable[tuple[int, GoodsSnapshot, RawCsvDeal]]) -> list[EditRevision]:
+        '''
+        Keeps the replayed states whose thumbnail_price is wrong, checked by PriceKernel in batches.
+        '''
+        res: list[EditRevision] = []
+        states = iter(states)
+        while batch := list(islice(states, cls.PRICE_CHECK_BATCH_SIZE)):
+            RunMetrics.count('rows_in', len(batch))
+            # 계산
+            _, _, mispriced = PriceKernel.revision_check(
+                thumbnail_price=cls._column(batch=batch, name='thumbnail_price'),
+                consumer_origin=cls._column(batch=batch, name='consumer_origin'),
+                price_origin=cls._column(batch=batch, name='price_origin'),
+                platform_consumer=cls._column(batch=batch, name='platform_consumer'),
+                discount_price=cls._column(batch=batch, name='discount_price'),
+            )
+            for idx in np.flatnonzero(mispriced).tolist():
+                goods_sno, ctx, deal = batch[idx]
                 res.append(
                     EditRevision(
                         goods_sno=goods_sno,
-                        context=deepcopy(ctx),
-                        deal=deepcopy(deal),
+                        context=ctx,
+                        deal=deal,
                         transaction_time=deal.transaction_time,
                     )
                 )
+        RunMetrics.count('rows_out', len(res))
+        return res
+
+    @classmethod
+    def _column(cls, batch: list[tuple[int, GoodsSnapshot, RawCsvDeal]], name: str) -> np.ndarray:
+        return np.fromiter((getattr(ctx, name) for _, ctx, _ in batch), dtype=np.int64, count=len(batch))
+
+    @classmethod
+    def _load_checkpoint(cls, checkpoint_filepath: str) -> RevisionCheckpoint:
+        if not os.path.exists(checkpoint_filepath):
+            return RevisionCheckpoint(watermarks={}, goods={})
+        return CheckpointSerializer.deserialize(data=FileSaveHelper.read(filepath=checkpoint_filepath))
+
+    @classmethod
+    def _select_new_rows(cls, data: PreparedData, watermarks: dict[str, dict[str, datetime]]) -> PreparedData:
+        def select(name: str):
+            marks: dict[str, datetime] = watermarks.get(name, {})
+            if not marks:
+                return getattr(data, name)
+            selected: dict[int, list] = {}
+            for goods_sno, rows in getattr(data, name).items():
+                rows = [row for row in rows if row.dt not in marks or row.transaction_time > marks[row.dt]]
+                if rows:
+                    selected[goods_sno] = rows
+            return selected
+
+        return PreparedData(**{name: select(name) for name in cls.CHECKPOINT_SOURCES})
+
+    @classmethod
+    def create_revision2_parallel(
+            cls,
+            goods_sno_list: list[int],
+            deal_filepath: str,
+            option_filepath: str,
+            consumer_filepath: str,
+            adj_filepath: str,
+            workers: int,
+    ) -> list[EditRevision]:
+        '''
+        Same result, in the same order, as
+        create_revision2(PrepareRevisionService.prepare(goods_sno_list, ..., columnar=True)),
+        whose revisions come in ascending goods_sno order.
+
+        The ascending goods_sno_list is split into contiguous shards, every worker prepares its own shard from
+        the processed files and the shard results are concatenated in shard order.
+        '''
+        if not goods_sno_list:
+            goods_sno_list = cls._read_deal_goods(deal_filepath=deal_filepath)
+        goods_sno_list = sorted(set(goods_sno_list))
+        if not goods_sno_list:
+            return []
+
+        shard_count: int = max(1, min(len(goods_sno_list), workers * cls.SHARDS_PER_WORKER))
+        shard_size: int = -(-len(goods_sno_list) // shard_count)
+        shards: list[list[int]] = [
+            goods_sno_list[i:i + shard_size] for i in range(0, len(goods_sno_list), shard_size)
+        ]
+
+        res: list[EditRevision] = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for revisions, counters in executor.map(
+                    cls._create_shard,
+                    shards,
+                    [deal_filepath] * len(shards),
+                    [option_filepath] * len(shards),
+                    [consumer_filepath] * len(shards),
+                    [adj_filepath] * len(shards),
+            ):
+                res.extend(revisions)
+                # rows_in, rows_out, rows_loaded and skipped_goods.* of the shard
+                RunMetrics.add_counts(counters=counters)
         return res
 
     @classmethod
-    def _apply_revision2(
+    def _create_shard(
             cls,
-            context: GoodsContext,
-            data: PreparedData,
-            deal: RawCsvDeal,
-            changed_at: datetime,
-    ) -> None:
-        if deal.is_enabled and (deal.operation_type == 'c' or deal.operation_type == 'u'):
-            context.thumbnail_price = deal.thumbnail_price
-        else:
-            context.goods_sno = -1
-
-        if context.goods_sno in data.option_map:
-            options = sorted(data.option_map[context.goods_sno], key=lambda x: x.transaction_time)
-            while options and options[0].transaction_time <= changed_at:
-                opt: RawCsvGoodsOption = options.pop(0)
-                if opt.operation_type == 'c' or opt.operation_type == 'u':
-                    context.price_origin = opt.price_origin
-                    context.consumer_origin = opt.consumer_origin
-                    context.total_additional_price = opt.total_additional_price
-
-                elif opt.operation_type == 'd':
-                    context.goods_sno = -1
-
-        if context.goods_sno in data.platform_consumer_map:
-            platform_consumers = sorted(data.platform_consumer_map[context.goods_sno], key=lambda x: x.transaction_time)
-            while platform_consumers and platform_consumers[0].transaction_time <= changed_at:
-                pc: RawCsvPlatformConsumer = platform_consumers.pop(0)
-                if pc.operation_type == 'c' or pc.operation_type == 'u':
-                    context.platform_consumer = pc.consumer_origin
-                    context.platform_total_additional_price = pc.total_additional_price
-
-                elif pc.operation_type == 'd':
-                    context.goods_sno = -1
-
-        if context.goods_sno in data.adj_map:
-            adjs = sorted(data.adj_map[context.goods_sno], key=lambda x: x.transaction_time)
-            while adjs and adjs[0].transaction_time <= changed_at:
-                adj: RawCsvAdj = adjs.pop(0)
-                if adj.operation_type == 'c' or adj.operation_type == 'u':
-                    context.discount_type = adj.discount_type
-                    context.discount_price = adj.discount_price
-                    context.started_at = adj.started_at
-                    context.ended_at = adj.ended_at
-
-                elif adj.operation_type == 'd':
-                    context.goods_sno = -1
+            goods_sno_list: list[int],
+            deal_filepath: str,
+            option_filepath: str,
+            consumer_filepath: str,
+            adj_filepath: str,
+    ) -> tuple[list[EditRevision], dict[str, int]]:
+        with RunMetrics.worker_counts() as counters:
+            data: PreparedData = PrepareRevisionService.prepare(
+                goods_sno_list=goods_sno_list,
+                deal_filepath=deal_filepath,
+                option_filepath=option_filepath,
+                consumer_filepath=consumer_filepath,
+                adj_filepath=adj_filepath,
+                columnar=True,
+            )
+            revisions: list[EditRevision] = cls.create_revision2(data=data)
+        return revisions, counters
+
+    @classmethod
+    def _read_deal_goods(cls, deal_filepath: str) -> list[int]:
+        goods_sno_list: list[int] | None = RawCsvCodec.read_goods(filepath=deal_filepath)
+        if goods_sno_list is None:
+            goods_sno_list = list(DealSerializer.load(filepath=deal_filepath).keys())
+        return goods_sno_list
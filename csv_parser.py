@@ -1,24 +1,159 @@
 import csv
 from datetime import datetime
 from io import StringIO
-
-import pytz
+from typing import Collection, Iterable, Iterator
 
 from src.model.raw_csv import RawCsvGoodsOption, RawCsvPolicy, RawCsvDeal, RawCsvAdj, RawCsvPlatformConsumer
+from timestamp_parser import TimestampParser
 
 
 class CsvParser:
+    # (goods_sno column, market_sno column) of every table, deals and platform consumers have no market_sno
+    POLICY_KEYS: tuple[int, int | None] = (6, 5)
+    DEAL_KEYS: tuple[int, int | None] = (1, None)
+    OPTION_KEYS: tuple[int, int | None] = (1, 0)
+    ADJ_KEYS: tuple[int, int | None] = (1, 0)
+    PLATFORM_CONSUMER_KEYS: tuple[int, int | None] = (1, None)
+
     @classmethod
     def parse_raw_goods(cls, line: str) -> int:
         columns: list[str] = cls._parse_columns(line=line)
         goods_sno: int = int(columns[0])
         return goods_sno
 
+    @classmethod
+    def parse_policies(
+            cls,
+            lines: Iterable[str],
+            goods_filter: Collection[int] | None = None,
+            market_filter: Collection[int] | None = None,
+    ) -> Iterator[RawCsvPolicy]:
+        '''
+        Decodes a whole policy table with a single csv.reader over a file, a chunk or CsvReader.stream.
+        With a goods and/or market filter only the matching records are decoded, see select_records.
+        '''
+        lines = cls.select_records(lines, cls.POLICY_KEYS, goods_filter, market_filter)
+        return (cls._decode_policy(columns=columns) for columns in csv.reader(lines) if columns)
+
+    @classmethod
+    def parse_deals(
+            cls,
+            lines: Iterable[str],
+            goods_filter: Collection[int] | None = None,
+            market_filter: Collection[int] | None = None,
+    ) -> Iterator[RawCsvDeal]:
+        lines = cls.select_records(lines, cls.DEAL_KEYS, goods_filter, market_filter)
+        return (cls._decode_deal(columns=columns) for columns in csv.reader(lines) if columns)
+
+    @classmethod
+    def parse_options(
+            cls,
+            lines: Iterable[str],
+            goods_filter: Collection[int] | None = None,
+            market_filter: Collection[int] | None = None,
+    ) -> Iterator[RawCsvGoodsOption]:
+        lines = cls.select_records(lines, cls.OPTION_KEYS, goods_filter, market_filter)
+        return (cls._decode_option(columns=columns) for columns in csv.reader(lines) if columns)
+
+    @classmethod
+    def parse_adjs(
+            cls,
+            lines: Iterable[str],
+            goods_filter: Collection[int] | None = None,
+            market_filter: Collection[int] | None = None,
+    ) -> Iterator[RawCsvAdj]:
+        lines = cls.select_records(lines, cls.ADJ_KEYS, goods_filter, market_filter)
+        return (cls._decode_adj(columns=columns) for columns in csv.reader(lines) if columns)
+
+    @classmethod
+    def parse_platform_consumers(
+            cls,
+            lines: Iterable[str],
+            goods_filter: Collection[int] | None = None,
+            market_filter: Collection[int] | None = None,
+    ) -> Iterator[RawCsvPlatformConsumer]:
+        lines = cls.select_records(lines, cls.PLATFORM_CONSUMER_KEYS, goods_filter, market_filter)
+        return (cls._decode_platform_consumer(columns=columns) for columns in csv.reader(lines) if columns)
+
+    @classmethod
+    def select_records(
+            cls,
+            lines: Iterable[str],
+            keys: tuple[int, int | None],
+            goods_filter: Collection[int] | None,
+            market_filter: Collection[int] | None,
+    ) -> Iterable[str]:
+        '''
+        Keeps the records whose goods_sno is in goods_filter and market_sno in market_filter, a None filter
+        keeps everything. Only the key columns of a record are split out, before any csv or timestamp decoding.
+
+        Lines are joined into records by quote parity, so a quoted field with newlines stays in its record.
+        The market filter does not apply to tables without a market_sno column.
+        '''
+        goods_column, market_column = keys
+        if market_column is None:
+            market_filter = None
+        if goods_filter is None and market_filter is None:
+            return lines
+
+        last_column: int = max(goods_column, market_column or 0)
+
+        def matches(record: str) -> bool:
+            columns: list[str] = record.split(',', last_column + 1)
+            if len(columns) <= last_column:
+                # blank or short records are left to csv.reader and the decoder
+                return True
+            if any('"' in column for column in columns[:last_column + 1]):
+                columns = next(csv.reader([record]))
+            if goods_filter is not None and cls._parse_key(columns[goods_column]) not in goods_filter:
+                return False
+            return market_filter is None or cls._parse_key(columns[market_column]) in market_filter
+
+        def select() -> Iterator[str]:
+            pending: list[str] = []
+            quotes: int = 0
+            for line in lines:
+                quotes += line.count('"')
+                if quotes % 2:
+                    pending.append(line)
+                    continue
+                if pending:
+                    pending.append(line)
+                    line = ''.join(pending)
+                    pending = []
+                quotes = 0
+                if matches(record=line):
+                    yield line
+            if pending:
+                # an unterminated quote at the end, csv.reader reports it like without a filter
+                yield ''.join(pending)
+
+        return select()
+
     @classmethod
     def parse_raw_policy(cls, line: str) -> RawCsvPolicy:
+        return cls._decode_policy(columns=cls._parse_columns(line=line))
+
+    @classmethod
+    def parse_raw_deal(cls, line: str) -> RawCsvDeal:
+        return cls._decode_deal(columns=cls._parse_columns(line=line))
+
+    @classmethod
+    def parse_raw_option(cls, line: str) -> RawCsvGoodsOption:
+        return cls._decode_option(columns=cls._parse_columns(line=line))
+
+    @classmethod
+    def parse_raw_adj(cls, line: str) -> RawCsvAdj:
+        return cls._decode_adj(columns=cls._parse_columns(line=line))
+
+    @classmethod
+    def parse_raw_platform_consumer(cls, line: str) -> RawCsvPlatformConsumer:
+        return cls._decode_platform_consumer(columns=cls._parse_columns(line=line))
+
+    @classmethod
+    def _decode_policy(cls, columns: list[str]) -> RawCsvPolicy:
         '''
         '''
-        columns: list[str] = cls._parse_columns(line=line)
         is_active: bool = columns[0] == "true"
         status: int = int(columns[1])
         pricing_strategy: int = int(columns[2])
@@ -49,8 +184,7 @@ class CsvParser:
         )
 
     @classmethod
-    def parse_raw_deal(cls, line: str) -> RawCsvDeal:
-        columns: list[str] = [raw_val[1:-1] for raw_val in line.split(',')]
+    def _decode_deal(cls, columns: list[str]) -> RawCsvDeal:
         sno: int = int(columns[0])
         goods_sno: int = int(columns[1])
         goods_discount_policy_sno: int = int(columns[2])
@@ -71,10 +205,9 @@ class CsvParser:
         )
 
     @classmethod
-    def parse_raw_option(cls, line: str) -> RawCsvGoodsOption:
+    def _decode_option(cls, columns: list[str]) -> RawCsvGoodsOption:
         '''
         '''
-        columns: list[str] = cls._parse_columns(line=line)
         market_sno: int = int(columns[0]) if columns[0] else 0
         goods_sno: int = int(columns[1]) if columns[1] else 0
         option_sno: int = int(columns[2])
@@ -101,8 +234,7 @@ class CsvParser:
         )
 
     @classmethod
-    def parse_raw_adj(cls, line: str) -> RawCsvAdj:
-        columns: list[str] = cls._parse_columns(line=line)
+    def _decode_adj(cls, columns: list[str]) -> RawCsvAdj:
         market_sno: int = int(columns[0])
         goods_sno: int = int(columns[1])
         discount_type: int = int(columns[2])
@@ -125,8 +257,7 @@ class CsvParser:
         )
 
     @classmethod
-    def parse_raw_platform_consumer(cls, line: str) -> RawCsvPlatformConsumer:
-        columns: list[str] = cls._parse_columns(line=line)
+    def _decode_platform_consumer(cls, columns: list[str]) -> RawCsvPlatformConsumer:
         sno: int = int(columns[0])
         goods_sno: int = int(columns[1])
         consumer_origin: int = int(columns[2])
@@ -146,43 +277,24 @@ class CsvParser:
             dt=dt,
         )
 
+    @classmethod
+    def _parse_key(cls, value: str) -> int:
+        # empty key columns decode to 0, like in _decode_policy and _decode_option
+        return int(value) if value else 0
+
     @classmethod
     def _parse_timestamp(cls, timestamp_str: str) -> datetime:
         """
         Parse a timestamp string in format '2025-01-07 00:00:01.000 Asia/Seoul' to datetime
         """
-        if not timestamp_str:
-            return datetime(1970, 1, 1)
-
-        try:
-            dt_string, tz_string = timestamp_str.rsplit(" ", 1)
-            dt = datetime.strptime(dt_string, "%Y-%m-%d %H:%M:%S.%f")
-            timezone = pytz.timezone(tz_string)
-            dt_with_tz = timezone.localize(dt)
-            return datetime(
-                year=dt_with_tz.year,
-                month=dt_with_tz.month,
-                day=dt_with_tz.day,
-                hour=dt_with_tz.hour,
-                minute=dt_with_tz.minute,
-                second=dt_with_tz.second,
-                microsecond=dt_with_tz.microsecond,
-            )
-
-        except ValueError as e:
-            raise ValueError(f"Failed to parse timestamp: {e}")
+        return TimestampParser.parse_timestamp(timestamp_str=timestamp_str)
 
     @classmethod
     def _parse_datetime_with_tz(cls, dt_string: str) -> datetime:
         """
         Parse a datetime string in the format '9999-12-31 23:59:59.000 Asia/Seoul'
         """
-        if not dt_string:
-            return datetime(1970, 1, 1)
-
-        dt_part, _ = dt_string.rsplit(' ', 1)
-        dt = datetime.strptime(dt_part, '%Y-%m-%d %H:%M:%S.%f')
-        return dt
+        return TimestampParser.parse_datetime_with_tz(dt_string=dt_string)
 
     @classmethod
     def _parse_columns(cls, line: str) -> list[str]:
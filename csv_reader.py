@@ -1,3 +1,12 @@
+import os
+from itertools import islice
+from typing import Iterator
+
+from run_metrics import RunMetrics
+
+BLOCK_SIZE: int = 1 << 20
+
+
 class CsvReader:
     @classmethod
     def read(cls, filepath: str, limit: int | None) -> list[str]:
@@ -7,3 +16,82 @@ class CsvReader:
             if limit is None:
                 return lines[1:]
             return lines[1:limit + 1]
+
+    @classmethod
+    def stream(cls, filepath: str, limit: int | None) -> Iterator[str]:
+        '''
+        Yields lines lazily, skipping the header and stopping after `limit` rows.
+        '''
+        with open(filepath, newline='') as f:
+            print('filepath: ', filepath)
+            try:
+                yield from islice(f, 1, None if limit is None else limit + 1)
+            finally:
+                # position of the underlying buffer, it is at most one read-ahead block past the last line
+                RunMetrics.count('bytes_read', f.buffer.tell())
+
+    @classmethod
+    def chunk_ranges(cls, filepath: str, chunk_bytes: int) -> list[tuple[int, int]]:
+        '''
+        Splits the file after its header into byte ranges of roughly `chunk_bytes`.
+        Every range starts at a record boundary: a newline outside of a quoted field,
+        so records with quoted newlines are never cut in half.
+        '''
+        size: int = os.path.getsize(filepath)
+        with open(filepath, 'rb') as f:
+            begin: int = len(f.readline())
+            ranges: list[tuple[int, int]] = []
+            while begin < size:
+                end: int = cls._next_record_boundary(f=f, begin=begin, target=begin + chunk_bytes, size=size)
+                ranges.append((begin, end))
+                begin = end
+            return ranges
+
+    @classmethod
+    def stream_range(cls, filepath: str, begin: int, end: int) -> Iterator[str]:
+        '''
+        Yields the lines of the byte range [begin, end) produced by chunk_ranges.
+        '''
+        with open(filepath, 'rb') as f:
+            f.seek(begin)
+            remaining: int = end - begin
+            try:
+                for raw_line in f:
+                    if remaining <= 0:
+                        break
+                    remaining -= len(raw_line)
+                    yield raw_line.decode('utf-8')
+            finally:
+                RunMetrics.count('bytes_read', end - begin - max(remaining, 0))
+
+    @classmethod
+    def _next_record_boundary(cls, f, begin: int, target: int, size: int) -> int:
+        if target >= size:
+            return size
+
+        # `begin` is a record boundary, so the quote parity there is even
+        quotes: int = 0
+        f.seek(begin)
+        remaining: int = target - begin
+        while remaining > 0:
+            block: bytes = f.read(min(BLOCK_SIZE, remaining))
+            quotes += block.count(b'"')
+            remaining -= len(block)
+
+        position: int = target
+        while True:
+            block: bytes = f.read(BLOCK_SIZE)
+            if not block:
+                return size
+
+            start: int = 0
+            while True:
+                newline: int = block.find(b'\n', start)
+                if newline < 0:
+                    quotes += block.count(b'"', start)
+                    break
+                quotes += block.count(b'"', start, newline)
+                if quotes % 2 == 0:
+                    return position + newline + 1
+                start = newline + 1
+            position += len(block)
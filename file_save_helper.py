@@ -1,10 +1,16 @@
+from run_metrics import RunMetrics
+
+
 class FileSaveHelper:
     @classmethod
     def save(cls, data: bytes, filepath: str) -> None:
         with open(filepath, 'wb') as f:
             f.write(data)
+        RunMetrics.count('bytes_written', len(data))
 
     @classmethod
     def read(cls, filepath: str) -> bytes:
         with open(filepath, 'rb') as f:
-            return f.read()
+            data: bytes = f.read()
+        RunMetrics.count('bytes_read', len(data))
+        return data
@@ -0,0 +1,171 @@
+import argparse
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterable, Iterator
+
+from adj_serializer import AdjSerializer
+from csv_parser import CsvParser
+from csv_reader import CsvReader
+from deal_serializer import DealSerializer
+from file_save_helper import FileSaveHelper
+from option_serializer import OptionSerializer
+from platform_consumer_serializer import PlatformConsumerSerializer
+from policy_serializer import PolicySerializer
+from run_metrics import RunMetrics
+from src.model.event_table import EventTable, OptionTable, PolicyTable, DealTable, AdjTable, PlatformConsumerTable
+from src.model.ingest_source import IngestSource
+from timeline_compactor import TimelineCompactor
+
+SOURCES: list[IngestSource] = [
+    IngestSource(
+        name='option',
+        csv_filepath='data/options_250107_250113.csv',
+        output_filepath='data/processed/option_map.msgpack',
+    ),
+    IngestSource(
+        name='policy',
+        csv_filepath='data/policies_250107_250113.csv',
+        output_filepath='data/processed/policy_map.msgpack',
+    ),
+    IngestSource(
+        name='deal',
+        csv_filepath='data/deals.csv',
+        output_filepath='data/processed/deal_map.msgpack',
+    ),
+    IngestSource(
+        name='adj',
+        csv_filepath='data/adj_250107_250113.csv',
+        output_filepath='data/processed/adj_map.msgpack',
+    ),
+    IngestSource(
+        name='platform_consumer',
+        csv_filepath='data/consumer_250107_250113.csv',
+        output_filepath='data/processed/consumer_map.msgpack',
+    ),
+]
+
+
+class IngestService:
+    '''
+    Parses the CDC sources concurrently in a process pool.
+    Each CSV is split into byte-range chunks aligned to record boundaries, every chunk is grouped by goods_sno
+    in a worker, and the per-chunk tables are merged in file order into the same data/processed outputs.
+    The option, platform consumer and adj timelines are compacted by TimelineCompactor before they are saved.
+    '''
+    PARSERS: dict[str, Callable[[Iterable[str]], Iterator]] = {
+        'option': CsvParser.parse_options,
+        'policy': CsvParser.parse_policies,
+        'deal': CsvParser.parse_deals,
+        'adj': CsvParser.parse_adjs,
+        'platform_consumer': CsvParser.parse_platform_consumers,
+    }
+    TABLES: dict[str, type[EventTable]] = {
+        'option': OptionTable,
+        'policy': PolicyTable,
+        'deal': DealTable,
+        'adj': AdjTable,
+        'platform_consumer': PlatformConsumerTable,
+    }
+    SERIALIZERS: dict[str, type] = {
+        'option': OptionSerializer,
+        'policy': PolicySerializer,
+        'deal': DealSerializer,
+        'adj': AdjSerializer,
+        'platform_consumer': PlatformConsumerSerializer,
+    }
+
+    @classmethod
+    def ingest(
+            cls,
+            sources: list[IngestSource],
+            workers: int,
+            chunk_bytes: int,
+            goods_filter: set[int] | None = None,
+            market_filter: set[int] | None = None,
+    ) -> None:
+        '''
+        With a goods and/or market filter only the matching rows are decoded and saved,
+        see CsvParser.select_records.
+        '''
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures: dict[str, list[Future]] = {
+                source.name: [
+                    executor.submit(
+                        cls._parse_chunk, source.name, source.csv_filepath, begin, end, goods_filter, market_filter,
+                    )
+                    for begin, end in CsvReader.chunk_ranges(filepath=source.csv_filepath, chunk_bytes=chunk_bytes)
+                ]
+                for source in sources
+            }
+            # the chunks of all sources run concurrently, so the wall time of a source includes its wait
+            # for the pool and its CPU time includes whatever the workers did meanwhile
+            for source in sources:
+                with RunMetrics.stage(f'ingest_{source.name}'):
+                    print(f'{source.name}: {len(futures[source.name])} chunks')
+                    table: EventTable = cls.TABLES[source.name].concat(
+                        tables=[future.result() for future in futures[source.name]]
+                    )
+                    print(f'{source.name}: {table.row_count} rows, {len(table)} goods')
+                    # the chunk workers make no counts, the merged table holds every row they parsed
+                    RunMetrics.count('bytes_read', os.path.getsize(source.csv_filepath))
+                    RunMetrics.count('rows_in', table.row_count)
+                    if type(table) in TimelineCompactor.STATE_COLUMNS:
+                        with RunMetrics.stage('compact'):
+                            table = TimelineCompactor.compact(table=table)
+                        print(f'{source.name}: {table.row_count} rows after compaction')
+                    RunMetrics.count('rows_out', table.row_count)
+                    with RunMetrics.stage('serialize'):
+                        data: bytes = cls.SERIALIZERS[source.name].serialize(raw_map=table)
+                    with RunMetrics.stage('write'):
+                        FileSaveHelper.save(data=data, filepath=source.output_filepath)
+
+    @classmethod
+    def _parse_chunk(
+            cls,
+            source_name: str,
+            filepath: str,
+            begin: int,
+            end: int,
+            goods_filter: set[int] | None,
+            market_filter: set[int] | None,
+    ) -> EventTable:
+        lines: Iterator[str] = CsvReader.stream_range(filepath=filepath, begin=begin, end=end)
+        return cls.TABLES[source_name].from_rows(
+            rows=cls.PARSERS[source_name](lines, goods_filter=goods_filter, market_filter=market_filter),
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parse the CDC exports into data/processed in parallel.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-mb', type=int, default=64)
+    parser.add_argument('--source', action='append', choices=[source.name for source in SOURCES])
+    parser.add_argument('--goods-file', default=None, help='ingest only the goods of this csv (goods.csv layout)')
+    parser.add_argument(
+        '--market',
+        action='append',
+        default=[],
+        help='ingest only these market_sno, repeatable and "|" separated like the logcli query',
+    )
+    parser.add_argument('--metrics-report', default='data/out/run_report_ingest.json', help='JSON report of the stages')
+    parser.add_argument('--prometheus-textfile', default=None, help='also write the stage metrics as a .prom file')
+    args = parser.parse_args()
+
+    begin_time: datetime = datetime.now()
+    with RunMetrics(run_name='ingest') as metrics:
+        try:
+            IngestService.ingest(
+                sources=[source for source in SOURCES if not args.source or source.name in args.source],
+                workers=args.workers,
+                chunk_bytes=args.chunk_mb << 20,
+                goods_filter=None if args.goods_file is None else {
+                    CsvParser.parse_raw_goods(line=line)
+                    for line in CsvReader.stream(filepath=args.goods_file, limit=None)
+                },
+                market_filter={int(market_sno) for value in args.market for market_sno in value.split('|')} or None,
+            )
+        finally:
+            metrics.save(report_filepath=args.metrics_report, textfile_filepath=args.prometheus_textfile)
+            print('metrics report: ', args.metrics_report)
+    print('elapsed time: ', datetime.now() - begin_time)
@@ -1,7 +1,8 @@
+import argparse
 import json
-from collections import defaultdict
+from contextlib import ExitStack
 from datetime import datetime
-from itertools import islice
+from typing import Callable, Iterator
 
 from create_revision import CreateRevisionService
 from merged_goods_serializer import MergedGoodsSerializer
@@ -12,11 +13,19 @@ from csv_reader import CsvReader
 from deal_serializer import DealSerializer
 from file_save_helper import FileSaveHelper
 from option_serializer import OptionSerializer
+from pipeline_runner import PipelineRunner
 from policy_serializer import PolicySerializer
 from prepare_revision import PrepareRevisionService
 from revision_serializer import RevisionSerializer
+from revision_replay import RevisionReplayer
+from run_metrics import RunMetrics
+from run_profiler import RunProfiler
+from timeline_compactor import TimelineCompactor
 from src.model.Revision import Revision
 from src.model.edit_revision import EditRevision
+from src.model.event_table import EventTable, OptionTable, PolicyTable, DealTable, PlatformConsumerTable, AdjTable
+from src.model.goods_set import GoodsSet
+from src.model.pipeline_stage import PipelineStage
 from src.model.prepared_data import PreparedData
 from src.model.raw_csv import RawCsvGoodsOption, RawCsvPolicy, RawCsvDeal, RawCsvPlatformConsumer, RawCsvAdj
 
@@ -35,51 +44,65 @@ output:
 3. group by {goods_option_sno: Rev(consumer_origin, price_origin)}
 '''
 
-print('program starts..')
-
 
 def process_goods(limit: int | None) -> None:
     goods_list: list[int] = [
         CsvParser.parse_raw_goods(line=line) for line in
-        CsvReader.read(filepath='data/goods.csv', limit=limit)
+        CsvReader.stream(filepath='data/goods.csv', limit=limit)
     ]
     pass
 
 
-def process_options(limit: int | None) -> None:
-    # 1. parse the csv file
-    options: list[RawCsvGoodsOption] = [
-        CsvParser.parse_raw_option(line=line) for line in
-        CsvReader.read(filepath='data/options_250107_250113.csv', limit=limit)
-    ]
+def parse_table(table_type: type[EventTable], rows: Iterator) -> EventTable:
+    with RunMetrics.stage('parse'):
+        table: EventTable = table_type.from_rows(rows=rows)
+        RunMetrics.count('rows_in', table.row_count)
+        return table
+
+
+def compact_table(table: EventTable) -> EventTable:
+    with RunMetrics.stage('compact'):
+        compacted: EventTable = TimelineCompactor.compact(table=table)
+        RunMetrics.count('rows_out', compacted.row_count)
+        return compacted
+
+
+def save_map(raw_map, serializer: type, filepath: str) -> None:
+    with RunMetrics.stage('serialize'):
+        serialized_data: bytes = serializer.serialize(raw_map=raw_map)
+    with RunMetrics.stage('write'):
+        FileSaveHelper.save(data=serialized_data, filepath=filepath)
+
 
-    # 2. group by goods_sno
-    option_map: dict[int, list[RawCsvGoodsOption]] = defaultdict(list)
-    for opt in options:
-        option_map[opt.goods_sno].append(opt)
+def process_options(limit: int | None, goods_filter: set[int] | None, market_filter: set[int] | None) -> None:
+    # 1. parse the csv file and 2. group by goods_sno into columns as rows arrive
+    lines: Iterator[str] = CsvReader.stream(filepath='data/options_250107_250113.csv', limit=limit)
+    option_map: OptionTable = parse_table(table_type=OptionTable, rows=CsvParser.parse_options(
+        lines=lines,
+        goods_filter=goods_filter,
+        market_filter=market_filter,
+    ))
+    option_map = compact_table(table=option_map)
 
     # 3. save
-    serialized_data: bytes = OptionSerializer.serialize(raw_map=option_map)
-    FileSaveHelper.save(data=serialized_data, filepath='data/processed/option_map.msgpack')
+    save_map(raw_map=option_map, serializer=OptionSerializer, filepath='data/processed/option_map.msgpack')
 
     # serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/option_map.msgpack')
     # deserialized_map: dict[int, list[RawCsvGoodsOption]] = OptionSerializer.deserialize_option(data=serialized_data)
     # print('deserialized_map: ', len(deserialized_map))
 
 
-def process_policies(limit: int | None) -> None:
-    # 1. parse the csv file
-    policies: list[RawCsvPolicy] = [
-        CsvParser.parse_raw_policy(line=line) for line in
-        CsvReader.read(filepath='data/policies_250107_250113.csv', limit=limit)
-    ]
-    policy_map: dict[int, list[RawCsvPolicy]] = defaultdict(list)
-    for policy in policies:
-        policy_map[policy.goods_sno].append(policy)
+def process_policies(limit: int | None, goods_filter: set[int] | None, market_filter: set[int] | None) -> None:
+    # 1. parse the csv file and 2. group by goods_sno into columns as rows arrive
+    lines: Iterator[str] = CsvReader.stream(filepath='data/policies_250107_250113.csv', limit=limit)
+    policy_map: PolicyTable = parse_table(table_type=PolicyTable, rows=CsvParser.parse_policies(
+        lines=lines,
+        goods_filter=goods_filter,
+        market_filter=market_filter,
+    ))
 
     # 3. save
-    serialized_data: bytes = PolicySerializer.serialize(raw_map=policy_map)
-    FileSaveHelper.save(data=serialized_data, filepath='data/processed/policy_map.msgpack')
+    save_map(raw_map=policy_map, serializer=PolicySerializer, filepath='data/processed/policy_map.msgpack')
 
     # serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/policy_map.msgpack')
     # deserialized_map: dict[int, list[RawCsvPolicy]] = PolicySerializer.deserialize(data=serialized_data)
@@ -88,19 +111,17 @@ def process_policies(limit: int | None) -> None:
     #         print('policy ', policy)
 
 
-def process_deals(limit: int | None) -> None:
-    # 1. parse the csv file
-    deals: list[RawCsvDeal] = [
-        CsvParser.parse_raw_deal(line=line) for line in
-        CsvReader.read(filepath='data/deals.csv', limit=limit)
-    ]
-    deal_map: dict[int, list[RawCsvDeal]] = defaultdict(list)
-    for deal in deals:
-        deal_map[deal.goods_sno].append(deal)
+def process_deals(limit: int | None, goods_filter: set[int] | None, market_filter: set[int] | None) -> None:
+    # 1. parse the csv file and 2. group by goods_sno into columns as rows arrive
+    lines: Iterator[str] = CsvReader.stream(filepath='data/deals.csv', limit=limit)
+    deal_map: DealTable = parse_table(table_type=DealTable, rows=CsvParser.parse_deals(
+        lines=lines,
+        goods_filter=goods_filter,
+        market_filter=market_filter,
+    ))
 
     # 3. save
-    serialized_data: bytes = DealSerializer.serialize(raw_map=deal_map)
-    FileSaveHelper.save(data=serialized_data, filepath='data/processed/deal_map.msgpack')
+    save_map(raw_map=deal_map, serializer=DealSerializer, filepath='data/processed/deal_map.msgpack')
 
     # serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/deal_map.msgpack')
     # deserialized_map: dict[int, list[RawCsvPolicy]] = DealSerializer.deserialize(data=serialized_data)
@@ -109,41 +130,46 @@ def process_deals(limit: int | None) -> None:
     #         print('policy ', policy)
 
 
-def process_platform_consumers(limit: int | None) -> None:
-    # 1. parse the csv file
-    platform_consumers: list[RawCsvPlatformConsumer] = [
-        CsvParser.parse_raw_platform_consumer(line=line) for line in
-        CsvReader.read(filepath='data/consumer_250107_250113.csv', limit=limit)
-    ]
-    consumer_map: dict[int, list[RawCsvPlatformConsumer]] = defaultdict(list)
-    for obj in platform_consumers:
-        consumer_map[obj.goods_sno].append(obj)
+def process_platform_consumers(
+        limit: int | None,
+        goods_filter: set[int] | None,
+        market_filter: set[int] | None,
+) -> None:
+    # 1. parse the csv file and 2. group by goods_sno into columns as rows arrive
+    lines: Iterator[str] = CsvReader.stream(filepath='data/consumer_250107_250113.csv', limit=limit)
+    consumer_map: PlatformConsumerTable = parse_table(
+        table_type=PlatformConsumerTable,
+        rows=CsvParser.parse_platform_consumers(lines=lines, goods_filter=goods_filter, market_filter=market_filter),
+    )
+    consumer_map = compact_table(table=consumer_map)
 
     # 3. save
-    serialized_data: bytes = PlatformConsumerSerializer.serialize(raw_map=consumer_map)
-    FileSaveHelper.save(data=serialized_data, filepath='data/processed/consumer_map.msgpack')
-
-    serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/consumer_map.msgpack')
-    deserialized_map: dict[int, list[RawCsvPlatformConsumer]] = PlatformConsumerSerializer.deserialize(
-        data=serialized_data)
-    for k, v in deserialized_map.items():
-        for plat in v:
-            print('plat: ', plat)
-
-
-def process_adjs(limit: int | None) -> None:
-    # 1. parse the csv file
-    adjs: list[RawCsvAdj] = [
-        CsvParser.parse_raw_adj(line=line) for line in
-        CsvReader.read(filepath='data/adj_250107_250113.csv', limit=limit)
-    ]
-    adj_map: dict[int, list[RawCsvAdj]] = defaultdict(list)
-    for obj in adjs:
-        adj_map[obj.goods_sno].append(obj)
+    save_map(
+        raw_map=consumer_map,
+        serializer=PlatformConsumerSerializer,
+        filepath='data/processed/consumer_map.msgpack',
+    )
+
+    # serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/consumer_map.msgpack')
+    # deserialized_map: dict[int, list[RawCsvPlatformConsumer]] = PlatformConsumerSerializer.deserialize(
+    #     data=serialized_data)
+    # for k, v in deserialized_map.items():
+    #     for plat in v:
+    #         print('plat: ', plat)
+
+
+def process_adjs(limit: int | None, goods_filter: set[int] | None, market_filter: set[int] | None) -> None:
+    # 1. parse the csv file and 2. group by goods_sno into columns as rows arrive
+    lines: Iterator[str] = CsvReader.stream(filepath='data/adj_250107_250113.csv', limit=limit)
+    adj_map: AdjTable = parse_table(table_type=AdjTable, rows=CsvParser.parse_adjs(
+        lines=lines,
+        goods_filter=goods_filter,
+        market_filter=market_filter,
+    ))
+    adj_map = compact_table(table=adj_map)
 
     # 3. save
-    serialized_data: bytes = AdjSerializer.serialize(raw_map=adj_map)
-    FileSaveHelper.save(data=serialized_data, filepath='data/processed/adj_map.msgpack')
+    save_map(raw_map=adj_map, serializer=AdjSerializer, filepath='data/processed/adj_map.msgpack')
 
     # serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/adj_map.msgpack')
     # deserialized_map: dict[int, list[RawCsvAdj]] = AdjSerializer.deserialize(data=serialized_data)
@@ -152,115 +178,320 @@ def process_adjs(limit: int | None) -> None:
     #         print('adj: ', adj)
 
 
-LIMIT: int | None = None
-begin_time: datetime = datetime.now()
-# process_options(limit=LIMIT)
-# process_policies(limit=LIMIT)
-# process_deals(limit=LIMIT)
-# process_adjs(limit=LIMIT)
-# process_platform_consumers(limit=LIMIT)
-
-# goods_sno_list: list[int] = [
-#     CsvParser.parse_raw_goods(line=line) for line in
-#     CsvReader.read(filepath='data/goods.csv', limit=LIMIT)
-# ]
-# print('goods_list length: ', len(goods_list))
-
-# serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/consumer_map.msgpack')
-# deserialized_map: dict[int, list[RawCsvPlatformConsumer]] = PlatformConsumerSerializer.deserialize(data=serialized_data)
-
-
-
-# data: PreparedData = PrepareRevisionService.prepare(
-#     goods_sno_list=goods_sno_list,
-#     deal_filepath='data/processed/deal_map.msgpack',
-#     option_filepath='data/processed/option_map.msgpack',
-#     consumer_filepath='data/processed/consumer_map.msgpack',
-#     adj_filepath='data/processed/adj_map.msgpack',
-# )
-#
-# merged_goods_set: set[int] = (
-#         set(goods_sno_list)
-#         & set(data.deal_map.keys())
-#         & set(data.option_map.keys())
-#         & set(data.platform_consumer_map.keys())
-#         & set(data.adj_map.keys())
-# )
-# print('merged_goods_set: ', len(merged_goods_set))
-# print('saving merged_goods_set..')
-# FileSaveHelper.save(
-#     data=MergedGoodsSerializer.serialize(goods_sno=list(merged_goods_set)),
-#     filepath='data/processed/merged_goods.msgpack',
-# )
-#
-# print('saving adj_map..')
-# FileSaveHelper.save(
-#     data=AdjSerializer.serialize(raw_map=data.adj_map),
-#     filepath='data/processed/draft/adj_map.msgpack',
-# )
-#
-# print('saving consumer_map..')
-# FileSaveHelper.save(
-#     data=PlatformConsumerSerializer.serialize(raw_map=data.platform_consumer_map),
-#     filepath='data/processed/draft/consumer_map.msgpack',
-# )
-#
-# print('saving deal_map..')
-# FileSaveHelper.save(
-#     data=DealSerializer.serialize(raw_map=data.deal_map),
-#     filepath='data/processed/draft/deal_map.msgpack'
-# )
-#
-# print('saving option_map..')
-# FileSaveHelper.save(
-#     data=OptionSerializer.serialize(raw_map=data.option_map),
-#     filepath='data/processed/draft/option_map.msgpack',
-# )
-
-# serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/option_map.msgpack')
-# option_map: dict[int, list[RawCsvGoodsOption]] = OptionSerializer.deserialize_option(data=serialized_data)
-# print('option_map: ', len(option_map))
-
-# serialized_data: bytes = FileSaveHelper.read(filepath='data/processed/deal_map.msgpack')
-# deal_map: dict[int, list[RawCsvDeal]] = DealSerializer.deserialize(data=serialized_data)
-# deal_map: dict[int, list[RawCsvDeal]] = dict_slice(deal_map, start=0, stop=10)
-# selected_option_map: dict[int, list[RawCsvGoodsOption]] = {}
-# goods_sno_list: list[int] = list(deal_map.keys())
-# for goods_sno in goods_sno_list:
-#     selected_option_map[goods_sno] = option_map[goods_sno]
-
-# goods_sno_list: list[int] = MergedGoodsSerializer.deserialize(
-#     data=FileSaveHelper.read(filepath='data/processed/merged_goods.msgpack')
-# )
-# data: PreparedData = PrepareRevisionService.prepare(
-#     goods_sno_list=goods_sno_list,
-#     deal_filepath='data/processed/deal_map.msgpack',
-#     option_filepath='data/processed/option_map.msgpack',
-#     consumer_filepath='data/processed/consumer_map.msgpack',
-#     adj_filepath='data/processed/adj_map.msgpack',
-# )
-# revisions: list[EditRevision] = CreateRevisionService.create_revision2(data=data)
-# revision_bytes: bytes = RevisionSerializer.serialize(revisions=revisions)
-# FileSaveHelper.save(data=revision_bytes, filepath='data/out/revision.csv')
-#
-# print('revisions: ', revisions)
-# print('revisions len: ', len(revisions))
-# print('revisions goods_sno: ', [r.goods_sno for r in revisions])
-# print('revisions goods_sno len: ', len(set([r.goods_sno for r in revisions])))
-
-revision_bytes: bytes = FileSaveHelper.read(filepath='data/out/revision.csv')
-revisions: list[Revision] = RevisionSerializer.deserialize(data=revision_bytes)
-revision_goods_sno_list: list[int] = [r.goods_sno for r in revisions]
-json_bytes: bytes = json.dumps(revision_goods_sno_list, ensure_ascii=False).encode('utf-8')
-FileSaveHelper.save(
-    data=json_bytes,
-    filepath='data/out/revision_goods_sno_list.json',
-)
-print('revisions: ', [r.goods_sno for r in revisions])
-
-print('revisions len: ', len(revisions))
-print('revisions goods_sno: ', [r.goods_sno for r in revisions])
-print('revisions goods_sno len: ', len(set([r.goods_sno for r in revisions])))
-
-end_time: datetime = datetime.now()
-print('elapsed time: ', end_time - begin_time)
+def read_goods_sno_list(limit: int | None) -> list[int]:
+    return [
+        CsvParser.parse_raw_goods(line=line) for line in
+        CsvReader.stream(filepath='data/goods.csv', limit=limit)
+    ]
+
+
+def read_goods_filter(filepath: str | None) -> set[int] | None:
+    '''
+    goods_sno to ingest, from a csv in the data/goods.csv layout. None keeps every goods.
+    '''
+    if filepath is None:
+        return None
+    return {CsvParser.parse_raw_goods(line=line) for line in CsvReader.stream(filepath=filepath, limit=None)}
+
+
+def read_goods_set(limit: int | None) -> GoodsSet:
+    return GoodsSet.from_iterable(
+        CsvParser.parse_raw_goods(line=line) for line in
+        CsvReader.stream(filepath='data/goods.csv', limit=limit)
+    )
+
+
+def prepare(goods_sno_list: list[int]) -> PreparedData:
+    return PrepareRevisionService.prepare(
+        goods_sno_list=goods_sno_list,
+        deal_filepath='data/processed/deal_map.msgpack',
+        option_filepath='data/processed/option_map.msgpack',
+        consumer_filepath='data/processed/consumer_map.msgpack',
+        adj_filepath='data/processed/adj_map.msgpack',
+        columnar=True,
+    )
+
+
+def merge_goods(limit: int | None) -> None:
+    goods_set: GoodsSet = read_goods_set(limit=limit)
+    print('goods_list length: ', len(goods_set))
+    RunMetrics.count('rows_in', len(goods_set))
+    merged_goods_set: GoodsSet = PrepareRevisionService.merge_goods(
+        goods_set=goods_set,
+        deal_filepath='data/processed/deal_map.msgpack',
+        option_filepath='data/processed/option_map.msgpack',
+        consumer_filepath='data/processed/consumer_map.msgpack',
+        adj_filepath='data/processed/adj_map.msgpack',
+    )
+    print('merged_goods_set: ', len(merged_goods_set))
+    RunMetrics.count('rows_out', len(merged_goods_set))
+    print('saving merged_goods_set..')
+    with RunMetrics.stage('write'):
+        FileSaveHelper.save(
+            data=MergedGoodsSerializer.serialize(goods_set=merged_goods_set),
+            filepath='data/processed/merged_goods.msgpack',
+        )
+
+
+def save_drafts(limit: int | None) -> None:
+    data: PreparedData = prepare(goods_sno_list=read_goods_sno_list(limit=limit))
+
+    print('saving adj_map..')
+    with RunMetrics.stage('adj'):
+        save_map(raw_map=data.adj_map, serializer=AdjSerializer, filepath='data/processed/draft/adj_map.msgpack')
+
+    print('saving consumer_map..')
+    with RunMetrics.stage('platform_consumer'):
+        save_map(
+            raw_map=data.platform_consumer_map,
+            serializer=PlatformConsumerSerializer,
+            filepath='data/processed/draft/consumer_map.msgpack',
+        )
+
+    print('saving deal_map..')
+    with RunMetrics.stage('deal'):
+        save_map(raw_map=data.deal_map, serializer=DealSerializer, filepath='data/processed/draft/deal_map.msgpack')
+
+    print('saving option_map..')
+    with RunMetrics.stage('option'):
+        save_map(
+            raw_map=data.option_map,
+            serializer=OptionSerializer,
+            filepath='data/processed/draft/option_map.msgpack',
+        )
+
+
+def create_revisions(workers: int, incremental: bool) -> None:
+    goods_sno_list: list[int] = MergedGoodsSerializer.deserialize(
+        data=FileSaveHelper.read(filepath='data/processed/merged_goods.msgpack')
+    ).tolist()
+    if incremental:
+        # only the rows newer than the checkpoint are replayed, revision.csv gets the revisions of this run
+        data: PreparedData = prepare(goods_sno_list=goods_sno_list)
+        with RunMetrics.stage('create_revision'):
+            revisions: list[EditRevision] = CreateRevisionService.create_revision2_incremental(
+                data=data,
+                checkpoint_filepath=REVISION_CHECKPOINT,
+            )
+    elif workers > 1:
+        # every worker prepares its own shard of goods, the revisions are the same bytes as the serial run
+        with RunMetrics.stage('create_revision'):
+            revisions: list[EditRevision] = CreateRevisionService.create_revision2_parallel(
+                goods_sno_list=goods_sno_list,
+                deal_filepath='data/processed/deal_map.msgpack',
+                option_filepath='data/processed/option_map.msgpack',
+                consumer_filepath='data/processed/consumer_map.msgpack',
+                adj_filepath='data/processed/adj_map.msgpack',
+                workers=workers,
+            )
+    else:
+        data: PreparedData = prepare(goods_sno_list=goods_sno_list)
+        with RunMetrics.stage('create_revision'):
+            revisions: list[EditRevision] = CreateRevisionService.create_revision2(data=data)
+    with RunMetrics.stage('serialize'):
+        revision_bytes: bytes = RevisionSerializer.serialize(revisions=revisions)
+    with RunMetrics.stage('write'):
+        FileSaveHelper.save(data=revision_bytes, filepath='data/out/revision.csv')
+
+    print('revisions len: ', len(revisions))
+    print('revisions goods_sno len: ', len(set([r.goods_sno for r in revisions])))
+
+
+def save_revision_goods_sno_list() -> None:
+    revision_bytes: bytes = FileSaveHelper.read(filepath='data/out/revision.csv')
+    revisions: list[Revision] = RevisionSerializer.deserialize(data=revision_bytes)
+    revision_goods_sno_list: list[int] = [r.goods_sno for r in revisions]
+    json_bytes: bytes = json.dumps(revision_goods_sno_list, ensure_ascii=False).encode('utf-8')
+    FileSaveHelper.save(
+        data=json_bytes,
+        filepath='data/out/revision_goods_sno_list.json',
+    )
+
+    print('revisions len: ', len(revisions))
+    print('revisions goods_sno len: ', len(set(revision_goods_sno_list)))
+
+
+# call counts kept by --profile
+HOT_FUNCTIONS: list[tuple[type, str]] = [
+    (CsvParser, 'parse_raw_goods'),
+    (CsvParser, 'parse_raw_policy'),
+    (CsvParser, 'parse_raw_deal'),
+    (CsvParser, 'parse_raw_option'),
+    (CsvParser, 'parse_raw_adj'),
+    (CsvParser, 'parse_raw_platform_consumer'),
+    # the bulk parse_* decoders, they replaced parse_raw_* on the ingest path
+    (CsvParser, '_decode_policy'),
+    (CsvParser, '_decode_deal'),
+    (CsvParser, '_decode_option'),
+    (CsvParser, '_decode_adj'),
+    (CsvParser, '_decode_platform_consumer'),
+    (CsvParser, '_parse_timestamp'),
+    # _apply_revision2 became the per-deal apply and the per-source cursors of advance
+    (RevisionReplayer, 'apply'),
+    (RevisionReplayer, 'advance'),
+    (CreateRevisionService, '_check_prices'),
+]
+
+REVISION_CHECKPOINT: str = 'data/processed/revision_checkpoint.msgpack'
+PROCESSED_MAPS: list[str] = [
+    'data/processed/deal_map.msgpack',
+    'data/processed/option_map.msgpack',
+    'data/processed/consumer_map.msgpack',
+    'data/processed/adj_map.msgpack',
+]
+
+
+def build_stages(
+        limit: int | None,
+        goods_filter_filepath: str | None = None,
+        market_filter: set[int] | None = None,
+        workers: int = 1,
+        incremental: bool = False,
+) -> list[PipelineStage]:
+    # the limit and the filters are part of the fingerprints, without any the fingerprints stay as before.
+    # the code of a stage is main.py and what its function references, with their imports
+    filter_inputs: list[str] = [goods_filter_filepath] if goods_filter_filepath else []
+    limit_params: dict = {} if limit is None else {'limit': limit}
+    ingest_params: dict = {
+        **limit_params,
+        **({'market_filter': sorted(market_filter)} if market_filter else {}),
+    }
+
+    def ingest(process: Callable[..., None]) -> Callable[[], None]:
+        return lambda: process(
+            limit=limit,
+            goods_filter=read_goods_filter(filepath=goods_filter_filepath),
+            market_filter=market_filter,
+        )
+
+    return [
+        PipelineStage(
+            name='process_options',
+            run=ingest(process=process_options),
+            inputs=['data/options_250107_250113.csv'] + filter_inputs,
+            outputs=['data/processed/option_map.msgpack'],
+            code=PipelineRunner.code_of(process_options),
+            params=ingest_params,
+        ),
+        PipelineStage(
+            name='process_policies',
+            run=ingest(process=process_policies),
+            inputs=['data/policies_250107_250113.csv'] + filter_inputs,
+            outputs=['data/processed/policy_map.msgpack'],
+            code=PipelineRunner.code_of(process_policies),
+            params=ingest_params,
+        ),
+        PipelineStage(
+            name='process_deals',
+            run=ingest(process=process_deals),
+            inputs=['data/deals.csv'] + filter_inputs,
+            outputs=['data/processed/deal_map.msgpack'],
+            code=PipelineRunner.code_of(process_deals),
+            params=ingest_params,
+        ),
+        PipelineStage(
+            name='process_adjs',
+            run=ingest(process=process_adjs),
+            inputs=['data/adj_250107_250113.csv'] + filter_inputs,
+            outputs=['data/processed/adj_map.msgpack'],
+            code=PipelineRunner.code_of(process_adjs),
+            params=ingest_params,
+        ),
+        PipelineStage(
+            name='process_platform_consumers',
+            run=ingest(process=process_platform_consumers),
+            inputs=['data/consumer_250107_250113.csv'] + filter_inputs,
+            outputs=['data/processed/consumer_map.msgpack'],
+            code=PipelineRunner.code_of(process_platform_consumers),
+            params=ingest_params,
+        ),
+        PipelineStage(
+            name='merge_goods',
+            run=lambda: merge_goods(limit=limit),
+            inputs=['data/goods.csv'] + PROCESSED_MAPS,
+            outputs=['data/processed/merged_goods.msgpack'],
+            code=PipelineRunner.code_of(merge_goods),
+            params=limit_params,
+        ),
+        PipelineStage(
+            name='save_drafts',
+            run=lambda: save_drafts(limit=limit),
+            inputs=['data/goods.csv'] + PROCESSED_MAPS,
+            outputs=[filepath.replace('data/processed/', 'data/processed/draft/') for filepath in PROCESSED_MAPS],
+            code=PipelineRunner.code_of(save_drafts),
+            params=limit_params,
+        ),
+        PipelineStage(
+            name='create_revision2',
+            run=lambda: create_revisions(workers=workers, incremental=incremental),
+            inputs=['data/processed/merged_goods.msgpack'] + PROCESSED_MAPS,
+            outputs=['data/out/revision.csv'] + ([REVISION_CHECKPOINT] if incremental else []),
+            code=PipelineRunner.code_of(create_revisions),
+            params={'incremental': True} if incremental else {},
+        ),
+        PipelineStage(
+            name='revision_goods_sno_list',
+            run=save_revision_goods_sno_list,
+            inputs=['data/out/revision.csv'],
+            outputs=['data/out/revision_goods_sno_list.json'],
+            code=PipelineRunner.code_of(save_revision_goods_sno_list),
+        ),
+    ]
+
+
+if __name__ == '__main__':
+    print('program starts..')
+    parser = argparse.ArgumentParser(description='Run the revision pipeline, skipping stages that are up to date.')
+    parser.add_argument('--stage', action='append', help='run only these stages (repeatable)')
+    parser.add_argument('--force', action='append', default=[], help='re-run these stages even if up to date')
+    parser.add_argument('--limit', type=int, default=None, help='read only the first N rows of every csv')
+    parser.add_argument('--goods-file', default=None, help='ingest only the goods of this csv (goods.csv layout)')
+    parser.add_argument(
+        '--market',
+        action='append',
+        default=[],
+        help='ingest only these market_sno, repeatable and "|" separated like the logcli query',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='create the revisions in a process pool of N workers, the output is the same as with 1',
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help=f'replay only the rows newer than {REVISION_CHECKPOINT} and update it, '
+             'revision.csv gets the revisions of this run only',
+    )
+    parser.add_argument('--metrics-report', default='data/out/run_report.json', help='JSON report of the stages')
+    parser.add_argument('--prometheus-textfile', default=None, help='also write the stage metrics as a .prom file')
+    parser.add_argument('--profile', action='store_true', help='cProfile every stage that runs')
+    parser.add_argument('--profile-dir', default='data/out/profile', help='pstats and collapsed stacks go here')
+    args = parser.parse_args()
+
+    begin_time: datetime = datetime.now()
+    stages: list[PipelineStage] = [
+        stage for stage in build_stages(
+            limit=args.limit,
+            goods_filter_filepath=args.goods_file,
+            market_filter={int(market_sno) for value in args.market for market_sno in value.split('|')} or None,
+            workers=args.workers,
+            incremental=args.incremental,
+        ) if not args.stage or stage.name in args.stage
+    ]
+    with RunMetrics(run_name='main') as metrics, ExitStack() as stack:
+        if args.profile:
+            stack.enter_context(RunProfiler(output_dir=args.profile_dir, hot_functions=HOT_FUNCTIONS))
+        try:
+            PipelineRunner(manifest_filepath='data/processed/pipeline_manifest.json').run(
+                stages=stages,
+                force=set(args.force),
+            )
+        finally:
+            # a failed run still reports the stages it got through
+            metrics.save(report_filepath=args.metrics_report, textfile_filepath=args.prometheus_textfile)
+            print('metrics report: ', args.metrics_report)
+
+    end_time: datetime = datetime.now()
+    print('elapsed time: ', end_time - begin_time)
@@ -1,28 +1,43 @@
-import copy
+import argparse
 import csv
 import dataclasses
+import glob
 import json
 import os
-from collections import defaultdict
+from bisect import bisect_right
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime, timedelta
+from heapq import merge
 from io import StringIO
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator
+
+import msgpack
+import numpy as np
 
 from file_save_helper import FileSaveHelper
+from price_kernel import PriceKernel
+from run_metrics import RunMetrics
+from run_profiler import RunProfiler
 from src.util import discard_ones_digit
+from timestamp_parser import TimestampParser
 
 
-@dataclasses.dataclass(frozen=False)
-class GoodsContext:
-    goods_sno: int = -1
-    goods_name: str = ''
-    thumbnail_price: int = -1
-    correct_price: int = -1
-    consumer_origin: int = -1
-    price_origin: int = -1
-    discount_type: int = -1
-    discount_rate: int = -1
-    discount_price: int = -1
-    updated_at: datetime = datetime(1970, 1, 1)
+@dataclasses.dataclass(frozen=True, slots=True)
+class GoodsSnapshot:
+    goods_sno: int
+    goods_name: str
+    thumbnail_price: int
+    correct_price: int
+    consumer_origin: int
+    price_origin: int
+    discount_type: int
+    discount_rate: int
+    discount_price: int
+    updated_at: datetime
 
 
 @dataclasses.dataclass(frozen=True)
@@ -54,7 +69,7 @@ class OrderItem:
 
 @dataclasses.dataclass(frozen=True)
 class InvalidData:
-    context: GoodsContext
+    context: GoodsSnapshot
     log: DatadogLog
     item: OrderItem
 
@@ -84,8 +99,25 @@ class ReaderUtil:
     def parse_csv_line_with_csv(cls, line: str) -> list[str]:
         return next(csv.reader(StringIO(line)))
 
+    @classmethod
+    def sort_in_place(cls, rows: list, key: Callable) -> list:
+        '''
+        Stable sort of `rows` in place, skipped when they are already in order (exports written in time order).
+        '''
+        previous = None
+        for i, row in enumerate(rows):
+            current = key(row)
+            if i and current < previous:
+                rows.sort(key=key)
+                break
+            previous = current
+        return rows
+
 
 class GrafanaLogReader:
+    PART_SUFFIX: str = '.part'
+    DECODER: json.JSONDecoder = json.JSONDecoder()
+
     @classmethod
     def read(cls, filepaths: list[str], limit: int | None) -> list[str]:
         print('grafana read log starts...')
@@ -105,8 +137,81 @@ class GrafanaLogReader:
 
         return res
 
+    @classmethod
+    def stream_parts(cls, part_path_prefix: str, workers: int, limit: int | None = None) -> Iterator[str]:
+        '''
+        Streams the lines of the logcli parts written with `--part-path-prefix`, in timestamp order.
+
+        Parts are named `{prefix}_{from}_{to}.part` and cover disjoint time ranges, so they are decoded
+        in a process pool, each one sorted on its own, and yielded in name order.
+        At most 2 * workers decoded parts are held in memory.
+        '''
+        filepaths: list[str] = sorted(glob.glob(f'{glob.escape(part_path_prefix)}_*{cls.PART_SUFFIX}'))
+        print('grafana parts: ', len(filepaths))
+        count: int = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending: deque[Future] = deque()
+            paths: Iterator[str] = iter(filepaths)
+            for filepath in islice(paths, 2 * workers):
+                pending.append(executor.submit(cls._read_part, filepath))
+            while pending:
+                lines: list[str] = pending.popleft().result()
+                filepath: str | None = next(paths, None)
+                if filepath is not None:
+                    pending.append(executor.submit(cls._read_part, filepath))
+                for line in lines:
+                    if limit and count >= limit:
+                        executor.shutdown(cancel_futures=True)
+                        return
+                    count += 1
+                    yield line
+
+    @classmethod
+    def _read_part(cls, filepath: str) -> list[str]:
+        entries: list[tuple[tuple[str, str], str]] = []
+        with open(filepath, encoding='utf-8') as f:
+            for raw in f:
+                raw = raw.rstrip('\n')
+                if raw:
+                    entries.append((cls._timestamp_key(raw), cls._extract_log_data(raw)))
+        ReaderUtil.sort_in_place(rows=entries, key=itemgetter(0))
+        return [line for _, line in entries]
+
+    @classmethod
+    def _timestamp_key(cls, raw: str) -> tuple[str, str]:
+        '''
+        Sort key of the RFC3339Nano "timestamp" of a logcli entry, ('', '') when it has none.
+        The fraction is padded because RFC3339Nano drops its trailing zeros.
+        '''
+        idx: int = raw.rfind('"timestamp":')
+        if idx < 0:
+            return '', ''
+        begin: int = raw.find('"', idx + 12) + 1
+        value: str = raw[begin:raw.find('"', begin)]
+        if len(value) > 19 and value[19] == '.':
+            end: int = 20
+            while end < len(value) and value[end].isdigit():
+                end += 1
+            return value[:19], value[20:end].ljust(9, '0')
+        return value[:19], '0' * 9
+
     @classmethod
     def _extract_log_data(cls, line: str) -> str:
+        '''
+        Decodes only the "line" string of a logcli entry, the whole entry is decoded when it is not found.
+        '''
+        idx: int = line.rfind('"line":')
+        if idx >= 0:
+            idx += 7
+            while idx < len(line) and line[idx] == ' ':
+                idx += 1
+            try:
+                value, _ = cls.DECODER.raw_decode(line, idx)
+            except json.JSONDecodeError:
+                value = None
+            if isinstance(value, str):
+                return value
+
         try:
             data: dict = json.loads(line)
         except json.JSONDecodeError:
@@ -133,7 +238,7 @@ class SellerLogReader:
             data = cls._parse_csv_line(line=columns)
             if data:
                 res.append(data)
-        return sorted(res, key=lambda x: x.request_time)
+        return ReaderUtil.sort_in_place(rows=res, key=lambda x: x.request_time)
 
     @classmethod
     def _parse_csv_line(cls, line: list[str]) -> DatadogLog | None:
@@ -213,20 +318,7 @@ class SellerLogReader:
 
         # Replace comma with period for proper datetime parsing
         cleaned_str = cleaned_str.replace(',', '.')
-
-        formats_to_try = [
-            "%Y-%m-%d %H:%M:%S.%f",  # With milliseconds, space separator
-            "%Y-%m-%dT%H:%M:%S.%fZ",  # With milliseconds, ISO format
-            "%Y-%m-%dT%H:%M:%SZ"  # Without milliseconds, ISO format
-        ]
-
-        for date_format in formats_to_try:
-            try:
-                return datetime.strptime(cleaned_str, date_format)
-            except ValueError:
-                continue
-
-        return default_dt
+        return TimestampParser.parse_naive(datetime_str=cleaned_str, default_dt=default_dt)
 
 
 class LogReader:
@@ -268,14 +360,68 @@ class LogReader:
         return res
 
     @classmethod
-    def parse(cls, lines: list[str]) -> list[DatadogLog]:
+    def read_cached(cls, file_dir_path: str, cache_dir_path: str, workers: int) -> Iterator[DatadogLog]:
+        '''
+        Same logs as parse(read(file_dir_path=...)), lazily merged from one parsed cache file per log file.
+
+        A cache file is valid while the path, size and mtime of its log file are unchanged,
+        only the log files without a valid cache are parsed, in a process pool.
+        '''
+        os.makedirs(cache_dir_path, exist_ok=True)
+        parts: dict[str, list[DatadogLog]] = {}
+        missing: list[tuple[str, str]] = []
+        filepaths: list[str] = [
+            f"{file_dir_path}{filename}" for filename in os.listdir(f"{os.getcwd()}/{file_dir_path}")
+        ]
+        for filepath in filepaths:
+            cache_filepath: str = f"{cache_dir_path}{os.path.basename(filepath)}.msgpack"
+            logs: list[DatadogLog] | None = LogCacheSerializer.load(filepath=cache_filepath, source_filepath=filepath)
+            if logs is None:
+                missing.append((filepath, cache_filepath))
+            else:
+                parts[filepath] = logs
+
+        print(f"log files: {len(filepaths)}, cached: {len(parts)}, parsing: {len(missing)}")
+        RunMetrics.count('files_cached', len(parts))
+        RunMetrics.count('files_parsed', len(missing))
+        if missing:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for (filepath, _), (logs, counters) in zip(
+                        missing,
+                        executor.map(cls._parse_file, *zip(*missing)),
+                ):
+                    parts[filepath] = logs
+                    # bytes_read and rows_in of the parsed files, the cached ones are not read as csv
+                    RunMetrics.add_counts(counters=counters)
+        RunMetrics.count('rows_out', sum(len(logs) for logs in parts.values()))
+
+        # ties keep the file order of read(), like the stable sort of parse()
+        return merge(*[parts[filepath] for filepath in filepaths], key=lambda x: x.request_time)
+
+    @classmethod
+    def _parse_file(cls, filepath: str, cache_filepath: str) -> tuple[list[DatadogLog], dict[str, int]]:
+        print(filepath)
+        with RunMetrics.worker_counts() as counters:
+            data: bytes = FileSaveHelper.read(filepath=filepath)
+            lines: list[str] = data.decode('utf-8').splitlines()
+            RunMetrics.count('bytes_read', len(data))
+            RunMetrics.count('rows_in', len(lines) - 1)
+            logs: list[DatadogLog] = cls.parse(lines=lines[1:])
+            FileSaveHelper.save(
+                data=LogCacheSerializer.serialize(logs=logs, source_filepath=filepath),
+                filepath=cache_filepath,
+            )
+        return logs, counters
+
+    @classmethod
+    def parse(cls, lines: Iterable[str]) -> list[DatadogLog]:
         res: list[DatadogLog] = []
         for line in lines:
             columns: list[str] = ReaderUtil.parse_csv_line_with_csv(line=line)
             data = cls._parse_csv_line(line=columns)
             if data:
                 res.append(data)
-        return sorted(res, key=lambda x: x.request_time)
+        return ReaderUtil.sort_in_place(rows=res, key=lambda x: x.request_time)
 
     @classmethod
     def _parse_csv_line(cls, line: list[str]) -> DatadogLog | None:
@@ -321,11 +467,69 @@ class LogReader:
 
         # Replace comma with period for proper datetime parsing
         cleaned_str = cleaned_str.replace(',', '.')
+        return TimestampParser.parse_local(datetime_str=cleaned_str, default_dt=default_dt)
+
 
+class LogCacheSerializer:
+    '''
+    Parsed DatadogLog records of one log file:
+        {'version': 1, 'source': [path, size, mtime_ns], 'fields': [...], 'rows': [[row values], ...]}
+    datetimes are epoch microseconds.
+    '''
+    VERSION: int = 1
+    FIELDS: list[str] = [field.name for field in dataclasses.fields(DatadogLog)]
+    TIME_FIELDS: list[int] = [i for i, field in enumerate(dataclasses.fields(DatadogLog)) if field.type is datetime]
+
+    @classmethod
+    def serialize(cls, logs: list[DatadogLog], source_filepath: str) -> bytes:
+        rows: list[list] = []
+        for log in logs:
+            values: list = [getattr(log, name) for name in cls.FIELDS]
+            for i in cls.TIME_FIELDS:
+                values[i] = TimestampParser.to_epoch(values[i])
+            rows.append(values)
+        return msgpack.packb({
+            'version': cls.VERSION,
+            'source': cls._source_key(filepath=source_filepath),
+            'fields': cls.FIELDS,
+            'rows': rows,
+        })
+
+    @classmethod
+    def load(cls, filepath: str, source_filepath: str) -> list[DatadogLog] | None:
+        '''
+        Returns None when there is no cache file, it was written for another version of the source file or it
+        cannot be decoded, e.g. truncated by an interrupted run, so the log file is parsed again.
+        '''
+        if not os.path.exists(filepath):
+            return None
         try:
-            return datetime.strptime(cleaned_str, "%Y-%m-%d %H:%M:%S.%f")
-        except ValueError:
-            return default_dt
+            data: dict = msgpack.unpackb(FileSaveHelper.read(filepath=filepath))
+            if (
+                    not isinstance(data, dict)
+                    or data.get('version') != cls.VERSION
+                    or data['fields'] != cls.FIELDS
+                    or data['source'] != cls._source_key(filepath=source_filepath)
+            ):
+                return None
+            return cls.deserialize(data=data)
+        except (ValueError, TypeError, KeyError) as e:
+            print(f'unreadable log cache {filepath}, parsing again: {e!r}')
+            return None
+
+    @classmethod
+    def deserialize(cls, data: dict) -> list[DatadogLog]:
+        logs: list[DatadogLog] = []
+        for values in data['rows']:
+            for i in cls.TIME_FIELDS:
+                values[i] = TimestampParser.from_epoch(values[i])
+            logs.append(DatadogLog(*values))
+        return logs
+
+    @classmethod
+    def _source_key(cls, filepath: str) -> list:
+        stat: os.stat_result = os.stat(filepath)
+        return [os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns]
 
 
 class ItemReader:
@@ -363,7 +567,9 @@ class ItemReader:
         res: list[OrderItem] = []
         for line in lines:
             columns: list[str] = ReaderUtil.parse_csv_line_with_csv(line=line)
-            checked_at: datetime = datetime.strptime(columns[12], "%Y-%m-%d %H:%M:%S.%f")
+            checked_at: datetime | None = TimestampParser.parse_local(datetime_str=columns[12])
+            if checked_at is None:
+                raise ValueError(f"unexpected checked_at: {columns[12]!r}")
             res.append(
                 OrderItem(
                     item_sno=ReaderUtil.parse_int(columns[0]),
@@ -377,56 +583,155 @@ class ItemReader:
                     checked_at=checked_at,
                 )
             )
-        return sorted(res, key=lambda x: x.checked_at)
+        return ReaderUtil.sort_in_place(rows=res, key=lambda x: x.checked_at)
+
+
+class LogTimeline:
+    '''
+    Logs of one goods in request_time order, for as-of lookups.
+    '''
+
+    def __init__(self, logs: list[DatadogLog]):
+        self.logs: list[DatadogLog] = logs
+        self.request_times: list[datetime] = [log.request_time for log in logs]
+
+    def latest(self, checked_at: datetime) -> int:
+        '''
+        Position of the latest log at or before checked_at, -1 when there is none.
+        '''
+        return bisect_right(self.request_times, checked_at) - 1
 
 
 class ItemAnalyzer:
+    SHARDS_PER_WORKER: int = 4
+
     @classmethod
-    def analyze(cls, logs: list[DatadogLog], items: list[OrderItem]) -> list[InvalidData]:
-        res: list[InvalidData] = []
-        context_map: dict[int, GoodsContext] = defaultdict(GoodsContext)
-        goods_map: dict[int, list[DatadogLog]] = defaultdict(list)
+    def analyze(
+            cls,
+            logs: Iterable[DatadogLog],
+            items: Iterable[OrderItem],
+            workers: int = 1,
+    ) -> list[InvalidData]:
+        '''
+        As-of join of every order item with the latest log of its goods at or before its checked_at.
+        `logs` must be sorted by request_time and are consumed once. Goods are independent, so with workers > 1
+        contiguous shards of goods are joined in a process pool. The result keeps the order of `items`.
+        '''
+        log_map: dict[int, list[DatadogLog]] = defaultdict(list)
+        log_count: int = 0
         for log in logs:
-            goods_map[log.goods_sno].append(log)
+            log_map[log.goods_sno].append(log)
+            log_count += 1
+        item_map: dict[int, list[tuple[int, OrderItem]]] = defaultdict(list)
+        item_count: int = 0
+        for idx, item in enumerate(items):
+            item_map[item.goods_sno].append((idx, item))
+            item_count += 1
+        RunMetrics.count('logs_in', log_count)
+        RunMetrics.count('rows_in', item_count)
+
+        # items of goods without any log are never checked
+        goods: list[tuple[list[DatadogLog], list[tuple[int, OrderItem]]]] = [
+            (log_map[goods_sno], goods_items) for goods_sno, goods_items in item_map.items() if goods_sno in log_map
+        ]
+        if not goods:
+            return []
 
-        for item in items:
-            checked_at: datetime = item.checked_at
-            ctx = cls._apply_updates(
-                ctx=context_map[item.goods_sno], logs=goods_map[item.goods_sno], checked_at=checked_at
-            )
-            ctx.goods_name = item.goods_name
-            context_map[item.goods_sno] = ctx
-            if ctx.correct_price != item.price and ctx.goods_sno != -1:
-                res.append(
+        shard_count: int = max(1, min(len(goods), workers * cls.SHARDS_PER_WORKER))
+        shard_size: int = -(-len(goods) // shard_count)
+        shards: list[list[tuple[list[DatadogLog], list[tuple[int, OrderItem]]]]] = [
+            goods[i:i + shard_size] for i in range(0, len(goods), shard_size)
+        ]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parts: list[list[tuple[int, InvalidData]]] = list(executor.map(cls._join_shard, shards))
+        else:
+            parts: list[list[tuple[int, InvalidData]]] = [cls._join_shard(shard) for shard in shards]
+        invalids: list[InvalidData] = [invalid for _, invalid in merge(*parts, key=itemgetter(0))]
+        RunMetrics.count('rows_out', len(invalids))
+        return invalids
+
+    @classmethod
+    def _join_shard(
+            cls,
+            shard: list[tuple[list[DatadogLog], list[tuple[int, OrderItem]]]],
+    ) -> list[tuple[int, InvalidData]]:
+        '''
+        Invalid items of a shard with their position in the original items, sorted by that position.
+        '''
+        joined: list[tuple[int, OrderItem, DatadogLog]] = []
+        for goods_logs, goods_items in shard:
+            joined.extend(cls._join_goods(timeline=LogTimeline(logs=goods_logs), items=goods_items))
+        prices: list[int] = cls.correct_prices(
+            logs=[log for _, _, log in joined],
+            checked_at=[item.checked_at for _, item, _ in joined],
+        )
+
+        res: list[tuple[int, InvalidData]] = []
+        for (idx, item, log), correct_price in zip(joined, prices):
+            if correct_price != item.price and log.goods_sno != -1:
+                res.append((
+                    idx,
                     InvalidData(
-                        context=copy.deepcopy(ctx),
-                        log=copy.deepcopy(log),
-                        item=copy.deepcopy(item),
-                    )
-                )
+                        context=GoodsSnapshot(
+                            goods_sno=log.goods_sno,
+                            goods_name=item.goods_name,
+                            thumbnail_price=-1,
+                            correct_price=correct_price,
+                            consumer_origin=log.consumer_origin,
+                            price_origin=log.price_origin,
+                            discount_type=log.discount_type,
+                            discount_rate=log.discount_rate,
+                            discount_price=log.discount_price,
+                            updated_at=log.request_time,
+                        ),
+                        log=log,
+                        item=item,
+                    ),
+                ))
+        res.sort(key=itemgetter(0))
+        return res
 
+    @classmethod
+    def _join_goods(
+            cls,
+            timeline: LogTimeline,
+            items: list[tuple[int, OrderItem]],
+    ) -> list[tuple[int, OrderItem, DatadogLog]]:
+        '''
+        (idx, item, latest log at or before its checked_at) of every item that has such a log.
+        '''
+        res: list[tuple[int, OrderItem, DatadogLog]] = []
+        for idx, item in items:
+            pos: int = timeline.latest(checked_at=item.checked_at)
+            if pos >= 0:
+                res.append((idx, item, timeline.logs[pos]))
         return res
 
     @classmethod
-    def _apply_updates(cls, ctx: GoodsContext, logs: list[DatadogLog], checked_at: datetime) -> GoodsContext:
-        while logs and logs[0].request_time <= checked_at:
-            log: DatadogLog = logs.pop(0)
-            correct_price: int = cls.calc_correct_price(log=log)
-            ctx.goods_sno = log.goods_sno
-            ctx.correct_price = correct_price
-            ctx.price_origin = log.price_origin
-            ctx.consumer_origin = log.consumer_origin
-            ctx.discount_price = log.discount_price
-            ctx.discount_rate = log.discount_rate
-            ctx.discount_type = log.discount_type
-            ctx.updated_at = log.request_time
-            ctx.goods_sno = log.goods_sno
-        return ctx
+    def correct_prices(cls, logs: list[DatadogLog], checked_at: list[datetime]) -> list[int]:
+        '''
+        calc_correct_price of every (log, checked_at), computed at once by PriceKernel.
+        Every log is a full price snapshot: its own discount window is the only one checked, at checked_at.
+        '''
+        def column(values) -> np.ndarray:
+            return np.fromiter(values, dtype=np.int64, count=len(logs))
+
+        return PriceKernel.correct_prices(
+            consumer_origin=column(log.consumer_origin for log in logs),
+            price_origin=column(log.price_origin for log in logs),
+            discount_price=column(log.discount_price for log in logs),
+            discount_type=column(log.discount_type for log in logs),
+            discount_rate=column(log.discount_rate for log in logs),
+            started_at=column(TimestampParser.to_epoch(log.discount_started_at) for log in logs),
+            ended_at=column(TimestampParser.to_epoch(log.discount_ended_at) for log in logs),
+            checked_at=column(TimestampParser.to_epoch(at) for at in checked_at),
+        ).tolist()
 
     @classmethod
-    def calc_correct_price(cls, log: DatadogLog) -> int:
+    def calc_correct_price(cls, log: DatadogLog, checked_at: datetime | None = None) -> int:
         '''
-        algorithm.
+        algorithm. The discount window is checked at checked_at, by default at the request_time of the log.
 
         정가: [max(consumer_origin, price_origin)]
         할인: [
@@ -447,7 +752,7 @@ class ItemAnalyzer:
             diff=abs(log.consumer_origin - log.price_origin),
             started_at=log.discount_started_at,
             ended_at=log.discount_ended_at,
-            checked_at=log.request_time,
+            checked_at=log.request_time if checked_at is None else checked_at,
         )
         return consumer - discount
 
@@ -589,22 +894,75 @@ class DataPrinter:
 if __name__ == '__main__':
     print('program starts to parse..')
     # lines: list[str] = GrafanaLogReader.read(filepaths=['data/logs/o.jsonl'], limit=None)
-    # lines: list[str] = GrafanaLogReader.read(filepaths=['data/logs/o.jsonl'], limit=None)
     # FileSaveHelper.save(data=DataPrinter.encode_bytes(lines=lines), filepath='data/parsed_logs.csv')
     # for line in lines:
     #     print('grafana-line: ', line)
-    vendor_logs: list[DatadogLog] = LogReader.parse(lines=LogReader.read(file_dir_path="data/logs/"))
-    seller_logs: list[DatadogLog] = SellerLogReader.parse(
-        lines=SellerLogReader.read(filepaths=["data/seller_logs.csv"])
+    parser = argparse.ArgumentParser(description='Check the order items against the price logs.')
+    parser.add_argument(
+        '--grafana-parts',
+        default=None,
+        help='read the vendor logs from the logcli parts of this --part-path-prefix (call_grafana.sh) '
+             'instead of data/logs/',
     )
-    logs: list[DatadogLog] = sorted(vendor_logs + seller_logs, key=lambda x: x.request_time)
-    items: list[OrderItem] = ItemReader.parse(lines=ItemReader.read(filepaths=['data/ably_gd_order_item.csv']))
-    print('logs: ', len(logs))
-    invalids: list[InvalidData] = ItemAnalyzer.analyze(logs=logs, items=items)
-
-    print('len(vendor_logs): ', len(vendor_logs))
-    print('len(items): ', len(items))
-    print('len(invalids): ', len(invalids))
-    print('unique goods: ', len(set([invalid.context.goods_sno for invalid in invalids])))
-    FileSaveHelper.save(data=DataPrinter.map_csv(data=invalids), filepath='data/invalids_order_items.csv')
+    parser.add_argument('--metrics-report', default='data/out/run_report_main2.json', help='JSON report of the stages')
+    parser.add_argument('--prometheus-textfile', default=None, help='also write the stage metrics as a .prom file')
+    parser.add_argument('--profile', action='store_true', help='cProfile every stage, analyze runs in-process')
+    parser.add_argument('--profile-dir', default='data/out/profile_main2', help='pstats and collapsed stacks go here')
+    args = parser.parse_args()
+
+    # call counts kept by --profile, _apply_updates became the as-of lookup of LogTimeline
+    hot_functions: list[tuple[type, str]] = [
+        (LogReader, '_parse_csv_line'),
+        (LogReader, '_parse_datetime'),
+        (LogTimeline, 'latest'),
+        (ItemAnalyzer, '_join_goods'),
+        (ItemAnalyzer, 'correct_prices'),
+        (PriceKernel, 'correct_prices'),
+    ]
+    # the log files without a cache are still parsed in a process pool, outside of the profile
+    analyze_workers: int = 1 if args.profile else os.cpu_count()
+
+    with RunMetrics(run_name='main2') as metrics, ExitStack() as stack:
+        if args.profile:
+            stack.enter_context(RunProfiler(output_dir=args.profile_dir, hot_functions=hot_functions))
+        try:
+            with RunMetrics.stage('read_vendor_logs'), RunProfiler.stage('read_vendor_logs'):
+                if args.grafana_parts:
+                    # the line_format of call_grafana.sh is the csv layout of the vendor log exports
+                    lines: Iterator[str] = GrafanaLogReader.stream_parts(
+                        part_path_prefix=args.grafana_parts,
+                        workers=os.cpu_count(),
+                    )
+                    vendor_logs: Iterator[DatadogLog] = iter(LogReader.parse(lines=lines))
+                else:
+                    # only the merge is lazy, so the k-way merge itself is timed within analyze
+                    vendor_logs: Iterator[DatadogLog] = LogReader.read_cached(
+                        file_dir_path="data/logs/",
+                        cache_dir_path="data/processed/log_cache/",
+                        workers=os.cpu_count(),
+                    )
+            with RunMetrics.stage('read_seller_logs'), RunProfiler.stage('read_seller_logs'):
+                seller_logs: list[DatadogLog] = SellerLogReader.parse(
+                    lines=SellerLogReader.read(filepaths=["data/seller_logs.csv"])
+                )
+                RunMetrics.count('rows_out', len(seller_logs))
+            # both sources are sorted by request_time, ties keep vendor logs first
+            logs: Iterator[DatadogLog] = merge(vendor_logs, seller_logs, key=lambda x: x.request_time)
+            with RunMetrics.stage('read_items'), RunProfiler.stage('read_items'):
+                items: list[OrderItem] = ItemReader.parse(
+                    lines=ItemReader.read(filepaths=['data/ably_gd_order_item.csv']),
+                )
+                RunMetrics.count('rows_out', len(items))
+            with RunMetrics.stage('analyze'), RunProfiler.stage('analyze'):
+                invalids: list[InvalidData] = ItemAnalyzer.analyze(logs=logs, items=items, workers=analyze_workers)
+
+            print('len(seller_logs): ', len(seller_logs))
+            print('len(items): ', len(items))
+            print('len(invalids): ', len(invalids))
+            print('unique goods: ', len(set([invalid.context.goods_sno for invalid in invalids])))
+            with RunMetrics.stage('write'), RunProfiler.stage('write'):
+                FileSaveHelper.save(data=DataPrinter.map_csv(data=invalids), filepath='data/invalids_order_items.csv')
+        finally:
+            metrics.save(report_filepath=args.metrics_report, textfile_filepath=args.prometheus_textfile)
+            print('metrics report: ', args.metrics_report)
     # DataPrinter.print(data=invalids, goods_set=set())
@@ -1,10 +1,22 @@
 import msgpack
+import numpy as np
+
+from src.model.goods_set import GoodsSet
+
 
 class MergedGoodsSerializer:
+    '''
+    MAGIC followed by the sorted goods_sno as little-endian int64.
+    Files written before GoodsSet are a msgpack list of goods_sno and are still read.
+    '''
+    MAGIC: bytes = b'GOODSET\x01'
+
     @classmethod
-    def serialize(cls, goods_sno: list[int]) -> bytes:
-        return msgpack.packb(goods_sno)
+    def serialize(cls, goods_set: GoodsSet) -> bytes:
+        return cls.MAGIC + goods_set.values.astype('<i8', copy=False).tobytes()
 
     @classmethod
-    def deserialize(cls, data: bytes) -> list[int]:
-        return msgpack.unpackb(data)
+    def deserialize(cls, data: bytes) -> GoodsSet:
+        if data[:len(cls.MAGIC)] == cls.MAGIC:
+            return GoodsSet.from_sorted(values=np.frombuffer(data, dtype='<i8', offset=len(cls.MAGIC)))
+        return GoodsSet.from_iterable(msgpack.unpackb(data))
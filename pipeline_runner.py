@@ -0,0 +1,179 @@
+import ast
+import hashlib
+import inspect
+import json
+import os
+import sys
+from datetime import datetime
+from types import CodeType
+from typing import Callable
+
+from file_save_helper import FileSaveHelper
+from run_metrics import RunMetrics
+from run_profiler import RunProfiler
+from src.model.pipeline_stage import PipelineStage
+
+HASH_BLOCK_SIZE: int = 1 << 20
+CODE_ROOT: str = os.path.dirname(os.path.abspath(__file__))
+
+
+class PipelineRunner:
+    '''
+    Runs stages in order and skips the ones whose fingerprint did not change since their last run.
+
+    A fingerprint covers size and sha256 of every input plus the stage version, its params and the sha256 of
+    its code.
+    Input hashes are cached by (size, mtime) in the manifest, so unchanged multi-GB exports are not re-read,
+    and an input rewritten with identical content does not re-run the stages after it.
+    '''
+
+    def __init__(self, manifest_filepath: str):
+        self.manifest_filepath: str = manifest_filepath
+        self.manifest: dict = self._load_manifest()
+
+    def run(self, stages: list[PipelineStage], force: set[str] | None = None) -> None:
+        force = force or set()
+        for stage in stages:
+            fingerprint: str = self._fingerprint(stage=stage)
+            recorded: str | None = self.manifest['stages'].get(stage.name)
+            outputs_exist: bool = all(os.path.exists(output) for output in stage.outputs)
+            if stage.name not in force and recorded == fingerprint and outputs_exist:
+                print(f'stage {stage.name}: up to date, skipped')
+                continue
+
+            print(f'stage {stage.name}: running..')
+            begin_time: datetime = datetime.now()
+            with RunMetrics.stage(stage.name), RunProfiler.stage(stage.name):
+                stage.run()
+            print(f'stage {stage.name}: done in {datetime.now() - begin_time}')
+
+            self.manifest['stages'][stage.name] = fingerprint
+            for output in stage.outputs:
+                self._file_hash(filepath=output)
+            self._save_manifest()
+
+    @classmethod
+    def code_of(cls, function: Callable) -> list[str]:
+        '''
+        The source files a stage function runs, relative to CODE_ROOT: the file defining it and the import
+        closure of the modules of every class, function or module it references. The functions of its own file
+        it references are followed the same way, so a stage does not depend on what only other stages use.
+        '''
+        own_filepath: str = os.path.abspath(inspect.getsourcefile(function))
+        entries: set[str] = set()
+        followed: set[int] = {id(function)}
+        functions: list[Callable] = [function]
+        while functions:
+            current: Callable = functions.pop()
+            for name in cls._referenced_names(code=current.__code__):
+                value = current.__globals__.get(name)
+                if value is None:
+                    continue
+                if inspect.isfunction(value) and os.path.abspath(inspect.getsourcefile(value)) == own_filepath:
+                    if id(value) not in followed:
+                        followed.add(id(value))
+                        functions.append(value)
+                    continue
+                module = value if inspect.ismodule(value) else sys.modules.get(getattr(value, '__module__', None))
+                filepath: str | None = getattr(module, '__file__', None)
+                if filepath:
+                    entries.add(os.path.abspath(filepath))
+
+        # the imports of its own file are what every function there uses, only the referenced ones are followed
+        closure: set[str] = {own_filepath} | cls._import_closure(filepaths=entries - {own_filepath})
+        return sorted(os.path.relpath(filepath, CODE_ROOT) for filepath in closure)
+
+    @classmethod
+    def _referenced_names(cls, code: CodeType) -> set[str]:
+        names: set[str] = set(code.co_names)
+        for const in code.co_consts:
+            # lambdas, comprehensions and nested functions
+            if isinstance(const, CodeType):
+                names |= cls._referenced_names(code=const)
+        return names
+
+    @classmethod
+    def _import_closure(cls, filepaths: set[str]) -> set[str]:
+        '''
+        `filepaths` and every source file under CODE_ROOT they import, directly or not.
+        '''
+        closure: set[str] = set()
+        pending: list[str] = [filepath for filepath in filepaths if filepath.startswith(CODE_ROOT + os.sep)]
+        while pending:
+            filepath: str = pending.pop()
+            if filepath in closure:
+                continue
+            closure.add(filepath)
+            with open(filepath, 'rb') as f:
+                tree: ast.Module = ast.parse(f.read(), filename=filepath)
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    module_names: list[str] = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                    # `from package import module` imports a module too
+                    module_names: list[str] = [node.module] + [f'{node.module}.{alias.name}' for alias in node.names]
+                else:
+                    continue
+                for module_name in module_names:
+                    parts: list[str] = module_name.split('.')
+                    # with the __init__.py of the packages on the way
+                    for i in range(1, len(parts) + 1):
+                        module_filepath: str | None = cls._module_filepath(module_name='.'.join(parts[:i]))
+                        if module_filepath is not None:
+                            pending.append(module_filepath)
+        return closure
+
+    @classmethod
+    def _module_filepath(cls, module_name: str) -> str | None:
+        base: str = os.path.join(CODE_ROOT, *module_name.split('.'))
+        for filepath in (f'{base}.py', os.path.join(base, '__init__.py')):
+            if os.path.isfile(filepath):
+                return filepath
+        return None
+
+    def _fingerprint(self, stage: PipelineStage) -> str:
+        missing: list[str] = [filepath for filepath in stage.inputs if not os.path.exists(filepath)]
+        if missing:
+            raise FileNotFoundError(f'stage {stage.name} is missing inputs: {missing}')
+
+        digest = hashlib.sha256()
+        digest.update(f'{stage.name}:{stage.version}'.encode('utf-8'))
+        if stage.params:
+            # stages without params keep the fingerprints recorded before params existed
+            digest.update(json.dumps(stage.params, sort_keys=True).encode('utf-8'))
+        for filepath in stage.inputs:
+            digest.update(f'{filepath}:{os.path.getsize(filepath)}:{self._file_hash(filepath)}'.encode('utf-8'))
+        for filepath in stage.code:
+            code_hash: str = self._content_hash(filepath=os.path.join(CODE_ROOT, filepath))
+            digest.update(f'{filepath}:{code_hash}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _file_hash(self, filepath: str) -> str:
+        stat: os.stat_result = os.stat(filepath)
+        key: str = f'{stat.st_size}:{stat.st_mtime_ns}'
+        cached: dict | None = self.manifest['files'].get(filepath)
+        if cached and cached['key'] == key:
+            return cached['sha256']
+
+        sha256: str = self._content_hash(filepath=filepath)
+        self.manifest['files'][filepath] = {'key': key, 'sha256': sha256}
+        return sha256
+
+    @classmethod
+    def _content_hash(cls, filepath: str) -> str:
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            while block := f.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_filepath):
+            return {'stages': {}, 'files': {}}
+        return json.loads(FileSaveHelper.read(filepath=self.manifest_filepath))
+
+    def _save_manifest(self) -> None:
+        FileSaveHelper.save(
+            data=json.dumps(self.manifest, indent=2).encode('utf-8'),
+            filepath=self.manifest_filepath,
+        )
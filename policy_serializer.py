@@ -3,29 +3,34 @@ from datetime import datetime
 
 import msgpack
 
+from file_save_helper import FileSaveHelper
+from raw_csv_codec import RawCsvCodec
 from src.model.raw_csv import RawCsvGoodsOption, RawCsvPolicy
 
 
 class PolicySerializer:
     @classmethod
     def serialize(cls, raw_map: dict[int, list[dataclasses.dataclass]]) -> bytes:
-        converted = {
-            k: [
-                dataclasses.asdict(opt) | {
-                    'transaction_time': opt.transaction_time.isoformat(),
-                    'started_at': opt.started_at.isoformat(),
-                    'ended_at': opt.ended_at.isoformat(),
-                }
-                for opt in v
-            ]
-            for k, v in raw_map.items()
-        }
-        return msgpack.packb(converted)
+        return RawCsvCodec.encode(raw_map=raw_map, row_type=RawCsvPolicy)
+
+    @classmethod
+    def load(cls, filepath: str, goods_sno_list: list[int] | None = None) -> dict[int, list[dataclasses.dataclass]]:
+        '''
+        Decodes only the goods of `goods_sno_list` from an indexed file, other formats are read whole.
+        '''
+        raw_map = RawCsvCodec.load(filepath=filepath, row_type=RawCsvPolicy, goods_sno_list=goods_sno_list)
+        if raw_map is None:
+            raw_map = cls.deserialize(data=FileSaveHelper.read(filepath=filepath))
+        return raw_map
 
     @classmethod
     def deserialize(cls, data: bytes) -> dict[int, list[dataclasses.dataclass]]:
+        if RawCsvCodec.is_store(data):
+            return RawCsvCodec.decode_store(data=data, row_type=RawCsvPolicy)
+
         # Either use strict_map_key=False
         data = msgpack.unpackb(data, strict_map_key=False)
+        # files written before versioning: {goods_sno: [asdict(row)]}
         # OR keep the keys as strings and convert back to int when processing
         result = {}
         for key, options in data.items():
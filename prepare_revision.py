@@ -1,8 +1,11 @@
 from adj_serializer import AdjSerializer
 from deal_serializer import DealSerializer
-from file_save_helper import FileSaveHelper
 from option_serializer import OptionSerializer
 from platform_consumer_serializer import PlatformConsumerSerializer
+from raw_csv_codec import RawCsvCodec
+from run_metrics import RunMetrics
+from src.model.event_table import EventTable, DealTable, OptionTable, PlatformConsumerTable, AdjTable
+from src.model.goods_set import GoodsSet
 from src.model.prepared_data import PreparedData
 from src.model.raw_csv import RawCsvDeal, RawCsvGoodsOption, RawCsvPlatformConsumer, RawCsvAdj
 
@@ -16,35 +19,137 @@ class PrepareRevisionService:
             option_filepath: str,
             consumer_filepath: str,
             adj_filepath: str,
+            columnar: bool = False,
     ) -> PreparedData:
-        return PreparedData(
-            deal_map=cls._fetch_deals(
-                filepath=deal_filepath,
-                goods_sno_list=goods_sno_list,
-            ),
-            option_map=cls._fetch_options(
-                filepath=option_filepath,
-                goods_sno_list=goods_sno_list,
-            ),
-            platform_consumer_map=cls._fetch_platform_consumers(
-                filepath=consumer_filepath,
-                goods_sno_list=goods_sno_list,
-            ),
-            adj_map=cls._fetch_adjs(
-                filepath=adj_filepath,
-                goods_sno_list=goods_sno_list,
-            ),
+        '''
+        With `columnar` the maps are EventTables decoded straight from the processed files, so rows are only
+        materialized for the goods being replayed.
+        '''
+        with RunMetrics.stage('prepare'):
+            if columnar:
+                data: PreparedData = PreparedData(
+                    deal_map=cls._fetch_table(
+                        filepath=deal_filepath,
+                        table_type=DealTable,
+                        serializer=DealSerializer,
+                        goods_sno_list=goods_sno_list,
+                        source='deal',
+                    ),
+                    option_map=cls._fetch_table(
+                        filepath=option_filepath,
+                        table_type=OptionTable,
+                        serializer=OptionSerializer,
+                        goods_sno_list=goods_sno_list,
+                        source='option',
+                    ),
+                    platform_consumer_map=cls._fetch_table(
+                        filepath=consumer_filepath,
+                        table_type=PlatformConsumerTable,
+                        serializer=PlatformConsumerSerializer,
+                        goods_sno_list=goods_sno_list,
+                        source='consumer',
+                    ),
+                    adj_map=cls._fetch_table(
+                        filepath=adj_filepath,
+                        table_type=AdjTable,
+                        serializer=AdjSerializer,
+                        goods_sno_list=goods_sno_list,
+                        source='adj',
+                    ),
+                )
+                for table in (data.deal_map, data.option_map, data.platform_consumer_map, data.adj_map):
+                    RunMetrics.count('rows_loaded', table.row_count)
+                return data
+
+            data: PreparedData = PreparedData(
+                deal_map=cls._fetch_deals(
+                    filepath=deal_filepath,
+                    goods_sno_list=goods_sno_list,
+                ),
+                option_map=cls._fetch_options(
+                    filepath=option_filepath,
+                    goods_sno_list=goods_sno_list,
+                ),
+                platform_consumer_map=cls._fetch_platform_consumers(
+                    filepath=consumer_filepath,
+                    goods_sno_list=goods_sno_list,
+                ),
+                adj_map=cls._fetch_adjs(
+                    filepath=adj_filepath,
+                    goods_sno_list=goods_sno_list,
+                ),
+            )
+            for raw_map in (data.deal_map, data.option_map, data.platform_consumer_map, data.adj_map):
+                RunMetrics.count('rows_loaded', sum(len(rows) for rows in raw_map.values()))
+        return data
+
+    @classmethod
+    def merge_goods(
+            cls,
+            goods_set: GoodsSet,
+            deal_filepath: str,
+            option_filepath: str,
+            consumer_filepath: str,
+            adj_filepath: str,
+    ) -> GoodsSet:
+        '''
+        The goods of `goods_set` present in all four processed files. Only the goods_sno index written at
+        ingestion is read, files without one are loaded whole.
+        '''
+        goods_sets: list[GoodsSet] = [goods_set]
+        for filepath, serializer in (
+                (deal_filepath, DealSerializer),
+                (option_filepath, OptionSerializer),
+                (consumer_filepath, PlatformConsumerSerializer),
+                (adj_filepath, AdjSerializer),
+        ):
+            source_set: GoodsSet | None = RawCsvCodec.read_goods_set(filepath=filepath)
+            if source_set is None:
+                source_set = GoodsSet.from_iterable(serializer.load(filepath=filepath).keys())
+            goods_sets.append(source_set)
+        return GoodsSet.intersect_all(goods_sets=goods_sets)
+
+    @classmethod
+    def _fetch_table(
+            cls,
+            filepath: str,
+            table_type: type[EventTable],
+            serializer: type,
+            goods_sno_list: list[int],
+            source: str,
+    ) -> EventTable:
+        '''
+        The goods of `goods_sno_list`, every goods when it is empty, decoded from the store straight into a
+        table. Files written before versioning are loaded whole and converted.
+        '''
+        table: EventTable | None = RawCsvCodec.load_table(
+            filepath=filepath,
+            table_type=table_type,
+            goods_sno_list=goods_sno_list or None,
         )
+        if table is None:
+            raw_map: dict[int, list] = serializer.load(filepath=filepath)
+            if goods_sno_list:
+                raw_map = {goods_sno: raw_map[goods_sno] for goods_sno in goods_sno_list if goods_sno in raw_map}
+            table = table_type.from_map(raw_map=raw_map)
+        if goods_sno_list:
+            skipped_cnt: int = len(set(goods_sno_list)) - len(table)
+            print(f'{source} skipped goods_sno: ', skipped_cnt)
+            RunMetrics.count(f'skipped_goods.{source}', skipped_cnt)
+        return table
 
     @classmethod
     def _fetch_options(cls, filepath: str, goods_sno_list: list[int]) -> dict[int, list[RawCsvGoodsOption]]:
-        serialized_data: bytes = FileSaveHelper.read(filepath=filepath)
-        option_map: dict[int, list[RawCsvGoodsOption]] = OptionSerializer.deserialize(data=serialized_data)
+        option_map: dict[int, list[RawCsvGoodsOption]] = OptionSerializer.load(
+            filepath=filepath,
+            goods_sno_list=goods_sno_list or None,
+        )
         if goods_sno_list:
             selected_option_map: dict[int, list[RawCsvGoodsOption]] = dict()
             for goods_sno in goods_sno_list:
                 if goods_sno not in option_map:
                     print('option skipped goods_sno: ', goods_sno)
+                    RunMetrics.count('skipped_goods.option')
                     continue
 
                 selected_option_map[goods_sno] = option_map[goods_sno]
@@ -54,8 +159,10 @@ class PrepareRevisionService:
 
     @classmethod
     def _fetch_deals(cls, filepath: str, goods_sno_list: list[int]) -> dict[int, list[RawCsvDeal]]:
-        serialized_data: bytes = FileSaveHelper.read(filepath=filepath)
-        deal_map: dict[int, list[RawCsvDeal]] = DealSerializer.deserialize(data=serialized_data)
+        deal_map: dict[int, list[RawCsvDeal]] = DealSerializer.load(
+            filepath=filepath,
+            goods_sno_list=goods_sno_list or None,
+        )
         skipped_cnt: int = 0
         if goods_sno_list:
             selected_deal_map: dict[int, list[RawCsvDeal]] = dict()
@@ -66,6 +173,7 @@ class PrepareRevisionService:
 
                 selected_deal_map[goods_sno] = deal_map[goods_sno]
             print('deal skipped goods_sno: ', skipped_cnt)
+            RunMetrics.count('skipped_goods.deal', skipped_cnt)
             return selected_deal_map
         else:
             return deal_map
@@ -76,13 +184,16 @@ class PrepareRevisionService:
             filepath: str,
             goods_sno_list: list[int],
     ) -> dict[int, list[RawCsvPlatformConsumer]]:
-        data: bytes = FileSaveHelper.read(filepath=filepath)
-        consumer_map: dict[int, list[RawCsvPlatformConsumer]] = PlatformConsumerSerializer.deserialize(data=data)
+        consumer_map: dict[int, list[RawCsvPlatformConsumer]] = PlatformConsumerSerializer.load(
+            filepath=filepath,
+            goods_sno_list=goods_sno_list or None,
+        )
         if goods_sno_list:
             selected_map: dict[int, list[RawCsvPlatformConsumer]] = dict()
             for goods_sno in goods_sno_list:
                 if goods_sno not in consumer_map:
                     print('consumer skipped goods_sno: ', goods_sno)
+                    RunMetrics.count('skipped_goods.consumer')
                     continue
 
                 selected_map[goods_sno] = consumer_map[goods_sno]
@@ -92,13 +203,16 @@ class PrepareRevisionService:
 
     @classmethod
     def _fetch_adjs(cls, filepath: str, goods_sno_list: list[int]) -> dict[int, list[RawCsvAdj]]:
-        data: bytes = FileSaveHelper.read(filepath=filepath)
-        adj_map: dict[int, list[RawCsvAdj]] = AdjSerializer.deserialize(data=data)
+        adj_map: dict[int, list[RawCsvAdj]] = AdjSerializer.load(
+            filepath=filepath,
+            goods_sno_list=goods_sno_list or None,
+        )
         if goods_sno_list:
             selected_map: dict[int, list[RawCsvAdj]] = dict()
             for goods_sno in goods_sno_list:
                 if goods_sno not in adj_map:
                     print('adj skipped goods_sno: ', goods_sno)
+                    RunMetrics.count('skipped_goods.adj')
                     continue
 
                 selected_map[goods_sno] = adj_map[goods_sno]
@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class PriceKernel:
+    '''
+    Batch versions of the price checks, every argument is an int64 array of the same length.
+    Datetimes are epoch microseconds (TimestampParser.to_epoch).
+    '''
+
+    @classmethod
+    def discard_ones_digit(cls, prices: np.ndarray) -> np.ndarray:
+        return prices // 10 * 10
+
+    @classmethod
+    def revision_check(
+            cls,
+            thumbnail_price: np.ndarray,
+            consumer_origin: np.ndarray,
+            price_origin: np.ndarray,
+            platform_consumer: np.ndarray,
+            discount_price: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Replayed deal states of CreateRevisionService.
+        Returns (correct_price1, correct_price2, mispriced), a deal is mispriced when its thumbnail_price
+        matches neither correct price.
+        '''
+        correct_price1: np.ndarray = cls.discard_ones_digit(platform_consumer - discount_price)
+        correct_price2: np.ndarray = cls.discard_ones_digit(
+            np.maximum(consumer_origin, price_origin) - np.abs(consumer_origin - price_origin)
+        )
+        mispriced: np.ndarray = (thumbnail_price != correct_price1) & (thumbnail_price != correct_price2)
+        return correct_price1, correct_price2, mispriced
+
+    @classmethod
+    def correct_prices(
+            cls,
+            consumer_origin: np.ndarray,
+            price_origin: np.ndarray,
+            discount_price: np.ndarray,
+            discount_type: np.ndarray,
+            discount_rate: np.ndarray,
+            started_at: np.ndarray,
+            ended_at: np.ndarray,
+            checked_at: np.ndarray,
+    ) -> np.ndarray:
+        '''
+        ItemAnalyzer.calc_correct_price over a batch.
+        '''
+        consumer: np.ndarray = np.maximum(consumer_origin, price_origin)
+        diff: np.ndarray = np.abs(consumer_origin - price_origin)
+        can_discount: np.ndarray = (started_at <= checked_at) & (checked_at <= ended_at)
+
+        # 정률
+        by_rate: np.ndarray = (discount_type == 1) & (discount_rate > 0) & (discount_price == 0)
+        rate_discount: np.ndarray = np.maximum(cls.discard_ones_digit(consumer * discount_rate), 0)
+        # 단가
+        price_discount: np.ndarray = cls.discard_ones_digit(np.maximum(discount_price, 0))
+
+        adj_discount: np.ndarray = np.where(
+            can_discount,
+            np.where(by_rate, rate_discount, price_discount),
+            0,
+        )
+        discount: np.ndarray = np.where(adj_discount != 0, adj_discount, diff)
+        return consumer - discount
@@ -0,0 +1,225 @@
+import argparse
+import csv
+import dataclasses
+import sys
+from datetime import datetime
+from itertools import groupby
+from typing import Iterable
+
+import numpy as np
+
+from create_revision import CreateRevisionService
+from file_save_helper import FileSaveHelper
+from merged_goods_serializer import MergedGoodsSerializer
+from prepare_revision import PrepareRevisionService
+from src.model.option_context import GoodsSnapshot
+from src.model.prepared_data import PreparedData
+from timestamp_parser import TimestampParser
+
+
+class PriceStateIndex:
+    '''
+    The GoodsSnapshot of any goods at any time, from change points computed by one replay of every goods.
+
+    The change points of goods[i] are rows offsets[i]:offsets[i + 1] of `times` (ascending epoch microseconds)
+    and of every array of `columns`, one per GoodsSnapshot field, datetimes as epoch microseconds too.
+    A row is the state from its time until the next row. A deleted goods reports goods_sno -1 from then on, its
+    other fields are only what the replay left there.
+
+    discount_price/discount_type are those of the latest adj, in effect only within
+    [discount_started_at, discount_ended_at]; the index does not apply the window itself.
+    Query times are naive Asia/Seoul wall-clock times, aware ones are converted first.
+    '''
+    FIELDS: list[str] = [field.name for field in dataclasses.fields(GoodsSnapshot)]
+    TIME_FIELDS: frozenset[str] = frozenset(
+        field.name for field in dataclasses.fields(GoodsSnapshot) if field.type is datetime
+    )
+
+    def __init__(self, goods: np.ndarray, offsets: np.ndarray, times: np.ndarray, columns: dict[str, np.ndarray]):
+        self.goods: np.ndarray = goods
+        self.offsets: np.ndarray = offsets
+        self.times: np.ndarray = times
+        self.columns: dict[str, np.ndarray] = columns
+
+    @classmethod
+    def build(cls, data: PreparedData) -> 'PriceStateIndex':
+        goods_sno_list: list[int] = sorted({
+            *data.deal_map.keys(),
+            *data.option_map.keys(),
+            *data.platform_consumer_map.keys(),
+            *data.adj_map.keys(),
+        })
+        goods: list[int] = []
+        offsets: list[int] = [0]
+        times: list[int] = []
+        columns: dict[str, list[int]] = {name: [] for name in cls.FIELDS}
+        for goods_sno in goods_sno_list:
+            last: GoodsSnapshot | None = None
+            # only the last state of a transaction_time is visible from outside
+            for changed_at, steps in groupby(
+                    CreateRevisionService.replay_states(goods_sno=goods_sno, data=data), key=lambda x: x[0],
+            ):
+                *_, (_, snapshot) = steps
+                if snapshot == last:
+                    continue
+                times.append(TimestampParser.to_epoch(changed_at))
+                for name in cls.FIELDS:
+                    value = getattr(snapshot, name)
+                    columns[name].append(TimestampParser.to_epoch(value) if name in cls.TIME_FIELDS else value)
+                last = snapshot
+            if last is not None:
+                goods.append(goods_sno)
+                offsets.append(len(times))
+
+        return cls(
+            goods=np.array(goods, dtype=np.int64),
+            offsets=np.array(offsets, dtype=np.int64),
+            times=np.array(times, dtype=np.int64),
+            columns={name: np.array(values, dtype=np.int64) for name, values in columns.items()},
+        )
+
+    def state_at(self, goods_sno: int, at: datetime) -> GoodsSnapshot | None:
+        '''
+        None for an unknown goods and before the first event of the goods.
+        '''
+        idx: int = self._position(goods_sno=goods_sno)
+        if idx < 0:
+            return None
+        begin, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        i: int = begin + int(np.searchsorted(self.times[begin:end], self._epoch(at=at), side='right')) - 1
+        return self._snapshot(i=i) if i >= begin else None
+
+    def states_between(
+            self,
+            goods_sno: int,
+            begin_at: datetime,
+            end_at: datetime,
+    ) -> list[tuple[datetime, GoodsSnapshot]]:
+        '''
+        (since, state) of every state in effect during [begin_at, end_at]: the one at begin_at and every
+        change up to end_at. `since` of the first one can be before begin_at.
+        '''
+        idx: int = self._position(goods_sno=goods_sno)
+        if idx < 0:
+            return []
+        begin, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        times: np.ndarray = self.times[begin:end]
+        first: int = max(int(np.searchsorted(times, self._epoch(at=begin_at), side='right')) - 1, 0)
+        last: int = int(np.searchsorted(times, self._epoch(at=end_at), side='right'))
+        return [
+            (TimestampParser.from_epoch(int(times[i])), self._snapshot(i=begin + i))
+            for i in range(first, last)
+        ]
+
+    def states_at(self, queries: Iterable[tuple[int, datetime]]) -> list[GoodsSnapshot | None]:
+        '''
+        state_at of every (goods_sno, at), in the order of `queries`. The queries are grouped by goods, so
+        every goods is looked up once and searched once for all of its times.
+        '''
+        queries = list(queries)
+        res: list[GoodsSnapshot | None] = [None] * len(queries)
+        order: list[int] = sorted(range(len(queries)), key=lambda q: queries[q][0])
+        for goods_sno, group in groupby(order, key=lambda q: queries[q][0]):
+            idx: int = self._position(goods_sno=goods_sno)
+            if idx < 0:
+                continue
+            positions: list[int] = list(group)
+            begin, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+            at: np.ndarray = np.fromiter(
+                (self._epoch(at=queries[q][1]) for q in positions),
+                dtype=np.int64,
+                count=len(positions),
+            )
+            found: np.ndarray = begin + np.searchsorted(self.times[begin:end], at, side='right') - 1
+            for q, i in zip(positions, found.tolist()):
+                if i >= begin:
+                    res[q] = self._snapshot(i=i)
+        return res
+
+    @classmethod
+    def _epoch(cls, at: datetime) -> int:
+        return TimestampParser.to_epoch(TimestampParser.to_wall_clock(dt=at))
+
+    def _position(self, goods_sno: int) -> int:
+        idx: int = int(np.searchsorted(self.goods, goods_sno))
+        if idx < len(self.goods) and self.goods[idx] == goods_sno:
+            return idx
+        return -1
+
+    def _snapshot(self, i: int) -> GoodsSnapshot:
+        return GoodsSnapshot(*[
+            TimestampParser.from_epoch(int(self.columns[name][i])) if name in self.TIME_FIELDS
+            else int(self.columns[name][i])
+            for name in self.FIELDS
+        ])
+
+
+def write_states(rows: Iterable[tuple[object, ...]], header: list[str]) -> None:
+    writer = csv.writer(sys.stdout)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+
+
+if __name__ == '__main__':
+    from price_state_serializer import PriceStateSerializer
+
+    parser = argparse.ArgumentParser(description='Point-in-time price state of goods, from a prebuilt index.')
+    parser.add_argument('--index', default='data/processed/price_state_index.msgpack')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('build', help='replay data/processed once and write the index')
+    at_parser = commands.add_parser('at', help='the state of one goods at a time')
+    at_parser.add_argument('--goods', type=int, required=True)
+    at_parser.add_argument(
+        '--time', type=datetime.fromisoformat, required=True, help='Asia/Seoul wall-clock, or ISO with an offset',
+    )
+    between_parser = commands.add_parser('between', help='the states of one goods during a time range')
+    between_parser.add_argument('--goods', type=int, required=True)
+    between_parser.add_argument('--begin', type=datetime.fromisoformat, required=True)
+    between_parser.add_argument('--end', type=datetime.fromisoformat, required=True)
+    batch_parser = commands.add_parser('batch', help='the states of a csv of goods_sno,time rows')
+    batch_parser.add_argument('--queries', required=True)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        goods_sno_list: list[int] = MergedGoodsSerializer.deserialize(
+            data=FileSaveHelper.read(filepath='data/processed/merged_goods.msgpack')
+        ).tolist()
+        index: PriceStateIndex = PriceStateIndex.build(data=PrepareRevisionService.prepare(
+            goods_sno_list=goods_sno_list,
+            deal_filepath='data/processed/deal_map.msgpack',
+            option_filepath='data/processed/option_map.msgpack',
+            consumer_filepath='data/processed/consumer_map.msgpack',
+            adj_filepath='data/processed/adj_map.msgpack',
+        ))
+        FileSaveHelper.save(data=PriceStateSerializer.serialize(index=index), filepath=args.index)
+        print(f'goods: {len(index.goods)}, change points: {len(index.times)}, saved: {args.index}')
+    else:
+        index = PriceStateSerializer.deserialize(data=FileSaveHelper.read(filepath=args.index))
+
+    if args.command == 'at':
+        state: GoodsSnapshot | None = index.state_at(goods_sno=args.goods, at=args.time)
+        write_states(
+            rows=[] if state is None else [dataclasses.astuple(state)],
+            header=PriceStateIndex.FIELDS,
+        )
+    elif args.command == 'between':
+        write_states(
+            rows=[
+                (since, *dataclasses.astuple(state))
+                for since, state in index.states_between(goods_sno=args.goods, begin_at=args.begin, end_at=args.end)
+            ],
+            header=['since', *PriceStateIndex.FIELDS],
+        )
+    elif args.command == 'batch':
+        with open(args.queries, newline='') as f:
+            queries: list[tuple[int, datetime]] = [
+                (int(goods_sno), datetime.fromisoformat(at)) for goods_sno, at in csv.reader(f)
+            ]
+        write_states(
+            rows=[
+                (goods_sno, at, *(dataclasses.astuple(state) if state is not None else ()))
+                for (goods_sno, at), state in zip(queries, index.states_at(queries=queries))
+            ],
+            header=['query_goods_sno', 'query_time', *PriceStateIndex.FIELDS],
+        )
@@ -0,0 +1,45 @@
+import msgpack
+import numpy as np
+
+from price_state_index import PriceStateIndex
+
+
+class PriceStateSerializer:
+    '''
+    {
+        'version': 2,
+        'goods' / 'offsets' / 'times': little-endian int64 bytes,
+        'columns': {GoodsSnapshot field: little-endian int64 bytes},
+    }
+    '''
+    VERSION: int = 2
+
+    @classmethod
+    def serialize(cls, index: PriceStateIndex) -> bytes:
+        return msgpack.packb({
+            'version': cls.VERSION,
+            'goods': cls._encode(values=index.goods),
+            'offsets': cls._encode(values=index.offsets),
+            'times': cls._encode(values=index.times),
+            'columns': {name: cls._encode(values=values) for name, values in index.columns.items()},
+        })
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> PriceStateIndex:
+        data = msgpack.unpackb(data)
+        if data['version'] != cls.VERSION:
+            raise ValueError(f"unsupported price state index version: {data['version']}")
+        return PriceStateIndex(
+            goods=cls._decode(data=data['goods']),
+            offsets=cls._decode(data=data['offsets']),
+            times=cls._decode(data=data['times']),
+            columns={name: cls._decode(data=values) for name, values in data['columns'].items()},
+        )
+
+    @classmethod
+    def _encode(cls, values: np.ndarray) -> bytes:
+        return values.astype('<i8', copy=False).tobytes()
+
+    @classmethod
+    def _decode(cls, data: bytes) -> np.ndarray:
+        return np.frombuffer(data, dtype='<i8').astype(np.int64)
@@ -0,0 +1,281 @@
+import dataclasses
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Callable, Iterable
+
+import msgpack
+import numpy as np
+
+from run_metrics import RunMetrics
+from src.model.event_table import EventTable
+from src.model.goods_set import GoodsSet
+from timestamp_parser import TimestampParser
+
+
+class RawCsvCodec:
+    '''
+    Versioned encoding of {goods_sno: [RawCsv*]} maps shared by the serializers.
+
+    Rows are positional lists, datetimes are integer epoch microseconds and
+    str fields (operation_type, dt) are codes into per-file dictionaries.
+
+    version 3, an indexed store that can be read through mmap one goods at a time:
+
+        MAGIC
+        one msgpack block of encoded rows per goods, in ascending goods_sno order
+        msgpack meta {'version', 'fields', 'dictionaries'}
+        goods_sno index: int64[goods_count]
+        block offsets: int64[goods_count + 1], the last one is where the meta starts
+        TRAILER (meta offset, meta length, goods_count)
+
+    Files written before versioning are a plain {goods_sno: [asdict(row)]} map without a 'version' key.
+    '''
+    VERSION: int = 3
+    MAGIC: bytes = b'RAWCSV\x00\x03'
+    TRAILER: struct.Struct = struct.Struct('<QQQ')
+
+    @classmethod
+    def is_store(cls, data: bytes | mmap.mmap) -> bool:
+        return data[:len(cls.MAGIC)] == cls.MAGIC
+
+    @classmethod
+    def encode(cls, raw_map: Mapping[int, list[dataclasses.dataclass]], row_type: type) -> bytes:
+        fields: list[str] = [field.name for field in dataclasses.fields(row_type)]
+        time_idx: list[int] = cls._indexes_of(row_type=row_type, field_type=datetime)
+        str_idx: list[int] = cls._indexes_of(row_type=row_type, field_type=str)
+        codes: dict[int, dict[str, int]] = {i: {} for i in str_idx}
+
+        chunks: list[bytes] = [cls.MAGIC]
+        goods: array = array('q')
+        offsets: array = array('q')
+        position: int = len(cls.MAGIC)
+        for goods_sno in sorted(raw_map.keys()):
+            encoded_rows: list[list] = []
+            for row in raw_map[goods_sno]:
+                values: list = [getattr(row, name) for name in fields]
+                for i in time_idx:
+                    values[i] = TimestampParser.to_epoch(values[i])
+                for i in str_idx:
+                    values[i] = codes[i].setdefault(values[i], len(codes[i]))
+                encoded_rows.append(values)
+            block: bytes = msgpack.packb(encoded_rows)
+            goods.append(goods_sno)
+            offsets.append(position)
+            chunks.append(block)
+            position += len(block)
+        offsets.append(position)
+
+        meta: bytes = msgpack.packb({
+            'version': cls.VERSION,
+            'fields': fields,
+            'dictionaries': {fields[i]: list(codes[i].keys()) for i in str_idx},
+        })
+        chunks.append(meta)
+        chunks.append(cls._to_little_endian(goods))
+        chunks.append(cls._to_little_endian(offsets))
+        chunks.append(cls.TRAILER.pack(position, len(meta), len(goods)))
+        return b''.join(chunks)
+
+    @classmethod
+    def decode_store(
+            cls,
+            data: bytes | mmap.mmap,
+            row_type: type,
+            goods_sno_list: Iterable[int] | None = None,
+    ) -> dict[int, list[dataclasses.dataclass]]:
+        '''
+        Decodes the blocks of `goods_sno_list` only, or every goods when it is None.
+        Unknown goods are left out of the result.
+        '''
+        meta, goods, offsets = cls._read_index(data=data)
+        decode_row: Callable[[list], dataclasses.dataclass] = cls._row_decoder(
+            fields=meta['fields'], dictionaries=meta['dictionaries'], row_type=row_type,
+        )
+
+        if goods_sno_list is None:
+            positions: Iterable[int] = range(len(goods))
+        else:
+            positions: Iterable[int] = cls._positions(goods=goods, goods_sno_list=goods_sno_list)
+
+        result: dict[int, list[dataclasses.dataclass]] = {}
+        for idx in positions:
+            rows: list[list] = msgpack.unpackb(data[offsets[idx]:offsets[idx + 1]])
+            result[goods[idx]] = [decode_row(values) for values in rows]
+        return result
+
+    @classmethod
+    def decode_table(
+            cls,
+            data: bytes | mmap.mmap,
+            table_type: type[EventTable],
+            goods_sno_list: Iterable[int] | None = None,
+    ) -> EventTable:
+        '''
+        decode_store straight into the columns of `table_type`: epoch times and dictionary codes are kept as
+        stored and no row objects are built. Goods come out ascending, unknown goods are left out.
+        '''
+        meta, goods, offsets = cls._read_index(data=data)
+        fields: list[str] = meta['fields']
+        if sorted(fields) != sorted(field.name for field in dataclasses.fields(table_type.ROW_TYPE)):
+            raise ValueError(f'fields {fields} do not match {table_type.__name__}')
+
+        if goods_sno_list is None:
+            positions: Iterable[int] = range(len(goods))
+        else:
+            positions: Iterable[int] = sorted(set(cls._positions(goods=goods, goods_sno_list=goods_sno_list)))
+
+        columns: list[array] = [array('I' if name in table_type.STR_COLUMNS else 'q') for name in fields]
+        table_goods: array = array('q')
+        table_offsets: array = array('q', [0])
+        for idx in positions:
+            rows: list[list] = msgpack.unpackb(data[offsets[idx]:offsets[idx + 1]])
+            for i, column in enumerate(columns):
+                column.extend(values[i] for values in rows)
+            table_goods.append(goods[idx])
+            table_offsets.append(table_offsets[-1] + len(rows))
+        return table_type(
+            goods=table_goods,
+            offsets=table_offsets,
+            columns=dict(zip(fields, columns)),
+            dictionaries={name: meta['dictionaries'][name] for name in table_type.STR_COLUMNS},
+        )
+
+    @classmethod
+    def load(
+            cls,
+            filepath: str,
+            row_type: type,
+            goods_sno_list: Iterable[int] | None = None,
+    ) -> dict[int, list[dataclasses.dataclass]] | None:
+        '''
+        Reads only the requested goods of a version 3 file through mmap.
+        Returns None when the file is not a version 3 store.
+        '''
+        with open(filepath, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not cls.is_store(mm):
+                    return None
+                # only the pages of the requested blocks are actually read, this is the mapped file size
+                RunMetrics.count('bytes_mapped', len(mm))
+                return cls.decode_store(data=mm, row_type=row_type, goods_sno_list=goods_sno_list)
+
+    @classmethod
+    def load_table(
+            cls,
+            filepath: str,
+            table_type: type[EventTable],
+            goods_sno_list: Iterable[int] | None = None,
+    ) -> EventTable | None:
+        '''
+        load() into a table, see decode_table. Returns None when the file is not a version 3 store.
+        '''
+        with open(filepath, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not cls.is_store(mm):
+                    return None
+                RunMetrics.count('bytes_mapped', len(mm))
+                return cls.decode_table(data=mm, table_type=table_type, goods_sno_list=goods_sno_list)
+
+    @classmethod
+    def read_goods(cls, filepath: str) -> list[int] | None:
+        '''
+        goods_sno index of a version 3 file, in file order, without decoding any block.
+        Returns None when the file is not a version 3 store.
+        '''
+        with open(filepath, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not cls.is_store(mm):
+                    return None
+                meta_offset, meta_length, goods_count = cls.TRAILER.unpack_from(mm, len(mm) - cls.TRAILER.size)
+                index_offset: int = meta_offset + meta_length
+                return cls._from_little_endian(mm[index_offset:index_offset + 8 * goods_count]).tolist()
+
+    @classmethod
+    def read_goods_set(cls, filepath: str) -> GoodsSet | None:
+        '''
+        The goods_sno index of a version 3 file, which is ascending and unique already, as a GoodsSet.
+        Returns None when the file is not a version 3 store.
+        '''
+        with open(filepath, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not cls.is_store(mm):
+                    return None
+                meta_offset, meta_length, goods_count = cls.TRAILER.unpack_from(mm, len(mm) - cls.TRAILER.size)
+                index_offset: int = meta_offset + meta_length
+                RunMetrics.count('bytes_read', 8 * goods_count)
+                # sliced, so the array does not keep a view on the mapping that is closed next
+                index: bytes = mm[index_offset:index_offset + 8 * goods_count]
+                return GoodsSet.from_sorted(values=np.frombuffer(index, dtype='<i8'))
+
+    @classmethod
+    def _read_index(cls, data: bytes | mmap.mmap) -> tuple[dict, array, array]:
+        '''
+        (meta, goods_sno index, block offsets) of a version 3 store.
+        '''
+        meta_offset, meta_length, goods_count = cls.TRAILER.unpack_from(data, len(data) - cls.TRAILER.size)
+        meta: dict = msgpack.unpackb(data[meta_offset:meta_offset + meta_length])
+        if meta['version'] != cls.VERSION:
+            raise ValueError(f"Unsupported processed file version: {meta['version']}")
+
+        index_offset: int = meta_offset + meta_length
+        goods: array = cls._from_little_endian(data[index_offset:index_offset + 8 * goods_count])
+        offsets: array = cls._from_little_endian(
+            data[index_offset + 8 * goods_count:index_offset + 8 * (2 * goods_count + 1)]
+        )
+        return meta, goods, offsets
+
+    @classmethod
+    def _positions(cls, goods: array, goods_sno_list: Iterable[int]) -> list[int]:
+        positions: list[int] = []
+        for goods_sno in goods_sno_list:
+            idx: int = bisect_left(goods, goods_sno)
+            if idx < len(goods) and goods[idx] == goods_sno:
+                positions.append(idx)
+        return positions
+
+    @classmethod
+    def _row_decoder(
+            cls,
+            fields: list[str],
+            dictionaries: dict[str, list[str]],
+            row_type: type,
+    ) -> Callable[[list], dataclasses.dataclass]:
+        time_fields: set[str] = {field.name for field in dataclasses.fields(row_type) if field.type is datetime}
+        time_idx: list[int] = [i for i, name in enumerate(fields) if name in time_fields]
+        str_idx: list[tuple[int, list[str]]] = [
+            (fields.index(name), dictionary) for name, dictionary in dictionaries.items()
+        ]
+        positional: bool = fields == [field.name for field in dataclasses.fields(row_type)]
+
+        def decode_row(values: list) -> dataclasses.dataclass:
+            for i in time_idx:
+                values[i] = TimestampParser.from_epoch(values[i])
+            for i, dictionary in str_idx:
+                values[i] = dictionary[values[i]]
+            return row_type(*values) if positional else row_type(**dict(zip(fields, values)))
+
+        return decode_row
+
+    @classmethod
+    def _to_little_endian(cls, values: array) -> bytes:
+        if sys.byteorder == 'big':
+            values = array(values.typecode, values)
+            values.byteswap()
+        return values.tobytes()
+
+    @classmethod
+    def _from_little_endian(cls, data: bytes) -> array:
+        values: array = array('q')
+        values.frombytes(data)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    @classmethod
+    def _indexes_of(cls, row_type: type, field_type: type) -> list[int]:
+        return [i for i, field in enumerate(dataclasses.fields(row_type)) if field.type is field_type]
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from src.model.option_context import GoodsContext
+from src.model.prepared_data import PreparedData
+from src.model.raw_csv import RawCsvDeal, RawCsvGoodsOption, RawCsvPlatformConsumer, RawCsvAdj
+from src.model.revision_checkpoint import GoodsCheckpoint
+
+
+class RevisionReplayer:
+    '''
+    Replays the CDC history of one goods in transaction_time order.
+
+    The option, platform consumer and adj timelines are sorted once and consumed through one cursor each.
+    Applying a deal advances every cursor up to the deal's transaction_time, so each event is applied
+    exactly once per goods instead of once per deal.
+    Sources are advanced in the order option, platform consumer, adj: a delete stops the later ones.
+
+    Starting from a checkpoint resumes with its context, its pending events go before the ones of `data`.
+    '''
+
+    def __init__(self, goods_sno: int, data: PreparedData, checkpoint: GoodsCheckpoint | None = None):
+        self.goods_sno: int = goods_sno
+        if checkpoint is None:
+            checkpoint = GoodsCheckpoint(
+                context=GoodsContext(goods_sno=goods_sno),
+                options=[],
+                platform_consumers=[],
+                adjs=[],
+            )
+        self.context: GoodsContext = checkpoint.context
+        self.options: list[RawCsvGoodsOption] = self._timeline(
+            checkpoint.options, data.option_map, goods_sno,
+        )
+        self.platform_consumers: list[RawCsvPlatformConsumer] = self._timeline(
+            checkpoint.platform_consumers, data.platform_consumer_map, goods_sno,
+        )
+        self.adjs: list[RawCsvAdj] = self._timeline(
+            checkpoint.adjs, data.adj_map, goods_sno,
+        )
+        self.option_cursor: int = 0
+        self.platform_consumer_cursor: int = 0
+        self.adj_cursor: int = 0
+
+    def apply(self, deal: RawCsvDeal) -> None:
+        context: GoodsContext = self.context
+        if deal.is_enabled and (deal.operation_type == 'c' or deal.operation_type == 'u'):
+            context.thumbnail_price = deal.thumbnail_price
+        else:
+            context.goods_sno = -1
+
+        self.advance(changed_at=deal.transaction_time)
+
+    def advance(self, changed_at: datetime) -> None:
+        '''
+        Applies every pending option, platform consumer and adj event with transaction_time <= changed_at.
+        '''
+        context: GoodsContext = self.context
+        if context.goods_sno != -1:
+            options: list[RawCsvGoodsOption] = self.options
+            while self.option_cursor < len(options) and options[self.option_cursor].transaction_time <= changed_at:
+                opt: RawCsvGoodsOption = options[self.option_cursor]
+                self.option_cursor += 1
+                if opt.operation_type == 'c' or opt.operation_type == 'u':
+                    context.price_origin = opt.price_origin
+                    context.consumer_origin = opt.consumer_origin
+                    context.total_additional_price = opt.total_additional_price
+
+                elif opt.operation_type == 'd':
+                    context.goods_sno = -1
+
+        if context.goods_sno != -1:
+            platform_consumers: list[RawCsvPlatformConsumer] = self.platform_consumers
+            while (
+                    self.platform_consumer_cursor < len(platform_consumers)
+                    and platform_consumers[self.platform_consumer_cursor].transaction_time <= changed_at
+            ):
+                pc: RawCsvPlatformConsumer = platform_consumers[self.platform_consumer_cursor]
+                self.platform_consumer_cursor += 1
+                if pc.operation_type == 'c' or pc.operation_type == 'u':
+                    context.platform_consumer = pc.consumer_origin
+                    context.platform_total_additional_price = pc.total_additional_price
+
+                elif pc.operation_type == 'd':
+                    context.goods_sno = -1
+
+        if context.goods_sno != -1:
+            adjs: list[RawCsvAdj] = self.adjs
+            while self.adj_cursor < len(adjs) and adjs[self.adj_cursor].transaction_time <= changed_at:
+                adj: RawCsvAdj = adjs[self.adj_cursor]
+                self.adj_cursor += 1
+                if adj.operation_type == 'c' or adj.operation_type == 'u':
+                    context.discount_type = adj.discount_type
+                    context.discount_price = adj.discount_price
+                    context.discount_started_at = adj.started_at
+                    context.discount_ended_at = adj.ended_at
+
+                elif adj.operation_type == 'd':
+                    context.goods_sno = -1
+
+    def to_checkpoint(self) -> GoodsCheckpoint:
+        '''
+        The current context and the events that have not been applied yet.
+        '''
+        return GoodsCheckpoint(
+            context=self.context,
+            options=self.options[self.option_cursor:],
+            platform_consumers=self.platform_consumers[self.platform_consumer_cursor:],
+            adjs=self.adjs[self.adj_cursor:],
+        )
+
+    @classmethod
+    def _timeline(cls, pending: list, raw_map, goods_sno: int) -> list:
+        if goods_sno not in raw_map:
+            return pending
+        return sorted(pending + raw_map[goods_sno], key=lambda x: x.transaction_time)
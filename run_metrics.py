@@ -0,0 +1,194 @@
+import dataclasses
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+
+from src.model.stage_metrics import StageMetrics
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+RSS_UNIT: int = 1 if sys.platform == 'darwin' else 1024
+
+
+class RunMetrics:
+    '''
+    Wall time, CPU time, peak RSS and counters of the stages of one run.
+
+    `with RunMetrics(run_name='main') as metrics:` makes it the current run. RunMetrics.stage() and
+    RunMetrics.count() record into the current run and do nothing without one, so instrumented code can stay
+    on every path. Stages nest as "parent.child", a name used again in the run gets a "#2", "#3".. suffix,
+    and a count goes to every open stage.
+
+    CPU time and peak RSS include the process pool workers once they are joined. Counts made inside a worker
+    are collected by RunMetrics.worker_counts() around the task and added by the parent with add_counts().
+    '''
+    _current: 'RunMetrics | None' = None
+
+    def __init__(self, run_name: str):
+        self.run_name: str = run_name
+        self.started_at: datetime = datetime.now()
+        self.stages: list[StageMetrics | None] = []
+        self.open_stages: list[tuple[str, dict[str, int]]] = []
+        self.name_counts: dict[str, int] = {}
+        self.begin: float = time.perf_counter()
+
+    def __enter__(self) -> 'RunMetrics':
+        RunMetrics._current = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        RunMetrics._current = None
+
+    @classmethod
+    @contextmanager
+    def stage(cls, name: str) -> Iterator[None]:
+        run: RunMetrics | None = cls._current
+        if run is None:
+            yield
+            return
+
+        if run.open_stages:
+            name = f'{run.open_stages[-1][0]}.{name}'
+        run.name_counts[name] = run.name_counts.get(name, 0) + 1
+        if run.name_counts[name] > 1:
+            name = f'{name}#{run.name_counts[name]}'
+        counters: dict[str, int] = {}
+        run.open_stages.append((name, counters))
+        # stages are reported in start order, a parent before its children
+        index: int = len(run.stages)
+        run.stages.append(None)
+        wall_begin: float = time.perf_counter()
+        cpu_begin: float = cls._cpu_seconds()
+        rss_begin: int | None = cls._rss_bytes()
+        peak_rss_begin: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+        try:
+            yield
+        finally:
+            run.open_stages.pop()
+            peak_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+            run.stages[index] = StageMetrics(
+                name=name,
+                wall_seconds=time.perf_counter() - wall_begin,
+                cpu_seconds=cls._cpu_seconds() - cpu_begin,
+                rss_begin_bytes=rss_begin,
+                rss_end_bytes=cls._rss_bytes(),
+                peak_rss_growth_bytes=peak_rss - peak_rss_begin,
+                peak_rss_bytes=peak_rss,
+                children_peak_rss_bytes=resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * RSS_UNIT,
+                counters=counters,
+            )
+
+    @classmethod
+    def count(cls, name: str, value: int = 1) -> None:
+        run: RunMetrics | None = cls._current
+        if run is None:
+            return
+        for _, counters in run.open_stages:
+            counters[name] = counters.get(name, 0) + value
+
+    @classmethod
+    def add_counts(cls, counters: dict[str, int]) -> None:
+        for name, value in counters.items():
+            cls.count(name=name, value=value)
+
+    @classmethod
+    @contextmanager
+    def worker_counts(cls) -> Iterator[dict[str, int]]:
+        '''
+        Collects every count made within it, stages included, into the yielded dict instead of the current run.
+        Meant for process pool tasks, which return the dict so the parent can add_counts() it.
+        '''
+        counters: dict[str, int] = {}
+        run: RunMetrics = cls(run_name='worker')
+        run.open_stages.append(('worker', counters))
+        previous: RunMetrics | None = cls._current
+        cls._current = run
+        try:
+            yield counters
+        finally:
+            cls._current = previous
+
+    def report(self) -> dict:
+        stages: list[dict] = []
+        for stage in self.stages:
+            if stage is None:
+                continue
+            record: dict = dataclasses.asdict(stage)
+            rows: int | None = stage.counters.get('rows_in')
+            record['rows_per_second'] = rows / stage.wall_seconds if rows and stage.wall_seconds else None
+            stages.append(record)
+        return {
+            'run': self.run_name,
+            'started_at': self.started_at.isoformat(),
+            'wall_seconds': time.perf_counter() - self.begin,
+            'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT,
+            'stages': stages,
+        }
+
+    def save(self, report_filepath: str, textfile_filepath: str | None = None) -> None:
+        '''
+        Writes the JSON report and, when given, a Prometheus textfile for the node_exporter textfile collector.
+        '''
+        report: dict = self.report()
+        self._write(filepath=report_filepath, text=json.dumps(report, indent=2))
+        if textfile_filepath:
+            self._write(filepath=textfile_filepath, text=self._to_prometheus(report=report))
+
+    @classmethod
+    def _to_prometheus(cls, report: dict) -> str:
+        gauges: dict[str, tuple[str, list[str]]] = {
+            'pipeline_stage_wall_seconds': ('Wall time of the stage.', []),
+            'pipeline_stage_cpu_seconds': ('CPU time of the stage, pool workers included.', []),
+            'pipeline_stage_peak_rss_bytes': ('Peak RSS of the process when the stage ended.', []),
+            'pipeline_stage_peak_rss_growth_bytes': ('Growth of the peak RSS of the process during the stage.', []),
+            'pipeline_stage_rss_end_bytes': ('RSS of the process when the stage ended.', []),
+            'pipeline_stage_count': ('Counters of the stage, e.g. rows_in or bytes_read.', []),
+        }
+        for stage in report['stages']:
+            labels: str = f'run="{report["run"]}",stage="{stage["name"]}"'
+            gauges['pipeline_stage_wall_seconds'][1].append(f'{{{labels}}} {stage["wall_seconds"]}')
+            gauges['pipeline_stage_cpu_seconds'][1].append(f'{{{labels}}} {stage["cpu_seconds"]}')
+            gauges['pipeline_stage_peak_rss_bytes'][1].append(f'{{{labels}}} {stage["peak_rss_bytes"]}')
+            gauges['pipeline_stage_peak_rss_growth_bytes'][1].append(f'{{{labels}}} {stage["peak_rss_growth_bytes"]}')
+            if stage['rss_end_bytes'] is not None:
+                gauges['pipeline_stage_rss_end_bytes'][1].append(f'{{{labels}}} {stage["rss_end_bytes"]}')
+            for name, value in stage['counters'].items():
+                gauges['pipeline_stage_count'][1].append(f'{{{labels},counter="{name}"}} {value}')
+
+        lines: list[str] = []
+        for metric, (help_text, samples) in gauges.items():
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} gauge')
+            lines.extend(f'{metric}{sample}' for sample in samples)
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def _write(cls, filepath: str, text: str) -> None:
+        # written next to the target and renamed, so collectors never read a partial file
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        tmp_filepath: str = f'{filepath}.tmp'
+        with open(tmp_filepath, 'w') as f:
+            f.write(text)
+        os.replace(tmp_filepath, filepath)
+
+    @classmethod
+    def _cpu_seconds(cls) -> float:
+        own: resource.struct_rusage = resource.getrusage(resource.RUSAGE_SELF)
+        children: resource.struct_rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+    @classmethod
+    def _rss_bytes(cls) -> int | None:
+        '''
+        Current RSS from /proc/self/statm, None where there is no procfs.
+        '''
+        try:
+            with open('/proc/self/statm') as f:
+                resident_pages: int = int(f.read().split()[1])
+        except OSError:
+            return None
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
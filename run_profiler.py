@@ -0,0 +1,125 @@
+import cProfile
+import json
+import os
+import pstats
+from contextlib import contextmanager
+from typing import Iterator
+
+# pstats keys: (filename, line number, function name)
+FunctionKey = tuple[str, int, str]
+
+
+class RunProfiler:
+    '''
+    Opt-in cProfile of every top level stage, for `--profile` runs.
+
+    `with RunProfiler(output_dir=..., hot_functions=[(CsvParser, 'parse_raw_deal'), ..]):` makes it the
+    current profiler. RunProfiler.stage() profiles the outermost stage only, cProfile cannot nest, and does
+    nothing without a current profiler, so it stays on the production code paths.
+
+    Per stage it writes into output_dir:
+        <stage>.pstats      for `python -m pstats` or snakeviz
+        <stage>.collapsed   "caller;callee;.. microseconds" lines for flamegraph.pl or speedscope
+    and counters.json with the call counts of the hot functions per stage, taken from the profile itself,
+    so nothing is wrapped or patched.
+
+    The process pool workers are not profiled and their calls are not counted.
+    '''
+    _current: 'RunProfiler | None' = None
+
+    def __init__(self, output_dir: str, hot_functions: list[tuple[type, str]]):
+        self.output_dir: str = output_dir
+        self.hot_functions: dict[str, FunctionKey] = {
+            f'{owner.__name__}.{name}': self._function_key(attribute=owner.__dict__[name])
+            for owner, name in hot_functions
+        }
+        self.stage_calls: dict[str, dict[str, int]] = {}
+        self.depth: int = 0
+
+    def __enter__(self) -> 'RunProfiler':
+        os.makedirs(self.output_dir, exist_ok=True)
+        RunProfiler._current = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        RunProfiler._current = None
+        with open(os.path.join(self.output_dir, 'counters.json'), 'w') as f:
+            json.dump(self.stage_calls, f, indent=2)
+
+    @classmethod
+    @contextmanager
+    def stage(cls, name: str) -> Iterator[None]:
+        profiler: RunProfiler | None = cls._current
+        if profiler is None or profiler.depth > 0:
+            yield
+            return
+
+        profiler.depth += 1
+        profile: cProfile.Profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profiler.depth -= 1
+            profiler._save(name=name, profile=profile)
+
+    def _save(self, name: str, profile: cProfile.Profile) -> None:
+        filename: str = name.replace(os.sep, '_')
+        pstats_filepath: str = os.path.join(self.output_dir, f'{filename}.pstats')
+        profile.dump_stats(pstats_filepath)
+        stats: dict = pstats.Stats(profile).stats
+        # (primitive calls, total calls, ..), recursive calls included
+        self.stage_calls[name] = {
+            function: stats[key][1] for function, key in self.hot_functions.items() if key in stats
+        }
+        with open(os.path.join(self.output_dir, f'{filename}.collapsed'), 'w') as f:
+            for stack, microseconds in self._collapse(stats=stats).items():
+                f.write(f'{stack} {microseconds}\n')
+        print(f'profile {name}: {pstats_filepath}')
+
+    @classmethod
+    def _collapse(cls, stats: dict) -> dict[str, int]:
+        '''
+        Collapsed stacks estimated from the caller/callee graph of cProfile: the time of a function is split
+        over its callers in proportion to the cumulative time of every call edge, like gprof2dot does.
+        Recursive edges are cut at the first repeat.
+        '''
+        callees: dict[FunctionKey, list[tuple[FunctionKey, float]]] = {}
+        for callee, (_, _, _, _, callers) in stats.items():
+            for caller, (_, _, _, edge_cumulative) in callers.items():
+                callees.setdefault(caller, []).append((callee, edge_cumulative))
+
+        stacks: dict[str, int] = {}
+
+        def walk(key: FunctionKey, seconds: float, path: list[str], visiting: set[FunctionKey]) -> None:
+            _, _, own, cumulative, _ = stats[key]
+            if seconds < 1e-6 or cumulative <= 0:
+                return
+            path.append(cls._label(key=key))
+            visiting.add(key)
+            share: float = seconds / cumulative
+            stack: str = ';'.join(path)
+            stacks[stack] = stacks.get(stack, 0) + round(own * share * 1e6)
+            for callee, edge_cumulative in callees.get(key, []):
+                if callee not in visiting:
+                    walk(key=callee, seconds=edge_cumulative * share, path=path, visiting=visiting)
+            visiting.discard(key)
+            path.pop()
+
+        for key, (_, _, _, cumulative, callers) in stats.items():
+            if not callers:
+                walk(key=key, seconds=cumulative, path=[], visiting=set())
+        return {stack: microseconds for stack, microseconds in stacks.items() if microseconds > 0}
+
+    @classmethod
+    def _function_key(cls, attribute: object) -> FunctionKey:
+        func = attribute.__func__ if isinstance(attribute, (classmethod, staticmethod)) else attribute
+        return func.__code__.co_filename, func.__code__.co_firstlineno, func.__code__.co_name
+
+    @classmethod
+    def _label(cls, key: FunctionKey) -> str:
+        filename, line, function = key
+        if filename == '~':
+            return function.replace(';', ',').replace(' ', '_')
+        return f'{os.path.basename(filename)}:{line}:{function}'.replace(';', ',').replace(' ', '_')
@@ -1,14 +1,14 @@
 import dataclasses
 from datetime import datetime
 
-from src.model.option_context import GoodsContext
+from src.model.option_context import GoodsSnapshot
 from src.model.raw_csv import RawCsvDeal
 
 
 @dataclasses.dataclass(frozen=True)
 class EditRevision:
     goods_sno: int
-    context: GoodsContext
+    context: GoodsSnapshot
     deal: RawCsvDeal
     transaction_time: datetime
 
@@ -0,0 +1,189 @@
+import dataclasses
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from src.model.raw_csv import RawCsvGoodsOption, RawCsvPolicy, RawCsvDeal, RawCsvAdj, RawCsvPlatformConsumer
+from timestamp_parser import TimestampParser
+
+
+class EventTable(Mapping):
+    '''
+    Column-oriented storage of one CDC source grouped by goods_sno.
+
+    int/bool columns are `array('q')`, datetime columns are int64 epoch microseconds and
+    str columns (operation_type, dt) are dictionary-encoded into `array('I')` codes.
+    The rows of goods[i] are at positions offsets[i]:offsets[i + 1] of every column, goods are ascending.
+
+    It is a Mapping[int, list[ROW_TYPE]], rows are materialized only for the goods being looked up.
+    '''
+    ROW_TYPE: type = None
+    TIME_COLUMNS: frozenset[str] = frozenset()
+    STR_COLUMNS: frozenset[str] = frozenset()
+    BOOL_COLUMNS: frozenset[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields: tuple[dataclasses.Field, ...] = dataclasses.fields(cls.ROW_TYPE)
+        cls.TIME_COLUMNS = frozenset(field.name for field in fields if field.type is datetime)
+        cls.STR_COLUMNS = frozenset(field.name for field in fields if field.type is str)
+        cls.BOOL_COLUMNS = frozenset(field.name for field in fields if field.type is bool)
+
+    def __init__(
+            self,
+            goods: array,
+            offsets: array,
+            columns: dict[str, array],
+            dictionaries: dict[str, list[str]],
+    ):
+        self.goods: array = goods
+        self.offsets: array = offsets
+        self.columns: dict[str, array] = columns
+        self.dictionaries: dict[str, list[str]] = dictionaries
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dataclasses.dataclass]) -> 'EventTable':
+        '''
+        Builds the table from a row stream (e.g. CsvParser.parse_options) without keeping the rows alive.
+        Rows of the same goods keep their arrival order.
+        '''
+        names: list[str] = [field.name for field in dataclasses.fields(cls.ROW_TYPE)]
+        columns: dict[str, array] = {name: array('I' if name in cls.STR_COLUMNS else 'q') for name in names}
+        dictionaries: dict[str, list[str]] = {name: [] for name in cls.STR_COLUMNS}
+        codes: dict[str, dict[str, int]] = {name: {} for name in cls.STR_COLUMNS}
+        for row in rows:
+            for name in names:
+                value = getattr(row, name)
+                if name in cls.TIME_COLUMNS:
+                    value = TimestampParser.to_epoch(value)
+                elif name in codes:
+                    value = cls._encode(value=value, codes=codes[name], dictionary=dictionaries[name])
+                columns[name].append(value)
+        return cls._group(columns=columns, dictionaries=dictionaries)
+
+    @classmethod
+    def from_map(cls, raw_map: Mapping[int, list[dataclasses.dataclass]]) -> 'EventTable':
+        return cls.from_rows(
+            row for goods_sno in sorted(raw_map.keys()) for row in raw_map[goods_sno]
+        )
+
+    @classmethod
+    def concat(cls, tables: list['EventTable']) -> 'EventTable':
+        '''
+        Merges tables, e.g. one per chunk of the same CSV. Rows of a goods keep the order of `tables`.
+        '''
+        names: list[str] = [field.name for field in dataclasses.fields(cls.ROW_TYPE)]
+        columns: dict[str, array] = {name: array('I' if name in cls.STR_COLUMNS else 'q') for name in names}
+        dictionaries: dict[str, list[str]] = {name: [] for name in cls.STR_COLUMNS}
+        codes: dict[str, dict[str, int]] = {name: {} for name in cls.STR_COLUMNS}
+        for table in tables:
+            for name in names:
+                if name not in codes:
+                    columns[name].extend(table.columns[name])
+                    continue
+                recoded: list[int] = [
+                    cls._encode(value=value, codes=codes[name], dictionary=dictionaries[name])
+                    for value in table.dictionaries[name]
+                ]
+                columns[name].extend(recoded[code] for code in table.columns[name])
+        return cls._group(columns=columns, dictionaries=dictionaries)
+
+    def __getitem__(self, goods_sno: int) -> list[dataclasses.dataclass]:
+        idx: int = self._position(goods_sno)
+        if idx < 0:
+            raise KeyError(goods_sno)
+        return [self._row(i) for i in range(self.offsets[idx], self.offsets[idx + 1])]
+
+    def __contains__(self, goods_sno: object) -> bool:
+        return isinstance(goods_sno, int) and self._position(goods_sno) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.goods)
+
+    def __len__(self) -> int:
+        return len(self.goods)
+
+    @property
+    def row_count(self) -> int:
+        return self.offsets[-1]
+
+    def _position(self, goods_sno: int) -> int:
+        idx: int = bisect_left(self.goods, goods_sno)
+        if idx < len(self.goods) and self.goods[idx] == goods_sno:
+            return idx
+        return -1
+
+    def _row(self, i: int) -> dataclasses.dataclass:
+        values: dict = {}
+        for name, col in self.columns.items():
+            value = col[i]
+            if name in self.STR_COLUMNS:
+                value = self.dictionaries[name][value]
+            elif name in self.TIME_COLUMNS:
+                value = TimestampParser.from_epoch(value)
+            elif name in self.BOOL_COLUMNS:
+                value = bool(value)
+            values[name] = value
+        return self.ROW_TYPE(**values)
+
+    @classmethod
+    def _group(cls, columns: dict[str, array], dictionaries: dict[str, list[str]]) -> 'EventTable':
+        '''
+        Counting sort of the row positions by goods_sno, stable within a goods.
+        '''
+        goods_column: array = columns['goods_sno']
+        counts: dict[int, int] = {}
+        for goods_sno in goods_column:
+            counts[goods_sno] = counts.get(goods_sno, 0) + 1
+
+        goods: array = array('q', sorted(counts.keys()))
+        offsets: array = array('q', [0])
+        cursors: dict[int, int] = {}
+        for goods_sno in goods:
+            cursors[goods_sno] = offsets[-1]
+            offsets.append(offsets[-1] + counts[goods_sno])
+        del counts
+
+        positions: array = array('q', bytes(8 * len(goods_column)))
+        for i, goods_sno in enumerate(goods_column):
+            positions[i] = cursors[goods_sno]
+            cursors[goods_sno] += 1
+        del cursors
+
+        grouped: dict[str, array] = {}
+        for name, col in columns.items():
+            out: array = array(col.typecode, bytes(col.itemsize * len(col)))
+            for i, pos in enumerate(positions):
+                out[pos] = col[i]
+            grouped[name] = out
+        return cls(goods=goods, offsets=offsets, columns=grouped, dictionaries=dictionaries)
+
+    @classmethod
+    def _encode(cls, value: str, codes: dict[str, int], dictionary: list[str]) -> int:
+        code: int | None = codes.get(value)
+        if code is None:
+            code = codes[value] = len(dictionary)
+            dictionary.append(value)
+        return code
+
+
+class OptionTable(EventTable):
+    ROW_TYPE = RawCsvGoodsOption
+
+
+class PolicyTable(EventTable):
+    ROW_TYPE = RawCsvPolicy
+
+
+class DealTable(EventTable):
+    ROW_TYPE = RawCsvDeal
+
+
+class AdjTable(EventTable):
+    ROW_TYPE = RawCsvAdj
+
+
+class PlatformConsumerTable(EventTable):
+    ROW_TYPE = RawCsvPlatformConsumer
@@ -0,0 +1,68 @@
+import dataclasses
+from typing import Iterable, Iterator
+
+import numpy as np
+
+
+@dataclasses.dataclass(frozen=True)
+class GoodsSet:
+    '''
+    A set of goods_sno as one sorted, duplicate free int64 array: 8 bytes per goods instead of an int object
+    and a hash slot, and intersection/union are linear merges of the arrays.
+    '''
+    values: np.ndarray
+
+    @classmethod
+    def from_iterable(cls, goods_sno: Iterable[int]) -> 'GoodsSet':
+        return cls.from_array(values=np.fromiter(goods_sno, dtype=np.int64))
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> 'GoodsSet':
+        return cls(values=np.unique(values.astype(np.int64, copy=False)))
+
+    @classmethod
+    def from_sorted(cls, values: np.ndarray) -> 'GoodsSet':
+        '''
+        `values` must already be ascending and unique, e.g. the goods_sno index of a processed file.
+        '''
+        return cls(values=values.astype(np.int64, copy=False))
+
+    @classmethod
+    def intersect_all(cls, goods_sets: Iterable['GoodsSet']) -> 'GoodsSet':
+        # the smallest first keeps every intermediate result small
+        ordered: list[GoodsSet] = sorted(goods_sets, key=len)
+        result: GoodsSet = ordered[0]
+        for goods_set in ordered[1:]:
+            result = result & goods_set
+        return result
+
+    def __and__(self, other: 'GoodsSet') -> 'GoodsSet':
+        return GoodsSet(values=np.intersect1d(self.values, other.values, assume_unique=True))
+
+    def __or__(self, other: 'GoodsSet') -> 'GoodsSet':
+        return GoodsSet(values=np.union1d(self.values, other.values))
+
+    def __contains__(self, goods_sno: int) -> bool:
+        idx: int = int(np.searchsorted(self.values, goods_sno))
+        return idx < len(self.values) and bool(self.values[idx] == goods_sno)
+
+    def contains_many(self, goods_sno: np.ndarray) -> np.ndarray:
+        '''
+        Membership of every element of `goods_sno` as a bool array.
+        '''
+        if not len(self.values):
+            return np.zeros(len(goods_sno), dtype=bool)
+        idx: np.ndarray = np.minimum(np.searchsorted(self.values, goods_sno), len(self.values) - 1)
+        return self.values[idx] == goods_sno
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.values.tolist())
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, GoodsSet) and np.array_equal(self.values, other.values)
+
+    def tolist(self) -> list[int]:
+        return self.values.tolist()
@@ -0,0 +1,8 @@
+import dataclasses
+
+
+@dataclasses.dataclass(frozen=True)
+class IngestSource:
+    name: str
+    csv_filepath: str
+    output_filepath: str
@@ -26,3 +26,43 @@ class GoodsContext:
     discount_type: int = -1
     created_at: datetime = datetime(1970, 1, 1)
     updated_at: datetime = datetime(1970, 1, 1)
+    # validity window of the adj that set discount_price/discount_type
+    discount_started_at: datetime = datetime(1970, 1, 1)
+    discount_ended_at: datetime = datetime(9999, 12, 31)
+
+    def snapshot(self) -> 'GoodsSnapshot':
+        return GoodsSnapshot(
+            self.goods_sno,
+            self.thumbnail_price,
+            self.consumer_origin,
+            self.price_origin,
+            self.total_additional_price,
+            self.platform_consumer,
+            self.platform_total_additional_price,
+            self.discount_price,
+            self.discount_type,
+            self.created_at,
+            self.updated_at,
+            self.discount_started_at,
+            self.discount_ended_at,
+        )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class GoodsSnapshot:
+    '''
+    Immutable state of a GoodsContext at one point of the replay.
+    '''
+    goods_sno: int
+    thumbnail_price: int
+    consumer_origin: int
+    price_origin: int
+    total_additional_price: int
+    platform_consumer: int
+    platform_total_additional_price: int
+    discount_price: int
+    discount_type: int
+    created_at: datetime
+    updated_at: datetime
+    discount_started_at: datetime
+    discount_ended_at: datetime
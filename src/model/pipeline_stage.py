@@ -0,0 +1,17 @@
+import dataclasses
+from typing import Callable
+
+
+@dataclasses.dataclass(frozen=True)
+class PipelineStage:
+    '''
+    `code` lists the source files, relative to the repository root, whose contents version the stage.
+    Editing any of them re-runs the stage, and so does changing any of the JSON-serializable `params`.
+    '''
+    name: str
+    run: Callable[[], None]
+    inputs: list[str]
+    outputs: list[str]
+    code: list[str]
+    version: int = 1
+    params: dict = dataclasses.field(default_factory=dict)
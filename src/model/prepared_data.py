@@ -1,11 +1,15 @@
 import dataclasses
+from collections.abc import Mapping
 
 from src.model.raw_csv import RawCsvDeal, RawCsvGoodsOption, RawCsvPlatformConsumer, RawCsvAdj
 
 
 @dataclasses.dataclass(frozen=True)
 class PreparedData:
-    deal_map: dict[int, list[RawCsvDeal]]
-    option_map: dict[int, list[RawCsvGoodsOption]]
-    platform_consumer_map: dict[int, list[RawCsvPlatformConsumer]]
-    adj_map: dict[int, list[RawCsvAdj]]
+    '''
+    Maps are either plain dicts or the columnar tables of src.model.event_table.
+    '''
+    deal_map: Mapping[int, list[RawCsvDeal]]
+    option_map: Mapping[int, list[RawCsvGoodsOption]]
+    platform_consumer_map: Mapping[int, list[RawCsvPlatformConsumer]]
+    adj_map: Mapping[int, list[RawCsvAdj]]
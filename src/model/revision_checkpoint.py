@@ -0,0 +1,25 @@
+import dataclasses
+from datetime import datetime
+
+from src.model.option_context import GoodsContext
+from src.model.raw_csv import RawCsvGoodsOption, RawCsvPlatformConsumer, RawCsvAdj
+
+
+@dataclasses.dataclass(frozen=True)
+class GoodsCheckpoint:
+    '''
+    Replay state of one goods: the context after its last deal and the events not applied yet.
+    '''
+    context: GoodsContext
+    options: list[RawCsvGoodsOption]
+    platform_consumers: list[RawCsvPlatformConsumer]
+    adjs: list[RawCsvAdj]
+
+
+@dataclasses.dataclass(frozen=True)
+class RevisionCheckpoint:
+    '''
+    watermarks: per PreparedData field, the latest transaction_time replayed from every dt partition.
+    '''
+    watermarks: dict[str, dict[str, datetime]]
+    goods: dict[int, GoodsCheckpoint]
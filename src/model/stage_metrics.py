@@ -0,0 +1,19 @@
+import dataclasses
+
+
+@dataclasses.dataclass(frozen=True)
+class StageMetrics:
+    '''
+    Peak RSS values are the process-wide peaks when the stage ended, they never decrease over a run.
+    peak_rss_growth_bytes is how much the stage raised the peak, the RSS at its begin and end is None without procfs.
+    `counters` holds e.g. rows_in, rows_out, bytes_read, bytes_written and skipped_goods.<source>.
+    '''
+    name: str
+    wall_seconds: float
+    cpu_seconds: float
+    rss_begin_bytes: int | None
+    rss_end_bytes: int | None
+    peak_rss_growth_bytes: int
+    peak_rss_bytes: int
+    children_peak_rss_bytes: int
+    counters: dict[str, int]
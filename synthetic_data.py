@@ -0,0 +1,260 @@
+import argparse
+import csv
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Callable
+
+from src.util import discard_ones_digit
+
+TIMEZONE: str = 'Asia/Seoul'
+
+
+class SyntheticDataGenerator:
+    '''
+    Writes synthetic versions of every pipeline input, with the file names main.py and main2.py read.
+
+    Goods popularity follows a Zipf distribution over `goods_count` goods, so a few goods own most of the events.
+    A share of the events is packed into update bursts: short windows in which one market rewrites many of its goods.
+    Rows of every file are written in time order, like the exports.
+    '''
+    START: datetime = datetime(2025, 1, 7)
+    DAYS: int = 7
+    ZIPF_EXPONENT: float = 1.1
+    BURST_SHARE: float = 0.3
+    BURSTS_PER_DAY: int = 4
+    BURST_SECONDS: int = 600
+    MARKET_COUNT: int = 100
+    MISPRICED_SHARE: float = 0.05
+
+    OPTION_HEADER: list[str] = [
+        'market_sno', 'goods_sno', 'option_sno', 'consumer_origin', 'price_origin', 'total_additional_price',
+        'link', 'is_display', 'operation_type', 'transaction_time', 'dt',
+    ]
+    POLICY_HEADER: list[str] = [
+        'is_active', 'status', 'pricing_strategy', 'policy_value', 'policy_type', 'market_sno', 'goods_sno',
+        'discount_method', 'started_at', 'ended_at', 'operation_type', 'deleted_at', 'transaction_time', 'dt',
+    ]
+    DEAL_HEADER: list[str] = [
+        'sno', 'goods_sno', 'goods_discount_policy_sno', 'thumbnail_price', 'is_enabled', 'operation_type',
+        'transaction_time', 'dt',
+    ]
+    ADJ_HEADER: list[str] = [
+        'market_sno', 'goods_sno', 'discount_type', 'discount_price', 'started_at', 'ended_at', 'created_by',
+        'memo', 'operation_type', 'transaction_time', 'dt',
+    ]
+    CONSUMER_HEADER: list[str] = [
+        'sno', 'goods_sno', 'consumer_origin', 'total_additional_price', 'app_type', 'created_at', 'updated_at',
+        'operation_type', 'transaction_time', 'dt',
+    ]
+    LOG_HEADER: list[str] = [
+        'ably_market_sno', 'ably_sno', 'consumer_origin', 'price_origin', 'discount_price', 'discount_rate',
+        'discount_type', 'started_at', 'ended_at', 'asctime', 'message',
+    ]
+    SELLER_LOG_HEADER: list[str] = [
+        'Date', 'ably_market_sno', '@ably_sno', '@prices', 'consumer_origin', '@price_origin', '@discount_type',
+        '@discount_rate', '@discount_price', '@ended_at', '@started_at', 'Message',
+    ]
+    ITEM_HEADER: list[str] = [
+        'sno', 'ordno', 'market_sno', 'goods_option_sno', 'goodsno', 'goodsnm', 'price', 'memberdc', 'emoney',
+        'coupon', 'ea', 'reserve', 'checked_at',
+    ]
+
+    def __init__(self, goods_count: int, seed: int):
+        self.random: random.Random = random.Random(seed)
+        self.goods: list[int] = sorted(self.random.sample(range(10_000_000, 40_000_000), goods_count))
+        self.markets: dict[int, int] = {
+            goods_sno: self.random.randrange(1, self.MARKET_COUNT + 1) for goods_sno in self.goods
+        }
+        self.prices: dict[int, int] = {
+            goods_sno: self.random.randrange(5_000, 200_000, 100) for goods_sno in self.goods
+        }
+        self.market_goods: dict[int, list[int]] = {}
+        for goods_sno, market_sno in self.markets.items():
+            self.market_goods.setdefault(market_sno, []).append(goods_sno)
+
+        popularity: list[int] = self.goods[:]
+        self.random.shuffle(popularity)
+        self.popularity: list[int] = popularity
+        self.cum_weights: list[float] = list(accumulate(
+            1 / rank ** self.ZIPF_EXPONENT for rank in range(1, goods_count + 1)
+        ))
+        self.bursts: list[tuple[int, int]] = [
+            (self.random.randrange(day * 86400, (day + 1) * 86400), self.random.choice(list(self.market_goods)))
+            for day in range(self.DAYS)
+            for _ in range(self.BURSTS_PER_DAY)
+        ]
+
+    def generate(self, out_dir: str, events: int, logs: int, items: int, log_files: int) -> None:
+        '''
+        `events` rows per CDC table, `logs` vendor log rows split into `log_files` files,
+        logs / 4 seller log rows and `items` order items.
+        '''
+        os.makedirs(f'{out_dir}/logs', exist_ok=True)
+        self._write(f'{out_dir}/goods.csv', ['goods_sno'], ([goods_sno] for goods_sno in self.goods))
+        self._write_events(f'{out_dir}/options_250107_250113.csv', self.OPTION_HEADER, events, self._option)
+        self._write_events(f'{out_dir}/policies_250107_250113.csv', self.POLICY_HEADER, events, self._policy)
+        self._write_events(f'{out_dir}/deals.csv', self.DEAL_HEADER, events, self._deal, quoting=csv.QUOTE_ALL)
+        self._write_events(f'{out_dir}/adj_250107_250113.csv', self.ADJ_HEADER, events, self._adj)
+        self._write_events(f'{out_dir}/consumer_250107_250113.csv', self.CONSUMER_HEADER, events, self._consumer)
+        for i in range(log_files):
+            self._write_events(f'{out_dir}/logs/vendor_logs_{i}.csv', self.LOG_HEADER, logs // log_files, self._log)
+        self._write_events(f'{out_dir}/seller_logs.csv', self.SELLER_LOG_HEADER, logs // 4, self._seller_log)
+        self._write_events(f'{out_dir}/ably_gd_order_item.csv', self.ITEM_HEADER, items, self._item)
+
+    def _option(self, i: int, goods_sno: int, at: datetime) -> list:
+        price: int = self.prices[goods_sno]
+        return [
+            self.markets[goods_sno], goods_sno, goods_sno * 10 + i % 5, price,
+            discard_ones_digit(price * self.random.choice([80, 90, 100]) // 100), self.random.choice([0, 0, 1000]),
+            self.random.randint(0, 1), 1, self._operation_type(), self._cdc_time(at), self._dt(at),
+        ]
+
+    def _policy(self, i: int, goods_sno: int, at: datetime) -> list:
+        return [
+            self.random.choice(['true', 'true', 'false']), 1, 0, self.random.randrange(0, 5_000, 10),
+            self.random.randint(0, 1), self.markets[goods_sno], goods_sno, 0,
+            self._cdc_time(at - timedelta(days=3)), self._cdc_time(at + timedelta(days=30)),
+            self._operation_type(), '', self._cdc_time(at), self._dt(at),
+        ]
+
+    def _deal(self, i: int, goods_sno: int, at: datetime) -> list:
+        thumbnail_price: int = discard_ones_digit(self.prices[goods_sno] * 9 // 10)
+        if self.random.random() < self.MISPRICED_SHARE:
+            thumbnail_price = discard_ones_digit(thumbnail_price * self.random.randint(50, 99) // 100)
+        return [
+            i, goods_sno, i * 3, f'{thumbnail_price}.0', self.random.choice(['true', 'true', 'true', 'false']),
+            self.random.choice('cuuu'), self._cdc_time(at), self._dt(at),
+        ]
+
+    def _adj(self, i: int, goods_sno: int, at: datetime) -> list:
+        return [
+            self.markets[goods_sno], goods_sno, 0, self.random.choice([0, 0, 1000, 2000]),
+            self._cdc_time(at - timedelta(days=1)), self._cdc_time(at + timedelta(days=self.random.randint(1, 30))),
+            'seller, api', 'bulk update\nfrom partner', self._operation_type(), self._cdc_time(at), self._dt(at),
+        ]
+
+    def _consumer(self, i: int, goods_sno: int, at: datetime) -> list:
+        return [
+            i, goods_sno, self.prices[goods_sno], 0, self.random.randint(0, 1), self._cdc_time(at), self._cdc_time(at),
+            self._operation_type(), self._cdc_time(at), self._dt(at),
+        ]
+
+    def _log(self, i: int, goods_sno: int, at: datetime) -> list:
+        price: int = self.prices[goods_sno]
+        has_adj: bool = self.random.random() < 0.3
+        return [
+            self.markets[goods_sno], goods_sno, price, discard_ones_digit(price * 9 // 10),
+            self.random.randrange(0, 3_000, 10) if has_adj else '', self.random.choice(['', '0', '10']),
+            1 if has_adj else 0,
+            self._iso_time(at - timedelta(days=1)) if has_adj else '',
+            self._iso_time(at + timedelta(days=7)) if has_adj else '',
+            at.strftime('%Y-%m-%d %H:%M:%S,') + f'{at.microsecond // 1000:03d}',
+            'vendor_seller_update_goods' if self.random.random() < 0.95 else 'vendor_seller_get_goods',
+        ]
+
+    def _seller_log(self, i: int, goods_sno: int, at: datetime) -> list:
+        price: int = self.prices[goods_sno]
+        # seller logs are written in UTC
+        date: str = self._iso_time(at - timedelta(hours=9))
+        if self.random.random() < 0.3:
+            prices: str = json.dumps([
+                {
+                    'app_type': app_type,
+                    'discount_policy': {'policy_type': 0, 'policy_value': self.random.randrange(0, 3_000, 10)},
+                    'consumer': price,
+                }
+                for app_type in (0, 1)
+            ], separators=(',', ':'))
+            return [date, self.markets[goods_sno], f'"{goods_sno}"', prices, '', '', '', '', '', '', '', 'update']
+        return [
+            date, self.markets[goods_sno], f'"{goods_sno}"', '', price, discard_ones_digit(price * 9 // 10),
+            0, 0, self.random.randrange(0, 3_000, 10), '', '', 'update_seller_goods',
+        ]
+
+    def _item(self, i: int, goods_sno: int, at: datetime) -> list:
+        price: int = discard_ones_digit(self.prices[goods_sno] * 9 // 10)
+        if self.random.random() < self.MISPRICED_SHARE:
+            price -= self.random.randrange(100, 1_000, 100)
+        return [
+            i, 100_000 + i // 3, self.markets[goods_sno], goods_sno * 10 + i % 5, goods_sno,
+            f'goods {goods_sno}, "{self.markets[goods_sno]}"', price, 0, 0, 0, self.random.randint(1, 3), 0,
+            at.strftime('%Y-%m-%d %H:%M:%S.') + f'{at.microsecond // 1000:03d}',
+        ]
+
+    def _write_events(
+            self,
+            filepath: str,
+            header: list[str],
+            count: int,
+            make_row: Callable[[int, int, datetime], list],
+            quoting: int = csv.QUOTE_MINIMAL,
+    ) -> None:
+        events: list[tuple[datetime, int]] = sorted(self._event() for _ in range(count))
+        self._write(
+            filepath,
+            header,
+            (make_row(i, goods_sno, at) for i, (at, goods_sno) in enumerate(events)),
+            quoting=quoting,
+        )
+
+    def _event(self) -> tuple[datetime, int]:
+        if self.random.random() < self.BURST_SHARE:
+            begin, market_sno = self.random.choice(self.bursts)
+            offset: int = begin + self.random.randrange(self.BURST_SECONDS)
+            goods_sno: int = self.random.choice(self.market_goods[market_sno])
+        else:
+            offset: int = self.random.randrange(self.DAYS * 86400)
+            goods_sno: int = self.random.choices(self.popularity, cum_weights=self.cum_weights)[0]
+        at: datetime = self.START + timedelta(seconds=offset, milliseconds=self.random.randrange(1000))
+        return at, goods_sno
+
+    def _operation_type(self) -> str:
+        value: float = self.random.random()
+        if value < 0.1:
+            return 'c'
+        if value < 0.98:
+            return 'u'
+        return 'd'
+
+    @classmethod
+    def _write(cls, filepath: str, header: list[str], rows, quoting: int = csv.QUOTE_MINIMAL) -> None:
+        print('writing: ', filepath)
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.writer(f, quoting=quoting, lineterminator='\n')
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    @classmethod
+    def _cdc_time(cls, at: datetime) -> str:
+        return at.strftime('%Y-%m-%d %H:%M:%S.') + f'{at.microsecond // 1000:03d} {TIMEZONE}'
+
+    @classmethod
+    def _iso_time(cls, at: datetime) -> str:
+        return at.strftime('%Y-%m-%dT%H:%M:%S.') + f'{at.microsecond // 1000:03d}Z'
+
+    @classmethod
+    def _dt(cls, at: datetime) -> str:
+        return at.strftime('%Y-%m-%d')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic pipeline inputs at a configurable scale.')
+    parser.add_argument('--out-dir', default='data/synthetic')
+    parser.add_argument('--goods', type=int, default=10_000)
+    parser.add_argument('--events', type=int, default=200_000, help='rows per CDC table')
+    parser.add_argument('--logs', type=int, default=100_000, help='vendor log rows')
+    parser.add_argument('--log-files', type=int, default=4)
+    parser.add_argument('--items', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    SyntheticDataGenerator(goods_count=args.goods, seed=args.seed).generate(
+        out_dir=args.out_dir,
+        events=args.events,
+        logs=args.logs,
+        items=args.items,
+        log_files=args.log_files,
+    )
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# the pipeline modules are flat files at the repository root
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def synthetic_dir(tmp_path_factory) -> str:
+    '''
+    A small data/ layout written by SyntheticDataGenerator, the adj memos contain quoted newlines.
+    '''
+    out_dir: str = str(tmp_path_factory.mktemp('synthetic'))
+    SyntheticDataGenerator(goods_count=40, seed=7).generate(
+        out_dir=out_dir, events=600, logs=200, items=200, log_files=2,
+    )
+    return out_dir
@@ -0,0 +1,95 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+from adj_serializer import AdjSerializer
+from deal_serializer import DealSerializer
+from option_serializer import OptionSerializer
+from platform_consumer_serializer import PlatformConsumerSerializer
+from src.model.prepared_data import PreparedData
+from src.model.raw_csv import RawCsvDeal, RawCsvGoodsOption, RawCsvPlatformConsumer, RawCsvAdj
+
+# mostly updates, a few deletes and an operation type the replayer ignores
+OPERATION_TYPES: list[str] = ['c', 'u', 'u', 'u', 'u', 'u', 'u', 'd', 'x']
+BEGIN: datetime = datetime(2025, 1, 7)
+
+
+def random_time(rnd: random.Random) -> datetime:
+    # whole minutes over two days, so equal transaction_times happen
+    return BEGIN + timedelta(minutes=rnd.randrange(2 * 24 * 60))
+
+
+def random_prepared_data(seed: int, goods_count: int = 30, rows_per_goods: int = 12) -> PreparedData:
+    '''
+    Random CDC timelines of plain dicts. Prices come from a few values, so runs of repeated states and
+    deals matching their correct price both happen.
+    '''
+    rnd: random.Random = random.Random(seed)
+    prices: list[int] = [1000, 1200, 1500, 2000]
+
+    def dt(at: datetime) -> str:
+        return at.strftime('%Y-%m-%d')
+
+    def option(goods_sno: int, i: int) -> RawCsvGoodsOption:
+        at: datetime = random_time(rnd=rnd)
+        return RawCsvGoodsOption(
+            market_sno=1, goods_sno=goods_sno, option_sno=i, consumer_origin=rnd.choice(prices),
+            price_origin=rnd.choice(prices), total_additional_price=rnd.choice([0, 100]), link=0, is_display=1,
+            operation_type=rnd.choice(OPERATION_TYPES), transaction_time=at, dt=dt(at=at),
+        )
+
+    def platform_consumer(goods_sno: int, i: int) -> RawCsvPlatformConsumer:
+        at: datetime = random_time(rnd=rnd)
+        return RawCsvPlatformConsumer(
+            sno=i, goods_sno=goods_sno, consumer_origin=rnd.choice(prices), total_additional_price=0, app_type=1,
+            operation_type=rnd.choice(OPERATION_TYPES), transaction_time=at, dt=dt(at=at),
+        )
+
+    def adj(goods_sno: int, i: int) -> RawCsvAdj:
+        at: datetime = random_time(rnd=rnd)
+        started_at: datetime = BEGIN + timedelta(days=rnd.choice([0, 1]))
+        return RawCsvAdj(
+            market_sno=1, goods_sno=goods_sno, discount_type=rnd.choice([1, 2]), discount_price=rnd.choice([0, 200]),
+            started_at=started_at, ended_at=started_at + timedelta(days=1), operation_type=rnd.choice(OPERATION_TYPES),
+            transaction_time=at, dt=dt(at=at),
+        )
+
+    def deal(goods_sno: int, i: int) -> RawCsvDeal:
+        at: datetime = random_time(rnd=rnd)
+        return RawCsvDeal(
+            sno=i, goods_sno=goods_sno, goods_discount_policy_sno=0,
+            thumbnail_price=rnd.choice([800, 1000, 1300, 1500, 1800, 2000]), is_enabled=rnd.random() < 0.95,
+            operation_type=rnd.choice(['c', 'u', 'u', 'u', 'd']), transaction_time=at, dt=dt(at=at),
+        )
+
+    def raw_map(make_row, share: float) -> dict[int, list]:
+        # not every goods has rows of every source
+        return {
+            goods_sno: [make_row(goods_sno, i) for i in range(rnd.randrange(1, rows_per_goods + 1))]
+            for goods_sno in range(1, goods_count + 1)
+            if rnd.random() < share
+        }
+
+    return PreparedData(
+        deal_map=raw_map(make_row=deal, share=0.9),
+        option_map=raw_map(make_row=option, share=0.9),
+        platform_consumer_map=raw_map(make_row=platform_consumer, share=0.8),
+        adj_map=raw_map(make_row=adj, share=0.7),
+    )
+
+
+def write_processed(data: PreparedData, out_dir: str) -> dict[str, str]:
+    '''
+    Saves the maps like the process_* stages do, returns the filepath arguments of PrepareRevisionService.prepare.
+    '''
+    filepaths: dict[str, str] = {}
+    for name, raw_map, serializer in (
+            ('deal_filepath', data.deal_map, DealSerializer),
+            ('option_filepath', data.option_map, OptionSerializer),
+            ('consumer_filepath', data.platform_consumer_map, PlatformConsumerSerializer),
+            ('adj_filepath', data.adj_map, AdjSerializer),
+    ):
+        filepaths[name] = os.path.join(out_dir, f'{name}.msgpack')
+        with open(filepaths[name], 'wb') as f:
+            f.write(serializer.serialize(raw_map=raw_map))
+    return filepaths
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import msgpack
+import pytest
+
+from checkpoint_serializer import CheckpointSerializer
+from create_revision import CreateRevisionService
+from fixtures import BEGIN, random_prepared_data
+from file_save_helper import FileSaveHelper
+from src.model.edit_revision import EditRevision
+from src.model.prepared_data import PreparedData
+
+
+def rows_before(data: PreparedData, at: datetime) -> PreparedData:
+    '''
+    What an export cut at `at` contains, the dt partition of `at` is cut in the middle.
+    '''
+    def select(raw_map: dict[int, list]) -> dict[int, list]:
+        selected: dict[int, list] = {
+            goods_sno: [row for row in rows if row.transaction_time < at] for goods_sno, rows in raw_map.items()
+        }
+        return {goods_sno: rows for goods_sno, rows in selected.items() if rows}
+
+    return PreparedData(**{name: select(getattr(data, name)) for name in CreateRevisionService.CHECKPOINT_SOURCES})
+
+
+def ordered(revisions: list[EditRevision]) -> list[EditRevision]:
+    return sorted(revisions, key=lambda x: (x.goods_sno, x.transaction_time, x.deal.sno))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_runs_equal_the_full_run(tmp_path, seed):
+    data: PreparedData = random_prepared_data(seed=seed)
+    checkpoint_filepath: str = str(tmp_path / 'revision_checkpoint.msgpack')
+    # the first run sees the morning of the second day, the second one the rows appended to that day since
+    cut_at: datetime = BEGIN + timedelta(days=1, hours=9)
+
+    first: list[EditRevision] = CreateRevisionService.create_revision2_incremental(
+        data=rows_before(data=data, at=cut_at),
+        checkpoint_filepath=checkpoint_filepath,
+    )
+    second: list[EditRevision] = CreateRevisionService.create_revision2_incremental(
+        data=data,
+        checkpoint_filepath=checkpoint_filepath,
+    )
+    assert second
+    assert all(revision.transaction_time >= cut_at for revision in second)
+    assert ordered(first + second) == ordered(CreateRevisionService.create_revision2(data=data))
+
+    # nothing is new anymore
+    assert CreateRevisionService.create_revision2_incremental(data=data, checkpoint_filepath=checkpoint_filepath) == []
+
+
+def test_unversioned_checkpoints_are_rejected(tmp_path):
+    checkpoint_filepath: str = str(tmp_path / 'revision_checkpoint.msgpack')
+    FileSaveHelper.save(data=msgpack.packb({'partitions': [], 'contexts': {}}), filepath=checkpoint_filepath)
+
+    with pytest.raises(ValueError):
+        CheckpointSerializer.deserialize(data=FileSaveHelper.read(filepath=checkpoint_filepath))
@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from create_revision import CreateRevisionService
+from fixtures import random_prepared_data, write_processed
+from prepare_revision import PrepareRevisionService
+from revision_serializer import RevisionSerializer
+from src.model.prepared_data import PreparedData
+
+
+@pytest.mark.parametrize('seed', range(2))
+def test_parallel_revisions_are_the_serial_bytes(tmp_path, seed):
+    data: PreparedData = random_prepared_data(seed=seed, goods_count=60)
+    filepaths: dict[str, str] = write_processed(data=data, out_dir=str(tmp_path))
+    goods_sno_list: list[int] = list(data.deal_map.keys()) + [10 ** 9]
+    random.Random(seed).shuffle(goods_sno_list)
+
+    serial: bytes = RevisionSerializer.serialize(
+        revisions=CreateRevisionService.create_revision2(
+            data=PrepareRevisionService.prepare(goods_sno_list=sorted(goods_sno_list), columnar=True, **filepaths),
+        ),
+    )
+    assert serial == RevisionSerializer.serialize(revisions=CreateRevisionService.create_revision2(data=data))
+
+    # unordered, duplicated and empty (every goods of the deal file) goods lists
+    for workers, goods in ((1, goods_sno_list), (3, goods_sno_list), (3, goods_sno_list * 2), (2, [])):
+        parallel: bytes = RevisionSerializer.serialize(
+            revisions=CreateRevisionService.create_revision2_parallel(
+                goods_sno_list=goods,
+                workers=workers,
+                **filepaths,
+            ),
+        )
+        assert parallel == serial
@@ -0,0 +1,64 @@
+import json
+import random
+
+import pytest
+
+from main2 import GrafanaLogReader, LogReader
+
+
+def entry(timestamp: str, line: str) -> str:
+    # the jsonl entry layout of logcli
+    return json.dumps({'labels': {'service': 'seller-api'}, 'line': line, 'timestamp': timestamp})
+
+
+def write_part(filepath: str, entries: list[str]) -> None:
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(entries) + '\n')
+
+
+@pytest.fixture
+def part_path_prefix(tmp_path) -> str:
+    '''
+    Two 30 minute parts whose entries are shuffled, fractions of RFC3339Nano drop their trailing zeros.
+    '''
+    prefix: str = str(tmp_path / 'logcli')
+    first: list[str] = [
+        entry('2025-01-13T00:00:01Z', 'a'),
+        entry('2025-01-13T00:00:01.05Z', 'b'),
+        entry('2025-01-13T00:00:01.123456789Z', 'c'),
+        entry('2025-01-13T00:00:01.5Z', 'd'),
+        entry('2025-01-13T00:29:59.999Z', 'e'),
+    ]
+    second: list[str] = [
+        entry('2025-01-13T00:30:00Z', 'f'),
+        entry('2025-01-13T00:30:00.000000001Z', 'g'),
+        entry('2025-01-13T00:45:10.2Z', 'h, with "quotes"'),
+    ]
+    random.Random(5).shuffle(first)
+    random.Random(5).shuffle(second)
+    # the later part is written first
+    write_part(filepath=f'{prefix}_20250113T003000_20250113T010000.part', entries=second)
+    write_part(filepath=f'{prefix}_20250113T000000_20250113T003000.part', entries=first)
+    return prefix
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parts_are_streamed_in_timestamp_order(part_path_prefix, workers):
+    lines: list[str] = list(GrafanaLogReader.stream_parts(part_path_prefix=part_path_prefix, workers=workers))
+
+    assert lines == ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h, with "quotes"']
+    assert list(GrafanaLogReader.stream_parts(part_path_prefix=part_path_prefix, workers=workers, limit=6)) == lines[:6]
+
+
+def test_part_lines_parse_as_vendor_logs(tmp_path):
+    prefix: str = str(tmp_path / 'logcli')
+    line: str = (
+        '33878,33056035,69000,62500,6500,,0,"2025-01-13T00:00:00Z","2999-12-31T23:59:59Z",'
+        '"2025-01-13 22:47:10,781",vendor_seller_update_goods'
+    )
+    write_part(filepath=f'{prefix}_20250113T000000_20250113T003000.part', entries=[
+        entry('2025-01-13T13:47:10.781Z', line),
+    ])
+
+    logs = LogReader.parse(lines=GrafanaLogReader.stream_parts(part_path_prefix=prefix, workers=1))
+    assert [(log.goods_sno, log.consumer_origin, log.discount_price) for log in logs] == [(33056035, 69000, 6500)]
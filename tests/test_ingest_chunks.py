@@ -0,0 +1,70 @@
+import csv
+import os
+
+import pytest
+
+import csv_reader
+from csv_reader import CsvReader
+from ingest import IngestService
+from src.model.event_table import EventTable
+
+SOURCE_FILES: dict[str, str] = {
+    'option': 'options_250107_250113.csv',
+    'policy': 'policies_250107_250113.csv',
+    'deal': 'deals.csv',
+    'adj': 'adj_250107_250113.csv',
+    'platform_consumer': 'consumer_250107_250113.csv',
+}
+
+
+def write_quoted_csv(filepath: str) -> None:
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'memo', 'value'])
+        for i in range(200):
+            memo: str = 'line one\nline "two"\n\nline three' if i % 3 == 0 else f'memo {i}'
+            writer.writerow([i, memo, '"quoted, with comma"' if i % 5 == 0 else i * 10])
+
+
+def chunked_lines(filepath: str, chunk_bytes: int) -> list[str]:
+    return [
+        line
+        for begin, end in CsvReader.chunk_ranges(filepath=filepath, chunk_bytes=chunk_bytes)
+        for line in CsvReader.stream_range(filepath=filepath, begin=begin, end=end)
+    ]
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 7, 64, 1000, 1 << 20])
+@pytest.mark.parametrize('block_size', [3, 1 << 20])
+def test_chunks_cover_the_file_and_start_at_record_boundaries(tmp_path, monkeypatch, chunk_bytes, block_size):
+    filepath: str = str(tmp_path / 'quoted.csv')
+    write_quoted_csv(filepath=filepath)
+    # a tiny block makes the quote parity scan cross block ends
+    monkeypatch.setattr(csv_reader, 'BLOCK_SIZE', block_size)
+
+    ranges: list[tuple[int, int]] = CsvReader.chunk_ranges(filepath=filepath, chunk_bytes=chunk_bytes)
+    assert ranges[-1][1] == os.path.getsize(filepath)
+    assert all(end == next_begin for (_, end), (next_begin, _) in zip(ranges, ranges[1:]))
+
+    lines: list[str] = chunked_lines(filepath=filepath, chunk_bytes=chunk_bytes)
+    assert lines == list(CsvReader.stream(filepath=filepath, limit=None))
+    for begin, end in ranges:
+        records: list[list[str]] = list(csv.reader(CsvReader.stream_range(filepath=filepath, begin=begin, end=end)))
+        assert all(len(record) == 3 for record in records)
+
+
+@pytest.mark.parametrize('source_name', list(SOURCE_FILES))
+def test_parsed_chunks_equal_the_whole_file(synthetic_dir, source_name):
+    filepath: str = os.path.join(synthetic_dir, SOURCE_FILES[source_name])
+    table_type: type[EventTable] = IngestService.TABLES[source_name]
+    whole: EventTable = table_type.from_rows(
+        rows=IngestService.PARSERS[source_name](CsvReader.stream(filepath=filepath, limit=None)),
+    )
+    chunked: EventTable = table_type.concat(tables=[
+        IngestService._parse_chunk(source_name, filepath, begin, end, None, None)
+        for begin, end in CsvReader.chunk_ranges(filepath=filepath, chunk_bytes=2048)
+    ])
+
+    assert len(CsvReader.chunk_ranges(filepath=filepath, chunk_bytes=2048)) > 1
+    assert chunked.row_count == whole.row_count
+    assert dict(chunked.items()) == dict(whole.items())
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from main2 import DatadogLog, LogCacheSerializer, LogReader
+
+LINES: list[str] = [
+    'ably_market_sno,ably_sno,consumer_origin,price_origin,discount_price,discount_rate,discount_type,'
+    'started_at,ended_at,asctime,message',
+    '33878,33056035,69000,62500,6500,,0,"2025-01-13T00:00:00Z","2999-12-31T23:59:59Z",'
+    '"2025-01-13 22:47:10,781",vendor_seller_update_goods',
+    '33878,33056036,39000,39000,,,,"","","2025-01-13 21:00:00,000",vendor_seller_update_goods',
+    '33878,33056037,10000,9000,0,,0,"","","2025-01-13 23:00:00,000",other_message',
+]
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:len(data) // 2],
+    lambda data: b'\xc1' + data,
+    lambda data: b'',
+    lambda data: b'\x93\x01\x02\x03',
+])
+def test_damaged_cache_files_are_parsed_again(tmp_path, monkeypatch, damage):
+    # read_cached resolves the log directory against the working directory
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('logs')
+    with open('logs/vendor.csv', 'w') as f:
+        f.write('\n'.join(LINES) + '\n')
+    cache_filepath: str = 'cache/vendor.csv.msgpack'
+
+    expected: list[DatadogLog] = list(LogReader.read_cached(file_dir_path='logs/', cache_dir_path='cache/', workers=1))
+    assert [log.goods_sno for log in expected] == [33056036, 33056035]
+
+    with open(cache_filepath, 'rb') as f:
+        data: bytes = f.read()
+    with open(cache_filepath, 'wb') as f:
+        f.write(damage(data))
+    assert LogCacheSerializer.load(filepath=cache_filepath, source_filepath='logs/vendor.csv') is None
+
+    assert list(LogReader.read_cached(file_dir_path='logs/', cache_dir_path='cache/', workers=1)) == expected
+    # the cache entry was written again
+    assert LogCacheSerializer.load(filepath=cache_filepath, source_filepath='logs/vendor.csv') == expected
@@ -0,0 +1,23 @@
+import main
+from pipeline_runner import PipelineRunner
+
+
+def test_stage_code_follows_what_the_stage_function_uses():
+    revision_code: list[str] = PipelineRunner.code_of(main.create_revisions)
+    for filepath in (
+            'main.py',
+            'create_revision.py',
+            'revision_replay.py',
+            'price_kernel.py',
+            'timestamp_parser.py',
+            'checkpoint_serializer.py',
+            'src/model/option_context.py',
+    ):
+        assert filepath in revision_code
+
+    option_code: list[str] = PipelineRunner.code_of(main.process_options)
+    for filepath in ('main.py', 'csv_parser.py', 'csv_reader.py', 'timeline_compactor.py', 'option_serializer.py'):
+        assert filepath in option_code
+    # editing only the revision logic keeps the ingestion up to date
+    for filepath in ('create_revision.py', 'revision_replay.py', 'price_kernel.py', 'deal_serializer.py'):
+        assert filepath not in option_code
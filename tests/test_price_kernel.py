@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from main2 import DatadogLog, ItemAnalyzer
+from price_kernel import PriceKernel
+from src.util import discard_ones_digit
+from timestamp_parser import TimestampParser
+
+BEGIN: datetime = datetime(2025, 1, 7)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_revision_check_equals_the_scalar_check(seed):
+    rng: np.random.Generator = np.random.default_rng(seed)
+    size: int = 2000
+
+    def prices() -> np.ndarray:
+        # -1 is the value of a source that was never applied
+        return rng.choice(np.array([-1, 0, 995, 1000, 1200, 1500, 2000], dtype=np.int64), size=size)
+
+    thumbnail_price, consumer_origin, price_origin, platform_consumer = prices(), prices(), prices(), prices()
+    discount_price: np.ndarray = rng.choice(np.array([-1, 0, 5, 200, 500], dtype=np.int64), size=size)
+
+    correct_price1, correct_price2, mispriced = PriceKernel.revision_check(
+        thumbnail_price=thumbnail_price,
+        consumer_origin=consumer_origin,
+        price_origin=price_origin,
+        platform_consumer=platform_consumer,
+        discount_price=discount_price,
+    )
+    for i in range(size):
+        expected1: int = discard_ones_digit(int(platform_consumer[i]) - int(discount_price[i]))
+        expected2: int = discard_ones_digit(
+            max(int(consumer_origin[i]), int(price_origin[i])) - abs(int(consumer_origin[i]) - int(price_origin[i]))
+        )
+        assert (int(correct_price1[i]), int(correct_price2[i])) == (expected1, expected2)
+        assert bool(mispriced[i]) == (int(thumbnail_price[i]) not in (expected1, expected2))
+    assert mispriced.any() and not mispriced.all()
+
+
+def random_logs(seed: int, count: int) -> list[tuple[DatadogLog, datetime]]:
+    '''
+    Logs with checked_at drawn around their discount window, its both ends included.
+    '''
+    rnd: random.Random = random.Random(seed)
+    res: list[tuple[DatadogLog, datetime]] = []
+    for _ in range(count):
+        started_at: datetime = BEGIN + timedelta(hours=rnd.randrange(48))
+        ended_at: datetime = started_at + timedelta(hours=rnd.randrange(48))
+        checked_at: datetime = rnd.choice([
+            started_at,
+            ended_at,
+            started_at - timedelta(microseconds=1),
+            ended_at + timedelta(microseconds=1),
+            started_at + (ended_at - started_at) / 2,
+            BEGIN + timedelta(hours=rnd.randrange(96)),
+        ])
+        log: DatadogLog = DatadogLog(
+            market_sno=1,
+            goods_sno=rnd.randrange(100),
+            consumer_origin=rnd.choice([0, 1000, 1200, 1505]),
+            price_origin=rnd.choice([0, 1000, 1300, 1995]),
+            discount_type=rnd.choice([0, 1, 2]),
+            discount_rate=rnd.choice([-1, 0, 1, 2]),
+            discount_price=rnd.choice([-100, 0, 5, 150, 305]),
+            discount_started_at=started_at,
+            discount_ended_at=ended_at,
+            request_time=checked_at - timedelta(minutes=rnd.randrange(60)),
+        )
+        res.append((log, checked_at))
+    return res
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_correct_prices_equals_calc_correct_price(seed):
+    pairs: list[tuple[DatadogLog, datetime]] = random_logs(seed=seed, count=2000)
+    logs: list[DatadogLog] = [log for log, _ in pairs]
+    checked_at: list[datetime] = [at for _, at in pairs]
+
+    expected: list[int] = [ItemAnalyzer.calc_correct_price(log=log, checked_at=at) for log, at in pairs]
+    assert ItemAnalyzer.correct_prices(logs=logs, checked_at=checked_at) == expected
+
+    def column(values) -> np.ndarray:
+        return np.fromiter(values, dtype=np.int64, count=len(logs))
+
+    # by default the window is checked at the request_time of the log
+    at_request_time: np.ndarray = PriceKernel.correct_prices(
+        consumer_origin=column(log.consumer_origin for log in logs),
+        price_origin=column(log.price_origin for log in logs),
+        discount_price=column(log.discount_price for log in logs),
+        discount_type=column(log.discount_type for log in logs),
+        discount_rate=column(log.discount_rate for log in logs),
+        started_at=column(TimestampParser.to_epoch(log.discount_started_at) for log in logs),
+        ended_at=column(TimestampParser.to_epoch(log.discount_ended_at) for log in logs),
+        checked_at=column(TimestampParser.to_epoch(log.request_time) for log in logs),
+    )
+    assert at_request_time.tolist() == [ItemAnalyzer.calc_correct_price(log=log) for log in logs]
@@ -0,0 +1,119 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from create_revision import CreateRevisionService
+from fixtures import random_prepared_data
+from price_state_index import PriceStateIndex
+from price_state_serializer import PriceStateSerializer
+from src.model.option_context import GoodsSnapshot
+from src.model.prepared_data import PreparedData
+
+ONE_MICROSECOND: timedelta = timedelta(microseconds=1)
+
+
+def replayed_steps(data: PreparedData) -> dict[int, list[tuple[datetime, GoodsSnapshot]]]:
+    goods_sno_list: set[int] = {
+        *data.deal_map.keys(), *data.option_map.keys(), *data.platform_consumer_map.keys(), *data.adj_map.keys(),
+    }
+    return {
+        goods_sno: list(CreateRevisionService.replay_states(goods_sno=goods_sno, data=data))
+        for goods_sno in sorted(goods_sno_list)
+    }
+
+
+def replayed_state(steps: list[tuple[datetime, GoodsSnapshot]], at: datetime) -> GoodsSnapshot | None:
+    '''
+    The snapshot after the last replay step at or before `at`, searched from the start.
+    '''
+    res: GoodsSnapshot | None = None
+    for changed_at, snapshot in steps:
+        if changed_at > at:
+            break
+        res = snapshot
+    return res
+
+
+def query_times(steps: list[tuple[datetime, GoodsSnapshot]]) -> list[datetime]:
+    '''
+    Every change point, the microsecond before it, the middle between it and the next one and a time after all.
+    '''
+    times: list[datetime] = sorted({changed_at for changed_at, _ in steps})
+    res: list[datetime] = []
+    for i, changed_at in enumerate(times):
+        res.extend([changed_at - ONE_MICROSECOND, changed_at])
+        if i + 1 < len(times):
+            res.append(changed_at + (times[i + 1] - changed_at) / 2)
+    res.append(times[-1] + timedelta(days=1))
+    return res
+
+
+@pytest.fixture(scope='module')
+def data() -> PreparedData:
+    return random_prepared_data(seed=3)
+
+
+@pytest.fixture(scope='module')
+def index(data) -> PriceStateIndex:
+    return PriceStateIndex.build(data=data)
+
+
+def test_states_equal_the_replay_at_and_between_change_points(data, index):
+    queries: list[tuple[int, datetime]] = []
+    expected: list[GoodsSnapshot | None] = []
+    for goods_sno, steps in replayed_steps(data=data).items():
+        for at in query_times(steps=steps):
+            state: GoodsSnapshot | None = replayed_state(steps=steps, at=at)
+            assert index.state_at(goods_sno=goods_sno, at=at) == state
+            queries.append((goods_sno, at))
+            expected.append(state)
+    queries.append((10 ** 9, datetime(2025, 1, 8)))
+    expected.append(None)
+
+    assert any(state is None for state in expected[:-1])
+    assert any(state is not None and state.goods_sno == -1 for state in expected)
+
+    # batch queries, in a shuffled order, equal the single ones
+    order: list[int] = list(range(len(queries)))
+    random.Random(0).shuffle(order)
+    assert index.states_at(queries=[queries[q] for q in order]) == [expected[q] for q in order]
+
+
+def test_states_between_are_the_changes_of_the_range(data, index):
+    for goods_sno, steps in replayed_steps(data=data).items():
+        times: list[datetime] = query_times(steps=steps)
+        begin_at, end_at = times[len(times) // 3], times[2 * len(times) // 3]
+        states: list[tuple[datetime, GoodsSnapshot]] = index.states_between(
+            goods_sno=goods_sno, begin_at=begin_at, end_at=end_at,
+        )
+        assert states == sorted(states, key=lambda x: x[0])
+        assert [state for _, state in states][:1] == [
+            replayed_state(steps=steps, at=max(begin_at, steps[0][0]))
+        ]
+        for since, state in states:
+            assert since <= end_at
+            assert state == replayed_state(steps=steps, at=since)
+
+
+def test_serializer_round_trips(index):
+    restored: PriceStateIndex = PriceStateSerializer.deserialize(data=PriceStateSerializer.serialize(index=index))
+
+    assert restored.goods.tolist() == index.goods.tolist()
+    assert restored.offsets.tolist() == index.offsets.tolist()
+    assert restored.times.tolist() == index.times.tolist()
+    assert restored.columns.keys() == index.columns.keys()
+    for name, values in index.columns.items():
+        assert restored.columns[name].tolist() == values.tolist()
+    goods_sno: int = int(index.goods[0])
+    assert restored.state_at(goods_sno=goods_sno, at=datetime(2025, 1, 8)) == index.state_at(
+        goods_sno=goods_sno, at=datetime(2025, 1, 8),
+    )
+
+
+def test_aware_query_times_are_seoul_wall_clock_times(data, index):
+    for goods_sno, steps in replayed_steps(data=data).items():
+        for at in query_times(steps=steps):
+            utc: datetime = (at - timedelta(hours=9)).replace(tzinfo=timezone.utc)
+            assert index.state_at(goods_sno=goods_sno, at=utc) == index.state_at(goods_sno=goods_sno, at=at)
+            assert index.states_at(queries=[(goods_sno, utc)]) == [index.state_at(goods_sno=goods_sno, at=at)]
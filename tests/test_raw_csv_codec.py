@@ -0,0 +1,117 @@
+import dataclasses
+from datetime import datetime
+
+import msgpack
+import pytest
+
+from adj_serializer import AdjSerializer
+from deal_serializer import DealSerializer
+from fixtures import random_prepared_data
+from option_serializer import OptionSerializer
+from platform_consumer_serializer import PlatformConsumerSerializer
+from raw_csv_codec import RawCsvCodec
+from src.model.event_table import EventTable, DealTable, OptionTable, PlatformConsumerTable, AdjTable
+from src.model.prepared_data import PreparedData
+from src.model.raw_csv import RawCsvDeal, RawCsvGoodsOption, RawCsvPlatformConsumer, RawCsvAdj
+
+SOURCES: dict[str, tuple[type, type]] = {
+    'deal_map': (DealSerializer, RawCsvDeal),
+    'option_map': (OptionSerializer, RawCsvGoodsOption),
+    'platform_consumer_map': (PlatformConsumerSerializer, RawCsvPlatformConsumer),
+    'adj_map': (AdjSerializer, RawCsvAdj),
+}
+TABLES: dict[str, type[EventTable]] = {
+    'deal_map': DealTable,
+    'option_map': OptionTable,
+    'platform_consumer_map': PlatformConsumerTable,
+    'adj_map': AdjTable,
+}
+
+
+def legacy_encode(raw_map: dict[int, list]) -> bytes:
+    '''
+    The unversioned format of the baseline serializers: {goods_sno: [asdict(row)]} with ISO datetimes.
+    '''
+    return msgpack.packb({
+        goods_sno: [
+            {
+                name: value.isoformat() if isinstance(value, datetime) else value
+                for name, value in dataclasses.asdict(row).items()
+            }
+            for row in rows
+        ]
+        for goods_sno, rows in raw_map.items()
+    })
+
+
+@pytest.fixture(scope='module')
+def data() -> PreparedData:
+    return random_prepared_data(seed=3)
+
+
+@pytest.mark.parametrize('source', list(SOURCES))
+def test_store_round_trips(data, source):
+    serializer, row_type = SOURCES[source]
+    raw_map: dict[int, list] = getattr(data, source)
+    encoded: bytes = serializer.serialize(raw_map=raw_map)
+
+    assert RawCsvCodec.is_store(encoded)
+    assert serializer.deserialize(data=encoded) == raw_map
+    assert RawCsvCodec.decode_store(data=encoded, row_type=row_type) == raw_map
+
+
+@pytest.mark.parametrize('source', list(SOURCES))
+def test_mmap_load_reads_only_the_requested_goods(tmp_path, data, source):
+    serializer, row_type = SOURCES[source]
+    raw_map: dict[int, list] = getattr(data, source)
+    filepath: str = str(tmp_path / f'{source}.msgpack')
+    with open(filepath, 'wb') as f:
+        f.write(serializer.serialize(raw_map=raw_map))
+
+    present: list[int] = sorted(raw_map.keys())
+    requested: list[int] = [present[-1], present[0], present[len(present) // 2], -5, 10 ** 9]
+    expected: dict[int, list] = {goods_sno: raw_map[goods_sno] for goods_sno in requested if goods_sno in raw_map}
+    assert RawCsvCodec.load(filepath=filepath, row_type=row_type, goods_sno_list=requested) == expected
+    assert serializer.load(filepath=filepath, goods_sno_list=requested) == expected
+    assert serializer.load(filepath=filepath) == raw_map
+    assert serializer.load(filepath=filepath, goods_sno_list=[]) == {}
+
+    assert RawCsvCodec.read_goods(filepath=filepath) == present
+    assert RawCsvCodec.read_goods_set(filepath=filepath).values.tolist() == present
+
+
+@pytest.mark.parametrize('source', list(SOURCES))
+def test_tables_decode_straight_from_the_store(tmp_path, data, source):
+    serializer, _ = SOURCES[source]
+    table_type: type[EventTable] = TABLES[source]
+    raw_map: dict[int, list] = getattr(data, source)
+    filepath: str = str(tmp_path / f'{source}.msgpack')
+    with open(filepath, 'wb') as f:
+        f.write(serializer.serialize(raw_map=raw_map))
+
+    present: list[int] = sorted(raw_map.keys())
+    requested: list[int] = [present[-1], present[0], present[0], -5]
+    table: EventTable = RawCsvCodec.load_table(filepath=filepath, table_type=table_type, goods_sno_list=requested)
+    assert list(table.keys()) == [present[0], present[-1]]
+    assert dict(table.items()) == {goods_sno: raw_map[goods_sno] for goods_sno in (present[0], present[-1])}
+
+    whole: EventTable = RawCsvCodec.load_table(filepath=filepath, table_type=table_type)
+    assert list(whole.keys()) == present
+    assert dict(whole.items()) == raw_map
+    assert whole.row_count == table_type.from_map(raw_map=raw_map).row_count
+
+
+@pytest.mark.parametrize('source', list(SOURCES))
+def test_unversioned_files_are_read_whole(tmp_path, data, source):
+    serializer, row_type = SOURCES[source]
+    raw_map: dict[int, list] = getattr(data, source)
+    encoded: bytes = legacy_encode(raw_map=raw_map)
+    filepath: str = str(tmp_path / f'{source}.msgpack')
+    with open(filepath, 'wb') as f:
+        f.write(encoded)
+
+    assert serializer.deserialize(data=encoded) == raw_map
+    assert RawCsvCodec.load(filepath=filepath, row_type=row_type, goods_sno_list=[1]) is None
+    assert RawCsvCodec.read_goods(filepath=filepath) is None
+    assert RawCsvCodec.load_table(filepath=filepath, table_type=TABLES[source]) is None
+    assert serializer.load(filepath=filepath, goods_sno_list=[1]) == raw_map
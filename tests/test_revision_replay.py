@@ -0,0 +1,96 @@
+import dataclasses
+from datetime import datetime
+
+import pytest
+
+from create_revision import CreateRevisionService
+from fixtures import random_prepared_data
+from src.model.option_context import GoodsContext
+from src.model.prepared_data import PreparedData
+from src.model.raw_csv import RawCsvDeal
+from src.util import discard_ones_digit
+
+
+def baseline_apply(context: GoodsContext, data: PreparedData, deal: RawCsvDeal, changed_at: datetime) -> None:
+    '''
+    The baseline _apply_revision2: every source is sorted again and applied from its start at every deal.
+    '''
+    if deal.is_enabled and (deal.operation_type == 'c' or deal.operation_type == 'u'):
+        context.thumbnail_price = deal.thumbnail_price
+    else:
+        context.goods_sno = -1
+
+    if context.goods_sno in data.option_map:
+        options = sorted(data.option_map[context.goods_sno], key=lambda x: x.transaction_time)
+        while options and options[0].transaction_time <= changed_at:
+            opt = options.pop(0)
+            if opt.operation_type == 'c' or opt.operation_type == 'u':
+                context.price_origin = opt.price_origin
+                context.consumer_origin = opt.consumer_origin
+                context.total_additional_price = opt.total_additional_price
+            elif opt.operation_type == 'd':
+                context.goods_sno = -1
+
+    if context.goods_sno in data.platform_consumer_map:
+        platform_consumers = sorted(data.platform_consumer_map[context.goods_sno], key=lambda x: x.transaction_time)
+        while platform_consumers and platform_consumers[0].transaction_time <= changed_at:
+            pc = platform_consumers.pop(0)
+            if pc.operation_type == 'c' or pc.operation_type == 'u':
+                context.platform_consumer = pc.consumer_origin
+                context.platform_total_additional_price = pc.total_additional_price
+            elif pc.operation_type == 'd':
+                context.goods_sno = -1
+
+    if context.goods_sno in data.adj_map:
+        adjs = sorted(data.adj_map[context.goods_sno], key=lambda x: x.transaction_time)
+        while adjs and adjs[0].transaction_time <= changed_at:
+            adj = adjs.pop(0)
+            if adj.operation_type == 'c' or adj.operation_type == 'u':
+                context.discount_type = adj.discount_type
+                context.discount_price = adj.discount_price
+                context.discount_started_at = adj.started_at
+                context.discount_ended_at = adj.ended_at
+            elif adj.operation_type == 'd':
+                context.goods_sno = -1
+
+
+def baseline_revisions(data: PreparedData) -> list[tuple]:
+    '''
+    The baseline create_revision2, as (goods_sno, transaction_time, deal, context fields) tuples.
+    '''
+    res: list[tuple] = []
+    for goods_sno, deals in data.deal_map.items():
+        ctx: GoodsContext = GoodsContext(goods_sno=goods_sno)
+        for deal in sorted(deals, key=lambda x: x.transaction_time):
+            baseline_apply(context=ctx, data=data, deal=deal, changed_at=deal.transaction_time)
+            correct_price1: int = discard_ones_digit(ctx.platform_consumer - ctx.discount_price)
+            correct_price2: int = discard_ones_digit(
+                max(ctx.consumer_origin, ctx.price_origin) - abs(ctx.consumer_origin - ctx.price_origin)
+            )
+            if ctx.thumbnail_price == correct_price1 or ctx.thumbnail_price == correct_price2:
+                continue
+            res.append((goods_sno, deal.transaction_time, deal, dataclasses.astuple(ctx)))
+    return res
+
+
+def revision_tuples(data: PreparedData) -> list[tuple]:
+    return [
+        (revision.goods_sno, revision.transaction_time, revision.deal, dataclasses.astuple(revision.context))
+        for revision in CreateRevisionService.create_revision2(data=data)
+    ]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_cursor_replay_equals_the_baseline(seed):
+    data: PreparedData = random_prepared_data(seed=seed)
+    expected: list[tuple] = baseline_revisions(data=data)
+
+    assert expected
+    assert revision_tuples(data=data) == expected
+
+
+def test_small_price_check_batches_keep_the_order(monkeypatch):
+    data: PreparedData = random_prepared_data(seed=11)
+    monkeypatch.setattr(CreateRevisionService, 'PRICE_CHECK_BATCH_SIZE', 7)
+
+    assert revision_tuples(data=data) == baseline_revisions(data=data)
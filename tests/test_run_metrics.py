@@ -0,0 +1,55 @@
+from create_revision import CreateRevisionService
+from fixtures import random_prepared_data, write_processed
+from prepare_revision import PrepareRevisionService
+from run_metrics import RunMetrics
+from src.model.prepared_data import PreparedData
+from src.model.stage_metrics import StageMetrics
+
+
+def test_worker_counts_are_added_to_the_parent_stage(tmp_path):
+    data: PreparedData = random_prepared_data(seed=5, goods_count=60)
+    filepaths: dict[str, str] = write_processed(data=data, out_dir=str(tmp_path))
+    goods_sno_list: list[int] = sorted(data.deal_map.keys()) + [10 ** 9]
+
+    with RunMetrics(run_name='test') as run:
+        with RunMetrics.stage('serial'):
+            CreateRevisionService.create_revision2(
+                data=PrepareRevisionService.prepare(goods_sno_list=goods_sno_list, columnar=True, **filepaths),
+            )
+        with RunMetrics.stage('parallel'):
+            CreateRevisionService.create_revision2_parallel(goods_sno_list=goods_sno_list, workers=3, **filepaths)
+    stages: dict[str, StageMetrics] = {stage.name: stage for stage in run.stages}
+
+    serial: dict[str, int] = stages['serial'].counters
+    assert {'rows_in', 'rows_out', 'rows_loaded', 'skipped_goods.deal'} <= serial.keys()
+    parallel: dict[str, int] = dict(stages['parallel'].counters)
+    # every shard maps the files again
+    assert parallel.pop('bytes_mapped') > serial['bytes_mapped']
+    assert parallel == {name: value for name, value in serial.items() if name != 'bytes_mapped'}
+    # the stages of the workers are not stages of the run
+    assert list(stages) == ['serial', 'serial.prepare', 'parallel']
+
+
+def test_stages_record_their_own_rss():
+    with RunMetrics(run_name='test') as run:
+        with RunMetrics.stage('allocate'):
+            block: bytearray = bytearray(64 * 1024 * 1024)
+            block[::4096] = b'\x01' * len(block[::4096])
+            del block
+    stage: StageMetrics = run.stages[0]
+
+    assert stage.rss_begin_bytes > 0 and stage.rss_end_bytes > 0
+    assert stage.peak_rss_growth_bytes >= 32 * 1024 * 1024
+    assert stage.peak_rss_bytes >= stage.peak_rss_growth_bytes
+    assert 'pipeline_stage_peak_rss_growth_bytes{run="test",stage="allocate"}' in RunMetrics._to_prometheus(
+        report=run.report(),
+    )
+
+
+def test_counts_outside_a_run_are_dropped():
+    with RunMetrics.worker_counts() as counters:
+        RunMetrics.count('rows_in', 3)
+        with RunMetrics.stage('inner'):
+            RunMetrics.count('rows_in', 2)
+    assert counters == {'rows_in': 5}
+    assert RunMetrics._current is None
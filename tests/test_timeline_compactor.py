@@ -0,0 +1,77 @@
+import dataclasses
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from create_revision import CreateRevisionService
+from fixtures import random_prepared_data
+from revision_replay import RevisionReplayer
+from src.model.event_table import DealTable, OptionTable, PlatformConsumerTable, AdjTable
+from src.model.option_context import GoodsSnapshot
+from src.model.prepared_data import PreparedData
+from timeline_compactor import TimelineCompactor
+
+
+def with_repeats(raw_map: dict[int, list], rnd: random.Random) -> dict[int, list]:
+    '''
+    Follows rows with copies of their state, at the same transaction_time or later, as updates or as the
+    same operation again, so runs of repeated states and deletes after deletes happen.
+    '''
+    res: dict[int, list] = {}
+    for goods_sno, rows in raw_map.items():
+        repeated: list = []
+        for row in rows:
+            repeated.append(row)
+            for _ in range(rnd.choice([0, 0, 1, 3])):
+                repeated.append(dataclasses.replace(
+                    row,
+                    operation_type=rnd.choice(['u', row.operation_type]),
+                    transaction_time=row.transaction_time + timedelta(minutes=rnd.choice([0, 1, 30])),
+                ))
+        res[goods_sno] = repeated
+    return res
+
+
+def as_tables(seed: int) -> PreparedData:
+    rnd: random.Random = random.Random(seed)
+    data: PreparedData = random_prepared_data(seed=seed)
+    return PreparedData(
+        deal_map=DealTable.from_map(data.deal_map),
+        option_map=OptionTable.from_map(with_repeats(raw_map=data.option_map, rnd=rnd)),
+        platform_consumer_map=PlatformConsumerTable.from_map(with_repeats(raw_map=data.platform_consumer_map, rnd=rnd)),
+        adj_map=AdjTable.from_map(with_repeats(raw_map=data.adj_map, rnd=rnd)),
+    )
+
+
+def compacted(data: PreparedData) -> PreparedData:
+    return PreparedData(
+        deal_map=data.deal_map,
+        option_map=TimelineCompactor.compact(data.option_map),
+        platform_consumer_map=TimelineCompactor.compact(data.platform_consumer_map),
+        adj_map=TimelineCompactor.compact(data.adj_map),
+    )
+
+
+def final_states(data: PreparedData) -> dict[int, GoodsSnapshot]:
+    goods_sno_list: set[int] = {*data.option_map.keys(), *data.platform_consumer_map.keys(), *data.adj_map.keys()}
+    res: dict[int, GoodsSnapshot] = {}
+    for goods_sno in sorted(goods_sno_list):
+        replayer: RevisionReplayer = RevisionReplayer(goods_sno=goods_sno, data=data)
+        replayer.advance(changed_at=datetime.max)
+        res[goods_sno] = replayer.context.snapshot()
+    return res
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_compacted_timelines_give_the_same_revisions(seed):
+    data: PreparedData = as_tables(seed=seed)
+    compact: PreparedData = compacted(data=data)
+
+    for name in ('option_map', 'platform_consumer_map', 'adj_map'):
+        table, compact_table = getattr(data, name), getattr(compact, name)
+        assert list(compact_table.keys()) == list(table.keys())
+        assert compact_table.row_count < table.row_count
+
+    assert CreateRevisionService.create_revision2(data=compact) == CreateRevisionService.create_revision2(data=data)
+    assert final_states(data=compact) == final_states(data=data)
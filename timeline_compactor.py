@@ -0,0 +1,55 @@
+from array import array
+
+from src.model.event_table import EventTable, OptionTable, PlatformConsumerTable, AdjTable
+
+
+class TimelineCompactor:
+    '''
+    Drops the CDC events that cannot change what RevisionReplayer sees.
+
+    Per goods, in transaction_time order, a create/update whose STATE_COLUMNS equal the state left by the
+    previous kept event is dropped, so is a delete after a delete and any other operation type, which the
+    replayer ignores. The first event of every goods is always kept, so a run of identical states keeps
+    its first transaction_time and no goods disappears from a table.
+
+    Deals are not compacted: every deal is a point where the replayer checks the price.
+    '''
+    STATE_COLUMNS: dict[type[EventTable], tuple[str, ...]] = {
+        OptionTable: ('price_origin', 'consumer_origin', 'total_additional_price'),
+        PlatformConsumerTable: ('consumer_origin', 'total_additional_price'),
+        AdjTable: ('discount_type', 'discount_price', 'started_at', 'ended_at'),
+    }
+
+    @classmethod
+    def compact(cls, table: EventTable) -> EventTable:
+        '''
+        The rows of every goods come out sorted by transaction_time, ties keep their order.
+        '''
+        state_columns: list[array] = [table.columns[name] for name in cls.STATE_COLUMNS[type(table)]]
+        transaction_times: array = table.columns['transaction_time']
+        operation_types: array = table.columns['operation_type']
+        dictionary: list[str] = table.dictionaries['operation_type']
+        updates: set[int] = {code for code, value in enumerate(dictionary) if value in ('c', 'u')}
+        deletes: set[int] = {code for code, value in enumerate(dictionary) if value == 'd'}
+
+        offsets: array = array('q', [0])
+        positions: array = array('q')
+        for idx in range(len(table.goods)):
+            begin, end = table.offsets[idx], table.offsets[idx + 1]
+            state: tuple | None = None
+            for i in sorted(range(begin, end), key=transaction_times.__getitem__):
+                current: tuple | None = state
+                if operation_types[i] in updates:
+                    current = ('u', *[column[i] for column in state_columns])
+                elif operation_types[i] in deletes:
+                    current = ('d',)
+                if current == state and len(positions) > offsets[-1]:
+                    continue
+                positions.append(i)
+                state = current
+            offsets.append(len(positions))
+
+        columns: dict[str, array] = {
+            name: array(column.typecode, [column[i] for i in positions]) for name, column in table.columns.items()
+        }
+        return type(table)(goods=table.goods, offsets=offsets, columns=columns, dictionaries=table.dictionaries)
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import pytz
+
+EPOCH: datetime = datetime(1970, 1, 1)
+ONE_MICROSECOND: timedelta = timedelta(microseconds=1)
+CACHE_SIZE: int = 1 << 16
+
+
+class TimestampParser:
+    @classmethod
+    def parse_timestamp(cls, timestamp_str: str) -> datetime:
+        """
+        Parse a timestamp string in format '2025-01-07 00:00:01.000 Asia/Seoul' to a naive datetime
+        holding the wall-clock time of the given timezone.
+        """
+        if not timestamp_str:
+            return EPOCH
+        return _parse_timestamp(timestamp_str)
+
+    @classmethod
+    def parse_datetime_with_tz(cls, dt_string: str) -> datetime:
+        """
+        Parse a datetime string in the format '9999-12-31 23:59:59.000 Asia/Seoul', ignoring the timezone
+        """
+        if not dt_string:
+            return EPOCH
+        return _parse_datetime_with_tz(dt_string)
+
+    @classmethod
+    def parse_naive(cls, datetime_str: str, default_dt: datetime | None = None) -> datetime | None:
+        '''
+        Parses datetime strings in formats:
+        - "2025-01-13 04:48:59.005"     # With milliseconds, space separator
+        - "2025-01-13T04:48:59.005Z"    # With milliseconds, ISO format
+        - "2025-01-03T06:50:06Z"        # Without milliseconds, ISO format
+        Returns `default_dt` when the string matches none of them.
+        '''
+        if not datetime_str:
+            return default_dt
+        dt: datetime | None = _parse_naive(datetime_str)
+        return default_dt if dt is None else dt
+
+    @classmethod
+    def parse_local(cls, datetime_str: str, default_dt: datetime | None = None) -> datetime | None:
+        '''
+        Parses only "2025-01-13 04:48:59.005" (space separator, fraction required).
+        Returns `default_dt` for any other string.
+        '''
+        if not datetime_str:
+            return default_dt
+        dt: datetime | None = _parse_local(datetime_str)
+        return default_dt if dt is None else dt
+
+    @classmethod
+    def to_epoch(cls, dt: datetime) -> int:
+        '''
+        Naive datetime to integer microseconds since 1970-01-01.
+        '''
+        return (dt - EPOCH) // ONE_MICROSECOND
+
+    @classmethod
+    def from_epoch(cls, micros: int) -> datetime:
+        return _from_epoch(micros)
+
+    @classmethod
+    def to_wall_clock(cls, dt: datetime, tz_string: str = 'Asia/Seoul') -> datetime:
+        '''
+        An aware datetime as the naive wall-clock time of tz_string, like the parsed timestamps.
+        Naive datetimes are already wall-clock times and are returned as they are.
+        '''
+        if dt.tzinfo is None:
+            return dt
+        return dt.astimezone(_timezone(tz_string)).replace(tzinfo=None)
+
+
+@lru_cache(maxsize=None)
+def _timezone(tz_string: str) -> pytz.BaseTzInfo:
+    return pytz.timezone(tz_string)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _from_epoch(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_timestamp(timestamp_str: str) -> datetime:
+    try:
+        dt_string, tz_string = timestamp_str.rsplit(" ", 1)
+        dt: datetime = _decode_layout(dt_string)
+    except ValueError as e:
+        raise ValueError(f"Failed to parse timestamp: {e}")
+
+    # localize() keeps the wall-clock time, so only the timezone name has to be valid
+    _timezone(tz_string)
+    return dt
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_datetime_with_tz(dt_string: str) -> datetime:
+    dt_part, _ = dt_string.rsplit(' ', 1)
+    return _decode_layout(dt_part)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_naive(datetime_str: str) -> datetime | None:
+    # the ISO layouts end with 'Z', the space separated one always has a fraction
+    if datetime_str.endswith('Z'):
+        return _decode_or_none(datetime_str[:-1], separator='T', fraction=False)
+    return _decode_or_none(datetime_str, separator=' ', fraction=True)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_local(datetime_str: str) -> datetime | None:
+    return _decode_or_none(datetime_str, separator=' ', fraction=True)
+
+
+def _decode_or_none(value: str, separator: str, fraction: bool) -> datetime | None:
+    if len(value) < 19 or value[10] != separator or (fraction and len(value) == 19):
+        return None
+    try:
+        return _decode_layout(value)
+    except ValueError:
+        return None
+
+
+def _decode_layout(value: str) -> datetime:
+    '''
+    Decodes the fixed layout 'YYYY-MM-DD HH:MM:SS[.ffffff]' ('T' is accepted as separator) by slicing.
+    '''
+    if (
+            len(value) < 19
+            or value[4] != '-' or value[7] != '-' or value[10] not in ' T'
+            or value[13] != ':' or value[16] != ':'
+    ):
+        raise ValueError(f"unexpected datetime layout: {value!r}")
+
+    digits: str = value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16] + value[17:19]
+    if not digits.isdigit():
+        raise ValueError(f"unexpected datetime layout: {value!r}")
+
+    microsecond: int = 0
+    if len(value) > 19:
+        fraction: str = value[20:]
+        if value[19] != '.' or not fraction or len(fraction) > 6 or not fraction.isdigit():
+            raise ValueError(f"unexpected datetime fraction: {value!r}")
+        microsecond = int(fraction.ljust(6, '0'))
+
+    return datetime(
+        int(value[0:4]),
+        int(value[5:7]),
+        int(value[8:10]),
+        int(value[11:13]),
+        int(value[14:16]),
+        int(value[17:19]),
+        microsecond,
+    )